@@ -42,6 +42,9 @@ in {
           pudb
           rich
 
+          # Testing
+          pytest
+
           # Jupyter
           jupyterlab
           ipywidgets
@@ -49,6 +52,7 @@ in {
           # Web Application
           fastapi
           uvicorn
+          websockets
         ]));
 
     in pkgs-dev.mkShell.override {
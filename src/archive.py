@@ -0,0 +1,46 @@
+"""游戏记录归档命令行工具
+
+用法::
+
+    python archive.py archive [--older-than 天数]
+    python archive.py rebuild
+
+``archive`` 将超过指定天数的游戏记录移出数据库，写入 ``MINESWEEPER_ARCHIVE_DIR``
+下按日期和难度分区的 Parquet 文件；``rebuild`` 根据全部游戏记录（包括归档）
+重新计算玩家统计和排行榜汇总表。
+
+单进程部署时服务长期持有数据库文件锁，需要先停止服务或使用
+``MINESWEEPER_ARCHIVE_INTERVAL`` 让服务自行定期归档。
+"""
+import argparse
+import logging
+
+from db import ARCHIVE_AFTER_DAYS, ARCHIVE_DIR, GameDB, database, init_db
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="扫雷游戏记录归档")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive = commands.add_parser("archive", help="归档旧的游戏记录")
+    archive.add_argument(
+        "--older-than", type=int, default=ARCHIVE_AFTER_DAYS,
+        help=f"归档早于该天数的记录（默认 {ARCHIVE_AFTER_DAYS}）"
+    )
+    commands.add_parser("rebuild", help="根据全部记录重建统计和排行榜")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    try:
+        if args.command == "archive":
+            count = GameDB.archive_game_records(args.older_than)
+            print(f"archived {count} records to {ARCHIVE_DIR}")
+        else:
+            GameDB.rebuild_summaries()
+            print("rebuilt user_stats and user_bests")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
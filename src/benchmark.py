@@ -0,0 +1,579 @@
+"""扫雷引擎基准测试
+
+用法::
+
+    python benchmark.py [--games 数量] [--difficulty 难度 ...]
+                        [--custom 宽x高x地雷 ...] [--custom-games 数量]
+                        [--workers 进程数] [--seed 种子]
+                        [--output 结果.json] [--compare 基准.json] [--threshold 比例]
+                        [--min-tail-samples 数量]
+
+不启动服务，直接用一个简单的机器人驱动 ``MinesweeperGame`` 完成大量游戏：
+机器人先随机点击一次，之后反复应用单个数字的推理（周围旗子数等于数字时揭示
+其余格子，未知格子数等于剩余地雷数时全部标记），无法推理时随机揭示一个未知
+格子。每局游戏使用固定的随机种子，相同参数的两次运行进行完全相同的游戏。
+
+每个场景报告：
+
+- ``games_per_second``：按墙钟时间计算的每秒完成游戏数（包括机器人开销）
+- ``moves_per_second``：按引擎耗时计算的单核每秒操作数（只计 ``apply_move``）
+- ``first_click_ms``：第一次揭示（放置地雷和首次展开）的耗时分布
+- ``cascade``：展开多个格子的揭示操作的耗时分布和每个格子的平均耗时
+- ``peak_rss_mb``：工作进程的最大常驻内存
+
+结果以 JSON 写入 ``--output``（默认输出到标准输出）。``--compare`` 读取之前的
+结果并逐项对比，有指标变差超过 ``--threshold`` 时以状态码 1 退出，便于在
+不同提交之间检查性能回退。p99 只有在两次运行的样本数都不少于
+``--min-tail-samples`` 时才参与判断，样本较少时只输出变化。
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from game_logic import ADJACENT_MASK, FLAGGED, REVEALED, MinesweeperGame
+from models import DIFFICULTY_SETTINGS, DifficultyLevel, GameConfig, GameMove
+
+# 每个任务进行的游戏数量
+CHUNK_SIZE = 500
+# 耗时直方图每个 2 倍区间的分桶数量，分位数的相对误差约为 4%
+HISTOGRAM_RESOLUTION = 16
+# 随机猜测时先尝试的随机位置数量，都不可用时扫描整个游戏板
+GUESS_ATTEMPTS = 32
+
+# 对比结果时检查的指标：(路径, 数值越大越好)
+COMPARED_METRICS: List[Tuple[str, bool]] = [
+    ("games_per_second", True),
+    ("moves_per_second", True),
+    ("first_click_ms.p50", False),
+    ("first_click_ms.p99", False),
+    ("cascade.ns_per_cell", False),
+    ("cascade.latency_ms.p99", False),
+    ("peak_rss_mb", False),
+]
+# p99 参与回退判断所需的最少样本数量，样本较少时尾部分位数在相同的两次运行
+# 之间也会有几十个百分点的波动
+MIN_TAIL_SAMPLES = 2000
+
+
+class Histogram:
+    """按对数分桶的耗时直方图，可以跨进程合并
+
+    Attributes:
+        buckets (Counter): 分桶编号到次数的映射
+        count (int): 记录的次数
+        total_ns (int): 记录的总耗时（纳秒）
+        max_ns (int): 最大耗时（纳秒）
+    """
+
+    def __init__(self):
+        self.buckets: Counter = Counter()
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns: int) -> None:
+        """记录一次耗时
+
+        Args:
+            ns: 耗时（纳秒）
+        """
+        self.buckets[int(math.log2(max(ns, 1)) * HISTOGRAM_RESOLUTION)] += 1
+        self.count += 1
+        self.total_ns += ns
+        self.max_ns = max(self.max_ns, ns)
+
+    def merge(self, other: "Histogram") -> None:
+        """合并另一个直方图
+
+        Args:
+            other: 要合并的直方图
+        """
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def percentile(self, q: float) -> float:
+        """估算分位数
+
+        Args:
+            q: 分位数，取值范围 [0, 1]
+
+        Returns:
+            float: 分位数所在分桶的中点（纳秒），没有记录时为 0
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(2 ** ((bucket + 0.5) / HISTOGRAM_RESOLUTION), self.max_ns)
+        return float(self.max_ns)
+
+    def summary_ms(self) -> Dict[str, float]:
+        """获取以毫秒表示的耗时摘要
+
+        Returns:
+            Dict[str, float]: 次数、平均值、p50、p95、p99 和最大值
+        """
+        return {
+            "count": self.count,
+            "mean": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "p50": self.percentile(0.50) / 1e6,
+            "p95": self.percentile(0.95) / 1e6,
+            "p99": self.percentile(0.99) / 1e6,
+            "max": self.max_ns / 1e6,
+        }
+
+
+class RunStats:
+    """一批游戏的统计
+
+    Attributes:
+        games (int): 完成的游戏数量
+        wins (int): 获胜的游戏数量
+        moves (int): 执行的操作数量
+        reveals (int): 揭示操作数量
+        flags (int): 标记操作数量
+        engine_ns (int): ``apply_move`` 的总耗时（纳秒）
+        first_click (Histogram): 第一次揭示的耗时
+        cascade (Histogram): 展开多个格子的揭示操作的耗时（不含第一次揭示）
+        cascade_cells (int): 这些揭示操作揭示的格子数量
+        peak_rss_kb (int): 最大常驻内存（KB）
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.moves = 0
+        self.reveals = 0
+        self.flags = 0
+        self.engine_ns = 0
+        self.first_click = Histogram()
+        self.cascade = Histogram()
+        self.cascade_cells = 0
+        self.peak_rss_kb = 0
+
+    def merge(self, other: "RunStats") -> None:
+        """合并另一批游戏的统计
+
+        Args:
+            other: 要合并的统计
+        """
+        for name in ("games", "wins", "moves", "reveals", "flags", "engine_ns",
+                     "cascade_cells"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.first_click.merge(other.first_click)
+        self.cascade.merge(other.cascade)
+        self.peak_rss_kb = max(self.peak_rss_kb, other.peak_rss_kb)
+
+
+def _neighbours(index: int, width: int, height: int) -> Sequence[int]:
+    x, y = divmod(index, width)
+    if 0 < x < height - 1 and 0 < y < width - 1:
+        above = index - width
+        below = index + width
+        return (above - 1, above, above + 1, index - 1, index + 1,
+                below - 1, below, below + 1)
+    return [
+        i * width + j
+        for i in range(max(0, x - 1), min(height, x + 2))
+        for j in range(max(0, y - 1), min(width, y + 2))
+        if i * width + j != index
+    ]
+
+
+class Bot:
+    """只根据可见信息下棋的简单机器人
+
+    第一次随机揭示，之后对已揭示的数字应用单个数字的推理，无法推理时随机揭示
+    一个未知格子。机器人只读取格子的 ``REVEALED``、``FLAGGED`` 位和已揭示格子
+    的数字，因此既可以直接读取引擎的游戏板，也可以读取客户端根据响应维护的
+    游戏板（见 loadtest）。
+
+    Attributes:
+        width (int): 游戏板宽度
+        height (int): 游戏板高度
+        cells (bytearray): 游戏板，格式与 ``MinesweeperGame.cells`` 相同
+    """
+
+    def __init__(self, width: int, height: int, cells: bytearray, rng: random.Random):
+        """初始化机器人
+
+        Args:
+            width: 游戏板宽度
+            height: 游戏板高度
+            cells: 游戏板，由调用方在每次操作后更新
+            rng: 选择第一次点击和随机猜测位置的随机数生成器
+        """
+        self.width = width
+        self.height = height
+        self.cells = cells
+        self._rng = rng
+        self._started = False
+        # 待检查的已揭示数字，同一个格子在队列中最多出现一次
+        self._pending: deque = deque()
+        self._queued = set()
+        # 已推理出、尚未执行的操作
+        self._moves: deque = deque()
+
+    def next_move(self) -> Tuple[int, str]:
+        """选择下一步操作
+
+        Returns:
+            Tuple[int, str]: 格子下标和操作类型（"reveal" 或 "flag"）
+        """
+        cells = self.cells
+        if not self._started:
+            self._started = True
+            return self._rng.randrange(len(cells)), "reveal"
+        while True:
+            while self._moves:
+                index, action = self._moves.popleft()
+                if not cells[index] & (REVEALED | FLAGGED):
+                    return index, action
+            if not self._pending:
+                return self._guess(), "reveal"
+            self._deduce(self._pending.popleft())
+
+    def observe(self, index: int, action: str, changed: List[int]) -> None:
+        """在游戏板更新后记录需要重新检查的数字
+
+        Args:
+            index: 执行操作的格子下标
+            action: 操作类型
+            changed: 操作改变的格子下标
+        """
+        cells = self.cells
+        width, height = self.width, self.height
+        if action == "flag":
+            # 标记后相邻的数字可能可以继续推理
+            for n in _neighbours(index, width, height):
+                if cells[n] & REVEALED:
+                    self._check(n)
+            return
+        for changed_index in changed:
+            if cells[changed_index] & ADJACENT_MASK:
+                self._check(changed_index)
+                # 新揭示的数字减少了相邻数字的未知格子
+                for n in _neighbours(changed_index, width, height):
+                    if cells[n] & REVEALED and cells[n] & ADJACENT_MASK:
+                        self._check(n)
+
+    def _check(self, index: int) -> None:
+        if index not in self._queued:
+            self._queued.add(index)
+            self._pending.append(index)
+
+    def _deduce(self, index: int) -> None:
+        self._queued.discard(index)
+        cells = self.cells
+        count = cells[index] & ADJACENT_MASK
+        unknown = []
+        flagged = 0
+        for n in _neighbours(index, self.width, self.height):
+            if cells[n] & FLAGGED:
+                flagged += 1
+            elif not cells[n] & REVEALED:
+                unknown.append(n)
+        if not unknown:
+            return
+        if flagged == count:
+            self._moves.extend((n, "reveal") for n in unknown)
+        elif flagged + len(unknown) == count:
+            self._moves.extend((n, "flag") for n in unknown)
+
+    def _guess(self) -> int:
+        cells = self.cells
+        for _ in range(GUESS_ATTEMPTS):
+            index = self._rng.randrange(len(cells))
+            if not cells[index] & (REVEALED | FLAGGED):
+                return index
+        unknown = np.flatnonzero(
+            (np.frombuffer(cells, dtype=np.uint8) & (REVEALED | FLAGGED)) == 0
+        )
+        return int(unknown[self._rng.randrange(len(unknown))])
+
+
+def play_game(game: MinesweeperGame, rng: random.Random, stats: RunStats) -> None:
+    """用机器人完成一局游戏
+
+    Args:
+        game: 尚未开始的游戏
+        rng: 机器人使用的随机数生成器
+        stats: 累加统计的对象
+    """
+    width = game.width
+    bot = Bot(width, game.height, game.cells, rng)
+    while not game.is_game_over:
+        index, action = bot.next_move()
+        request = GameMove(x=index // width, y=index % width, action=action)
+        first = game.first_move
+        start = time.perf_counter_ns()
+        changed = game.apply_move(request)
+        elapsed = time.perf_counter_ns() - start
+        stats.moves += 1
+        stats.engine_ns += elapsed
+        if action == "flag":
+            stats.flags += 1
+        else:
+            stats.reveals += 1
+            if first:
+                stats.first_click.add(elapsed)
+            elif len(changed) > 1 and not game.is_game_over:
+                stats.cascade.add(elapsed)
+                stats.cascade_cells += len(changed)
+        bot.observe(index, action, changed)
+
+    stats.games += 1
+    stats.wins += game.is_won
+
+
+def run_chunk(config: GameConfig, first_seed: int, games: int) -> RunStats:
+    """在工作进程中完成一批游戏
+
+    Args:
+        config: 游戏配置
+        first_seed: 第一局游戏的随机种子，之后每局加一
+        games: 游戏数量
+
+    Returns:
+        RunStats: 这批游戏的统计
+    """
+    stats = RunStats()
+    for seed in range(first_seed, first_seed + games):
+        play_game(MinesweeperGame(config, seed=seed), random.Random(seed), stats)
+    stats.peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return stats
+
+
+def run_scenario(config: GameConfig, games: int, workers: int, seed: int) -> Dict[str, Any]:
+    """在新的进程池中运行一个场景，避免前一个场景的内存占用影响结果
+
+    Args:
+        config: 游戏配置
+        games: 游戏数量
+        workers: 工作进程数量
+        seed: 第一局游戏的随机种子
+
+    Returns:
+        Dict[str, Any]: 场景的指标
+    """
+    stats = RunStats()
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_chunk, config, seed + offset, min(CHUNK_SIZE, games - offset))
+            for offset in range(0, games, CHUNK_SIZE)
+        ]
+        for future in futures:
+            stats.merge(future.result())
+    wall = time.perf_counter() - start
+
+    engine_seconds = stats.engine_ns / 1e9
+    return {
+        "width": config.width,
+        "height": config.height,
+        "mines": config.mines,
+        "games": stats.games,
+        "wins": stats.wins,
+        "win_rate": stats.wins / stats.games if stats.games else 0.0,
+        "moves": stats.moves,
+        "reveals": stats.reveals,
+        "flags": stats.flags,
+        "wall_seconds": wall,
+        "engine_seconds": engine_seconds,
+        "games_per_second": stats.games / wall if wall else 0.0,
+        "moves_per_second": stats.moves / engine_seconds if engine_seconds else 0.0,
+        "first_click_ms": stats.first_click.summary_ms(),
+        "cascade": {
+            "cells": stats.cascade_cells,
+            "ns_per_cell": (
+                stats.cascade.total_ns / stats.cascade_cells if stats.cascade_cells else 0.0
+            ),
+            "latency_ms": stats.cascade.summary_ms(),
+        },
+        "peak_rss_mb": stats.peak_rss_kb / 1024,
+    }
+
+
+def parse_custom(value: str) -> GameConfig:
+    """解析 ``宽x高x地雷`` 格式的自定义游戏板尺寸"""
+    try:
+        width, height, mines = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHTxMINES, got {value!r}")
+    if width <= 0 or height <= 0 or not 0 <= mines <= width * height - 9:
+        raise argparse.ArgumentTypeError(f"invalid board size {value!r}")
+    return GameConfig(
+        difficulty=DifficultyLevel.CUSTOM, width=width, height=height, mines=mines
+    )
+
+
+def _metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "args": {
+            "games": args.games,
+            "difficulty": [difficulty.value for difficulty in args.difficulty],
+            "custom": [f"{c.width}x{c.height}x{c.mines}" for c in args.custom],
+            "custom_games": args.custom_games,
+            "workers": args.workers,
+            "seed": args.seed,
+        },
+    }
+
+
+def _lookup(metrics: Dict[str, Any], path: str) -> Optional[float]:
+    for key in path.split("."):
+        if not isinstance(metrics, dict) or key not in metrics:
+            return None
+        metrics = metrics[key]
+    return metrics
+
+
+def _enough_samples(
+    baseline: Dict[str, Any], current: Dict[str, Any], path: str, min_samples: int
+) -> bool:
+    if not path.endswith(".p99"):
+        return True
+    count_path = path.rsplit(".", 1)[0] + ".count"
+    counts = (_lookup(baseline, count_path), _lookup(current, count_path))
+    return all(count is not None and count >= min_samples for count in counts)
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float,
+    metrics: List[Tuple[str, bool]] = COMPARED_METRICS,
+    min_tail_samples: int = MIN_TAIL_SAMPLES
+) -> bool:
+    """逐项对比两次运行的结果并输出到标准错误
+
+    Args:
+        baseline: 之前的结果，名称到指标的映射
+        current: 本次的结果，名称到指标的映射
+        threshold: 允许变差的比例
+        metrics: 对比的指标路径和数值是否越大越好
+        min_tail_samples: p99 参与判断所需的最少样本数量
+
+    Returns:
+        bool: 是否有参与判断的指标变差超过 ``threshold``
+    """
+    regressed = False
+    for name, values in current.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        print(f"{name}:", file=sys.stderr)
+        for path, higher_is_better in metrics:
+            before, after = _lookup(old, path), _lookup(values, path)
+            if before is None or after is None or before == after == 0:
+                continue
+            change = after / before - 1 if before else math.inf
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                if _enough_samples(old, values, path, min_tail_samples):
+                    flag = "  REGRESSION"
+                    regressed = True
+                else:
+                    flag = "  (too few samples to gate)"
+            print(f"  {path:<24} {before:>14.4f} -> {after:>14.4f}  {change:+7.1%}{flag}",
+                  file=sys.stderr)
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="扫雷引擎基准测试")
+    parser.add_argument(
+        "--games", type=int, default=1000, help="每个预设难度的游戏数量（默认 1000）"
+    )
+    parser.add_argument(
+        "--difficulty", type=DifficultyLevel, nargs="*", default=list(DIFFICULTY_SETTINGS),
+        choices=list(DIFFICULTY_SETTINGS), help="运行的预设难度（默认全部）"
+    )
+    parser.add_argument(
+        "--custom", type=parse_custom, nargs="*", default=[],
+        help="自定义游戏板尺寸，格式为 宽x高x地雷，例如 1000x1000x150000"
+    )
+    parser.add_argument(
+        "--custom-games", type=int, default=10, help="每个自定义尺寸的游戏数量（默认 10）"
+    )
+    parser.add_argument("--workers", type=int, default=1, help="工作进程数量（默认 1）")
+    parser.add_argument("--seed", type=int, default=0, help="第一局游戏的随机种子（默认 0）")
+    parser.add_argument("--output", help="结果 JSON 文件，默认输出到标准输出")
+    parser.add_argument("--compare", help="与之前的结果 JSON 文件对比")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="对比时允许变差的比例（默认 0.1）"
+    )
+    parser.add_argument(
+        "--min-tail-samples", type=int, default=MIN_TAIL_SAMPLES,
+        help=f"p99 参与对比判断所需的最少样本数量（默认 {MIN_TAIL_SAMPLES}）"
+    )
+    args = parser.parse_args()
+
+    scenarios = [(difficulty.value, DIFFICULTY_SETTINGS[difficulty], args.games)
+                 for difficulty in args.difficulty]
+    scenarios += [(f"custom-{c.width}x{c.height}x{c.mines}", c, args.custom_games)
+                  for c in args.custom]
+
+    result = {"meta": _metadata(args), "scenarios": {}}
+    for name, config, games in scenarios:
+        metrics = run_scenario(config, games, args.workers, args.seed)
+        result["scenarios"][name] = metrics
+        print(
+            f"{name}: {metrics['games_per_second']:.1f} games/s, "
+            f"{metrics['moves_per_second']:.0f} moves/s, "
+            f"first click p50 {metrics['first_click_ms']['p50']:.3f} ms, "
+            f"cascade {metrics['cascade']['ns_per_cell']:.0f} ns/cell, "
+            f"peak RSS {metrics['peak_rss_mb']:.1f} MB",
+            file=sys.stderr
+        )
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(
+            baseline["scenarios"], result["scenarios"], args.threshold,
+            min_tail_samples=args.min_tail_samples
+        ):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
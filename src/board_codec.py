@@ -0,0 +1,170 @@
+"""紧凑二进制游戏板编码
+
+客户端通过 ``Accept: application/x-minesweeper-board`` 请求该格式，默认仍返回
+JSON。所有整数均为小端序，格式如下：
+
+头部（36 字节）::
+
+    magic          4s   b"MSWB"
+    format         u8   格式版本，当前为 1
+    kind           u8   0 = 完整游戏板，1 = 增量，2 = 区域
+    status         u8   bit0 = 游戏结束，bit1 = 获胜
+    reserved       u8
+    game_id        i64
+    width          u32
+    height         u32
+    mines_remaining i32
+    base_version   u32  完整游戏板时等于 version
+    version        u32
+
+完整游戏板（kind = 0）：紧随头部的 ``width * height`` 个字节，按行优先顺序
+排列，每个格子一个字节。
+
+增量（kind = 1）：u32 变化数量 ``n``，随后是 ``n`` 个 u32 格子下标
+（``x * width + y``），再是 ``n`` 个格子字节。
+
+区域（kind = 2）：u32 ``x0``、``y0``、``x1``、``y1``（不包含 ``x1``、``y1``），
+随后是区域内 ``(x1 - x0) * (y1 - y0)`` 个格子字节，按行优先顺序排列。
+
+格子字节与服务端存储相同：低 4 位为相邻地雷数量，``0x10`` 地雷，``0x20``
+已揭示，``0x40`` 已标记。未揭示的格子只保留标记位，不会泄露地雷和数字。
+"""
+import struct
+from typing import List
+
+from game_logic import MinesweeperGame, FLAGGED, REVEALED
+
+BOARD_MEDIA_TYPE = "application/x-minesweeper-board"
+
+FORMAT_VERSION = 1
+KIND_BOARD = 0
+KIND_DELTA = 1
+KIND_REGION = 2
+
+STATUS_GAME_OVER = 0x01
+STATUS_WON = 0x02
+
+_HEADER = struct.Struct("<4sBBBBqIIiII")
+_REGION = struct.Struct("<IIII")
+_MAGIC = b"MSWB"
+
+# 字节转换表：未揭示的格子只保留标记位
+_VISIBLE = bytes(
+    value if value & REVEALED else value & FLAGGED for value in range(256)
+)
+
+
+def accepts_board_encoding(accept: str) -> bool:
+    """判断 Accept 请求头是否接受二进制游戏板格式
+
+    Args:
+        accept: Accept 请求头的值
+
+    Returns:
+        bool: 是否应返回二进制格式
+    """
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        if media_type.lower() != BOARD_MEDIA_TYPE:
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def _header(game: MinesweeperGame, game_id: int, kind: int, base_version: int) -> bytes:
+    status = 0
+    if game.is_game_over:
+        status |= STATUS_GAME_OVER
+    if game.is_won:
+        status |= STATUS_WON
+    return _HEADER.pack(
+        _MAGIC, FORMAT_VERSION, kind, status, 0, game_id,
+        game.width, game.height, game.mines_remaining,
+        base_version, game.version
+    )
+
+
+def visible_cells(game: MinesweeperGame) -> bytes:
+    """获取玩家可见的格子字节，未揭示的格子只保留标记位
+
+    Args:
+        game: 游戏实例
+
+    Returns:
+        bytes: 每个格子一个字节，按行优先顺序排列
+    """
+    return bytes(game.cells.translate(_VISIBLE))
+
+
+def encode_board(game: MinesweeperGame, game_id: int) -> bytes:
+    """将完整游戏板编码为二进制格式
+
+    Args:
+        game: 游戏实例
+        game_id: 游戏ID
+
+    Returns:
+        bytes: 编码后的游戏板
+    """
+    return (
+        _header(game, game_id, KIND_BOARD, game.version)
+        + visible_cells(game)
+    )
+
+
+def encode_delta(
+    game: MinesweeperGame, game_id: int, changed: List[int], base_version: int
+) -> bytes:
+    """将一次操作改变的格子编码为二进制增量
+
+    Args:
+        game: 游戏实例
+        game_id: 游戏ID
+        changed: 发生变化的格子下标
+        base_version: 操作执行前的游戏板版本号
+
+    Returns:
+        bytes: 编码后的增量
+    """
+    cells = game.cells
+    count = len(changed)
+    return b"".join((
+        _header(game, game_id, KIND_DELTA, base_version),
+        struct.pack(f"<I{count}I", count, *changed),
+        bytes(cells[index] for index in changed).translate(_VISIBLE),
+    ))
+
+
+def encode_region(
+    game: MinesweeperGame, game_id: int, x0: int, y0: int, x1: int, y1: int
+) -> bytes:
+    """将游戏板的一个矩形区域编码为二进制格式
+
+    Args:
+        game: 游戏实例
+        game_id: 游戏ID
+        x0: 第一行的行索引
+        y0: 第一列的列索引
+        x1: 最后一行之后的行索引
+        y1: 最后一列之后的列索引
+
+    Returns:
+        bytes: 编码后的区域
+    """
+    cells = game.cells
+    width = game.width
+    rows = b"".join(
+        cells[x * width + y0:x * width + y1] for x in range(x0, x1)
+    )
+    return b"".join((
+        _header(game, game_id, KIND_REGION, game.version),
+        _REGION.pack(x0, y0, x1, y1),
+        rows.translate(_VISIBLE),
+    ))
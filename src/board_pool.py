@@ -0,0 +1,241 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import random
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+from game_logic import MINE, build_layout, layout_from_mines, safe_indices
+from models import DIFFICULTY_SETTINGS, DifficultyLevel, GameConfig
+
+# 每个难度预先生成的游戏板数量，0 表示不使用游戏板池（默认）
+POOL_SIZE = int(os.getenv('MINESWEEPER_BOARD_POOL_SIZE', '0'))
+# 每次补充时每个难度最多生成的游戏板数量
+POOL_REFILL_BATCH = int(os.getenv('MINESWEEPER_BOARD_POOL_REFILL_BATCH', '16'))
+# 检查并补充游戏板池的间隔（秒）
+POOL_REFILL_INTERVAL = float(os.getenv('MINESWEEPER_BOARD_POOL_REFILL_INTERVAL', '0.5'))
+# 生成游戏板的进程数量
+POOL_WORKERS = int(os.getenv('MINESWEEPER_BOARD_POOL_WORKERS', '1'))
+# 固定后生成的游戏板序列和平移位置都可以复现；未设置时每批使用随机种子
+POOL_SEED = os.getenv('MINESWEEPER_BOARD_POOL_SEED')
+
+# 没有可直接使用的游戏板时，平移一个游戏板的最大尝试次数
+TRANSLATE_ATTEMPTS = 16
+
+logger = logging.getLogger(__name__)
+
+
+def generate_layouts(width: int, height: int, mines: int, seed: int, count: int) -> List[bytes]:
+    """使用固定的随机种子生成一批游戏板（在工作进程中执行）
+
+    Args:
+        width: 游戏板宽度
+        height: 游戏板高度
+        mines: 地雷数量
+        seed: 随机种子，相同的参数总是生成相同的游戏板
+        count: 生成的数量
+
+    Returns:
+        List[bytes]: ``build_layout`` 格式的游戏板
+    """
+    rng = random.Random(seed)
+    return [bytes(build_layout(width, height, mines, rng)) for _ in range(count)]
+
+
+def _is_clear(layout: np.ndarray, x: int, y: int) -> bool:
+    return not (layout[max(0, x - 1):x + 2, max(0, y - 1):y + 2] & MINE).any()
+
+
+class BoardPool:
+    """预生成的游戏板池
+
+    每个预设难度保存 ``size`` 个不考虑第一次点击位置、随机生成的游戏板，由
+    后台线程定期提交给进程池补充。第一次揭示时按先进先出的顺序取出一个游戏板：
+    点击位置周围没有地雷时直接使用，否则循环平移到满足条件的位置；平移失败时
+    丢弃该游戏板并返回 None，由游戏同步生成。不会跳过游戏板去挑选满足条件的，
+    否则留在池中的游戏板会偏向在常见点击位置附近有地雷。
+
+    Attributes:
+        size (int): 每个难度保存的游戏板数量
+        refill_batch (int): 每次补充时每个难度最多生成的数量
+        refill_interval (float): 检查并补充的间隔（秒）
+        workers (int): 生成游戏板的进程数量
+        hits (int): 直接使用预生成游戏板的次数
+        translated (int): 平移预生成游戏板的次数
+        misses (int): 没有可用游戏板、需要同步生成的次数
+        generated (int): 已生成的游戏板数量
+    """
+
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        refill_batch: int = POOL_REFILL_BATCH,
+        refill_interval: float = POOL_REFILL_INTERVAL,
+        workers: int = POOL_WORKERS,
+        seed: Optional[int] = int(POOL_SEED) if POOL_SEED is not None else None
+    ):
+        """初始化游戏板池
+
+        Args:
+            size: 每个难度保存的游戏板数量
+            refill_batch: 每次补充时每个难度最多生成的数量
+            refill_interval: 检查并补充的间隔（秒）
+            workers: 生成游戏板的进程数量
+            seed: 第一批游戏板的随机种子，之后每批加一，同时作为平移游戏板的
+                随机种子；None 表示随机
+        """
+        self.size = size
+        self.refill_batch = refill_batch
+        self.refill_interval = refill_interval
+        self.workers = workers
+        self.hits = 0
+        self.translated = 0
+        self.misses = 0
+        self.generated = 0
+        self._seeds = itertools.count(seed) if seed is not None else None
+        # 平移游戏板使用的随机数，与全局的 random 模块相互独立
+        self._random = random.Random(seed)
+        self._layouts: Dict[DifficultyLevel, Deque[bytes]] = {
+            difficulty: deque() for difficulty in DIFFICULTY_SETTINGS
+        }
+        self._pending: Dict[DifficultyLevel, int] = dict.fromkeys(DIFFICULTY_SETTINGS, 0)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """启动进程池和后台补充线程
+
+        工作进程以 spawn 方式启动，不复制服务进程中其他线程持有的锁。
+        """
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+        )
+        self._thread = threading.Thread(target=self._run, name='board-pool', daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """停止补充并关闭进程池"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    def take(self, config: GameConfig, x: int, y: int) -> Optional[bytes]:
+        """取出一个在 ``(x, y)`` 及其周围没有地雷的游戏板
+
+        Args:
+            config: 游戏配置，只有预设难度的配置使用游戏板池
+            x: 第一次点击的行索引
+            y: 第一次点击的列索引
+
+        Returns:
+            Optional[bytes]: ``build_layout`` 格式的游戏板，没有可用游戏板或
+                平移失败时返回 None
+        """
+        if DIFFICULTY_SETTINGS.get(config.difficulty) != config:
+            return None
+        shape = (config.height, config.width)
+        with self._lock:
+            layouts = self._layouts[config.difficulty]
+            layout = layouts.popleft() if layouts else None
+            if layout is not None and _is_clear(
+                np.frombuffer(layout, dtype=np.uint8).reshape(shape), x, y
+            ):
+                self.hits += 1
+                return layout
+
+        if layout is not None:
+            translated = self._translate(layout, config, x, y)
+            if translated is not None:
+                with self._lock:
+                    self.translated += 1
+                return translated
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        """获取游戏板池的统计信息
+
+        Returns:
+            Dict[str, int]: 各难度的可用数量和命中、平移、未命中、生成计数
+        """
+        with self._lock:
+            stats = {
+                f"available_{difficulty.value}": len(layouts)
+                for difficulty, layouts in self._layouts.items()
+            }
+            stats.update(
+                size=self.size, hits=self.hits, translated=self.translated,
+                misses=self.misses, generated=self.generated
+            )
+            return stats
+
+    def _translate(self, layout: bytes, config: GameConfig, x: int, y: int) -> Optional[bytes]:
+        """把游戏板循环平移到 ``(x, y)`` 周围没有地雷的位置，重新计算相邻地雷数量"""
+        mines = (
+            np.frombuffer(layout, dtype=np.uint8).reshape(config.height, config.width) & MINE
+        ).astype(bool)
+        zone = np.array(safe_indices(config.width, config.height, x, y))
+        rows, cols = np.divmod(zone, config.width)
+        with self._lock:
+            shifts = [
+                (self._random.randrange(config.height), self._random.randrange(config.width))
+                for _ in range(TRANSLATE_ATTEMPTS)
+            ]
+        for dx, dy in shifts:
+            # 平移后 (i, j) 处的格子来自平移前的 (i - dx, j - dy)
+            if not mines[(rows - dx) % config.height, (cols - dy) % config.width].any():
+                shifted = np.roll(mines, (dx, dy), axis=(0, 1))
+                return bytes(layout_from_mines(
+                    config.width, config.height, np.flatnonzero(shifted)
+                ))
+        return None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.refill_interval):
+            for difficulty, config in DIFFICULTY_SETTINGS.items():
+                with self._lock:
+                    missing = (
+                        self.size - len(self._layouts[difficulty]) - self._pending[difficulty]
+                    )
+                    count = min(missing, self.refill_batch)
+                    if count <= 0:
+                        continue
+                    self._pending[difficulty] += count
+                seed = next(self._seeds) if self._seeds is not None else random.getrandbits(64)
+                try:
+                    future = self._executor.submit(
+                        generate_layouts, config.width, config.height, config.mines,
+                        seed, count
+                    )
+                except RuntimeError:
+                    # 进程池已关闭
+                    return
+                future.add_done_callback(
+                    lambda future, difficulty=difficulty, count=count:
+                        self._add(difficulty, count, future)
+                )
+
+    def _add(self, difficulty: DifficultyLevel, count: int, future: Future) -> None:
+        with self._lock:
+            self._pending[difficulty] -= count
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                logger.error("generating boards failed", exc_info=future.exception())
+                return
+            layouts = future.result()
+            self._layouts[difficulty].extend(layouts)
+            self.generated += len(layouts)
+
+
+board_pool = BoardPool()
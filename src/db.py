@@ -1,18 +1,184 @@
 import os
+import glob
+import base64
+import bisect
+import hashlib
+import json
+import time
+import uuid
+import logging
+import asyncio
+import threading
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 import duckdb
-from datetime import datetime
-from typing import List, Optional, Dict
-from models import DifficultyLevel, GameState
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Iterator, List, Optional, Dict, Set, Tuple, TypeVar
+from metrics import Histogram, timed
+from models import DIFFICULTY_SETTINGS, DifficultyLevel, GameState, LeaderboardWindow
+from profiler import profiler
 
 # 获取数据库路径
 DB_PATH = os.getenv('MINESWEEPER_DB_PATH', 
                     str(Path.home() / '.minesweeper' / 'minesweeper.db'))
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
+# 等待其他进程释放数据库文件锁的最长时间（秒）
+LOCK_RETRY_TIMEOUT = 10.0
+
+# 执行数据库操作的线程数量
+DB_THREADS = int(os.getenv('MINESWEEPER_DB_THREADS', '4'))
+
+# 单个工作进程时长期持有数据库连接；多个工作进程（见 game_store.WORKERS）
+# 需要轮流获取 DuckDB 的文件锁，因此每次操作都重新连接
+DB_EXCLUSIVE = int(os.getenv('MINESWEEPER_WORKERS', '1')) <= 1
+
+# 可选的异步批量写入（write-behind）：完成的游戏先写入本地溢出文件并缓存，
+# 达到数量或时间阈值时批量写入数据库。每个工作进程使用以进程号区分的溢出
+# 文件（例如 minesweeper.db.pending.1234.jsonl），无法写入的记录移到
+# minesweeper.db.pending.failed.jsonl
+WRITE_BEHIND = os.getenv('MINESWEEPER_WRITE_BEHIND', '0') == '1'
+WRITE_BEHIND_BATCH = int(os.getenv('MINESWEEPER_WRITE_BEHIND_BATCH', '500'))
+WRITE_BEHIND_INTERVAL = float(os.getenv('MINESWEEPER_WRITE_BEHIND_INTERVAL', '1.0'))
+WRITE_BEHIND_SPILL = os.getenv('MINESWEEPER_WRITE_BEHIND_SPILL', DB_PATH + '.pending.jsonl')
+
+# 游戏记录的字段顺序
+RECORD_FIELDS = (
+    'game_id', 'user_id', 'user_name', 'difficulty', 'duration', 'result',
+    'moves', 'board_width', 'board_height', 'mines_count', 'played_at'
+)
+
+# 单条 INSERT 语句中最多包含的记录数量
+INSERT_CHUNK = 500
+
+# 排行榜条目数量
+LEADERBOARD_SIZE = 10
+# 分页排行榜单页的最大条目数量
+LEADERBOARD_MAX_PAGE = 100
+# 全部时间范围在 user_bests 表中的 period_start
+ALL_TIME_START = date(1970, 1, 1)
+# 多个工作进程时，排行榜缓存需要定期从数据库刷新以获取其他进程记录的成绩（秒）
+LEADERBOARD_REFRESH = float(os.getenv('MINESWEEPER_LEADERBOARD_REFRESH', '2.0'))
+
+# 冷数据归档：超过 ARCHIVE_AFTER_DAYS 天的游戏记录移出数据库，按日期和难度
+# 分区写入 ARCHIVE_DIR 下的 Parquet 文件；ARCHIVE_INTERVAL 大于 0 时服务每隔
+# 该秒数自动归档一次
+ARCHIVE_DIR = os.getenv(
+    'MINESWEEPER_ARCHIVE_DIR', os.path.join(os.path.dirname(DB_PATH), 'archive')
+)
+ARCHIVE_AFTER_DAYS = int(os.getenv('MINESWEEPER_ARCHIVE_AFTER_DAYS', '90'))
+ARCHIVE_INTERVAL = float(os.getenv('MINESWEEPER_ARCHIVE_INTERVAL', '0'))
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def _connect():
+    """打开数据库连接
+    
+    DuckDB 同一时间只允许一个进程打开数据库文件进行写入。多个工作进程共享
+    同一个数据库文件时，连接失败会短暂等待后重试，直到其他进程释放文件锁。
+    """
+    deadline = time.monotonic() + LOCK_RETRY_TIMEOUT
+    while True:
+        try:
+            return duckdb.connect(database=DB_PATH, read_only=False)
+        except duckdb.IOException as e:
+            if 'lock' not in str(e).lower() or time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+
+
+class Database:
+    """DuckDB 连接管理
+    
+    独占模式下进程内只打开一个长期存在的连接，每个线程使用从它派生的游标；
+    否则每次操作都打开并关闭一个新连接。数据库操作通过 ``run`` 提交到有界
+    线程池中执行，避免阻塞事件循环。
+    
+    Attributes:
+        exclusive (bool): 是否长期持有数据库连接
+    """
+
+    def __init__(self, exclusive: bool = DB_EXCLUSIVE, max_workers: int = DB_THREADS):
+        """初始化连接管理
+        
+        Args:
+            exclusive: 是否长期持有数据库连接
+            max_workers: 执行数据库操作的线程数量
+        """
+        self.exclusive = exclusive
+        self._max_workers = max_workers
+        self._conn = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @contextmanager
+    def cursor(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """获取当前线程可用的数据库游标"""
+        if not self.exclusive:
+            with _connect() as conn:
+                yield conn
+            return
+
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            with self._lock:
+                if self._conn is None:
+                    self._conn = _connect()
+                cursor = self._local.cursor = self._conn.cursor()
+        yield cursor
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在数据库线程池中执行同步函数
+        
+        Args:
+            func: 要执行的函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+            
+        Returns:
+            T: 函数的返回值
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers, thread_name_prefix='duckdb'
+                    )
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, profiler.follow, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    def close(self) -> None:
+        """等待执行中的操作完成，并关闭线程池和数据库连接"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._local = threading.local()
+
+
+database = Database()
+
+
 def get_db():
-    """获取数据库连接"""
-    return duckdb.connect(database=DB_PATH, read_only=False)
+    """获取数据库连接（当前线程的游标）"""
+    return database.cursor()
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在数据库线程池中执行数据库操作"""
+    return await database.run(func, *args, **kwargs)
 
 def init_db():
     """初始化数据库"""
@@ -50,6 +216,615 @@ def init_db():
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        
+        # 旧版本在并发完成游戏时可能为同一用户插入多行，建立唯一索引前先合并
+        duplicates = conn.execute("""
+            SELECT COUNT(*) - COUNT(DISTINCT user_name) FROM user_stats
+        """).fetchone()[0]
+        if duplicates:
+            _merge_duplicate_user_stats(conn)
+        conn.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS user_stats_user_name
+            ON user_stats (user_name)
+        """)
+        
+        # 已提交的归档批次；不在表中的归档文件来自中断的归档，会被删除
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS archive_batches (
+                batch_id VARCHAR PRIMARY KEY,
+                cutoff TIMESTAMP NOT NULL,
+                records INTEGER NOT NULL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        _remove_orphan_archives(conn)
+        _refresh_archive_view(conn)
+        
+        # 每个时间范围内每个用户的最佳成绩，排行榜只查询这张表
+        created = conn.execute("""
+            SELECT COUNT(*) FROM information_schema.tables
+            WHERE table_name = 'user_bests'
+        """).fetchone()[0] == 0
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS user_bests (
+                period VARCHAR NOT NULL,
+                period_start DATE NOT NULL,
+                difficulty VARCHAR NOT NULL,
+                user_name VARCHAR NOT NULL,
+                best_time INTEGER NOT NULL,
+                played_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (period, period_start, difficulty, user_name)
+            )
+        """)
+        if created:
+            _backfill_user_bests(conn)
+
+def _backfill_user_bests(conn) -> None:
+    """根据已有的游戏记录填充 user_bests 表"""
+    period_starts = {
+        LeaderboardWindow.ALL: f"DATE '{ALL_TIME_START.isoformat()}'",
+        LeaderboardWindow.DAY: "CAST(played_at AS DATE)",
+        LeaderboardWindow.WEEK: "CAST(date_trunc('week', played_at) AS DATE)",
+        LeaderboardWindow.MONTH: "CAST(date_trunc('month', played_at) AS DATE)",
+    }
+    for period, start in period_starts.items():
+        conn.execute(f"""
+            INSERT INTO user_bests
+            SELECT ?, {start} AS period_start, difficulty, user_name, duration, played_at
+            FROM all_game_records
+            WHERE result = true AND difficulty <> ?
+            QUALIFY ROW_NUMBER() OVER (
+                PARTITION BY period_start, difficulty, user_name
+                ORDER BY duration ASC, played_at ASC
+            ) = 1
+        """, [period.value, DifficultyLevel.CUSTOM.value])
+
+def _archive_files() -> List[str]:
+    return glob.glob(os.path.join(ARCHIVE_DIR, '**', 'batch_*.parquet'), recursive=True)
+
+def _archive_batch_id(path: str) -> str:
+    # 文件名格式为 batch_<batch_id>_<uuid>.parquet
+    return os.path.basename(path).split('_')[1]
+
+def _remove_orphan_archives(conn) -> None:
+    """删除不属于任何已提交批次的归档文件"""
+    committed = {
+        row[0] for row in conn.execute("SELECT batch_id FROM archive_batches").fetchall()
+    }
+    for path in _archive_files():
+        if _archive_batch_id(path) not in committed:
+            logger.warning("removing orphaned archive file %s", path)
+            os.remove(path)
+
+def _refresh_archive_view(conn) -> None:
+    """重建 all_game_records 视图：数据库中的游戏记录加上 Parquet 归档
+    
+    DuckDB 读取不存在的 Parquet 文件会报错，因此没有归档文件时视图只包含
+    数据库中的记录。
+    """
+    columns = ', '.join(RECORD_FIELDS)
+    query = f"SELECT {columns} FROM game_records"
+    if _archive_files():
+        pattern = os.path.join(ARCHIVE_DIR, '**', '*.parquet').replace("'", "''")
+        query += (
+            f" UNION ALL SELECT {columns} FROM "
+            f"read_parquet('{pattern}', hive_partitioning = true)"
+        )
+    conn.execute(f"CREATE OR REPLACE VIEW all_game_records AS {query}")
+
+def period_start(window: LeaderboardWindow, moment: datetime) -> date:
+    """计算某一时刻所在时间范围的起始日期
+    
+    Args:
+        window: 排行榜时间范围
+        moment: 时刻
+        
+    Returns:
+        date: 时间范围的起始日期，全部时间为 ``ALL_TIME_START``
+    """
+    day = moment.date()
+    if window == LeaderboardWindow.DAY:
+        return day
+    if window == LeaderboardWindow.WEEK:
+        return day - timedelta(days=day.weekday())
+    if window == LeaderboardWindow.MONTH:
+        return day.replace(day=1)
+    return ALL_TIME_START
+
+def encode_cursor(key: Tuple) -> str:
+    """将分页位置编码为不透明的游标"""
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_cursor(cursor: str) -> List:
+    """解析游标
+    
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not (
+        isinstance(key, list) and len(key) == 4
+        and isinstance(key[0], int) and isinstance(key[3], int)
+        and isinstance(key[1], str) and isinstance(key[2], str)
+    ):
+        raise ValueError("invalid cursor")
+    return key
+
+def _merge_duplicate_user_stats(conn) -> None:
+    """将同一用户名的多行统计合并为一行"""
+    totals = ",\n".join(
+        f"SUM({level.value}_games), SUM({level.value}_wins), "
+        f"MIN({level.value}_best_time)"
+        for level in DIFFICULTY_SETTINGS
+    )
+    conn.begin()
+    try:
+        conn.execute(f"""
+            CREATE TEMP TABLE merged_user_stats AS
+            SELECT
+                MIN(user_id), user_name,
+                {totals},
+                MAX(last_played_at), MAX(updated_at)
+            FROM user_stats
+            GROUP BY user_name
+        """)
+        conn.execute("DELETE FROM user_stats")
+        conn.execute("INSERT INTO user_stats SELECT * FROM merged_user_stats")
+        conn.execute("DROP TABLE merged_user_stats")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+class WriteBehindQueue:
+    """完成游戏的异步批量写入队列
+    
+    每条记录先追加到本进程的溢出文件并 fsync，然后缓存在内存中；缓存数量达到
+    ``batch_size`` 或距上次写入超过 ``interval`` 秒时，由后台线程在一个事务
+    中批量写入数据库，成功后从溢出文件中移除。关闭时会写入所有缓存的记录。
+    
+    溢出文件按进程号区分，运行期间持有旁边 ``.lock`` 文件的排他锁。启动时
+    接管所有没有被持有锁的溢出文件（所属进程已经退出），重放其中尚未写入数据库
+    的记录，因此多个工作进程之间不会互相覆盖或重复重放。
+    
+    批量写入失败时逐条重试：因为数据库不可用（``duckdb.OperationalError``）
+    失败的记录保留在队列中等待下次写入；记录本身无法写入时，已经在数据库中的
+    记录直接丢弃，其余移到隔离文件，不会阻塞后续的记录。
+    
+    Attributes:
+        spill_path (str): 本进程的溢出文件路径
+        failed_path (str): 隔离无法写入的记录的文件路径
+        batch_size (int): 触发写入的记录数量
+        interval (float): 两次写入之间的最长间隔（秒）
+    """
+
+    def __init__(
+        self,
+        spill_path: str = WRITE_BEHIND_SPILL,
+        batch_size: int = WRITE_BEHIND_BATCH,
+        interval: float = WRITE_BEHIND_INTERVAL
+    ):
+        """初始化写入队列
+        
+        Args:
+            spill_path: 溢出文件的基础路径，实际文件名中会加入进程号
+            batch_size: 触发写入的记录数量
+            interval: 两次写入之间的最长间隔（秒）
+        """
+        root, ext = os.path.splitext(spill_path)
+        self._base_path = spill_path
+        self._root, self._ext = root, ext
+        self.spill_path = f"{root}.{os.getpid()}{ext}"
+        self.failed_path = f"{root}.failed{ext}"
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending: List[Dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._spill = None
+        self._spill_lock = None
+        # 启动时重放、尚未写入数据库的记录
+        self._replayed: Set[str] = set()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """接管并重放未写入的记录，然后启动后台写入线程"""
+        self._spill_lock = self._try_lock(self.spill_path, blocking=True)
+        claimed = self._claim_orphans()
+        
+        records: Dict[str, Dict] = {}
+        for path, _ in [(self.spill_path, None)] + claimed:
+            for record in self._read_spill(path):
+                records.setdefault(record['game_id'], record)
+        self._pending = self._unsaved(list(records.values()))
+        self._replayed = {record['game_id'] for record in self._pending}
+        self._rewrite_spill(self._pending)
+        
+        # 接管的记录已经持久化到本进程的溢出文件，可以删除原来的文件
+        for path, lock in claimed:
+            self._remove_spill(path, lock)
+        if claimed:
+            logger.info(
+                "Claimed %d orphaned write-behind files, %d records pending",
+                len(claimed), len(self._pending)
+            )
+        
+        self._thread = threading.Thread(
+            target=self._run, name='write-behind', daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, record: Dict) -> None:
+        """持久化到溢出文件后加入写入队列
+        
+        Args:
+            record: 按 ``RECORD_FIELDS`` 组织的游戏记录
+        """
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            self._spill.write(line)
+            self._spill.flush()
+            os.fsync(self._spill.fileno())
+            self._pending.append(record)
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+
+    def flush(self) -> int:
+        """将当前缓存的记录写入数据库
+        
+        Returns:
+            int: 写入的记录数量
+            
+        Raises:
+            duckdb.OperationalError: 数据库不可用，未写入的记录留在队列中
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            
+            try:
+                try:
+                    GameDB.save_game_results(batch)
+                    saved = batch
+                except duckdb.OperationalError:
+                    with self._lock:
+                        self._pending[:0] = batch
+                    raise
+                except Exception as e:
+                    logger.warning(
+                        "Failed to save %d completed games, retrying one by one: %s",
+                        len(batch), e
+                    )
+                    saved = None
+                if saved is None:
+                    saved = self._save_each(batch)
+                self._announce_replayed(saved)
+                return len(saved)
+            finally:
+                # 溢出文件中只保留尚未写入的记录
+                with self._lock:
+                    self._rewrite_spill(self._pending)
+
+    def close(self) -> None:
+        """停止后台线程并写入所有缓存的记录，全部写入后删除溢出文件"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        if self._spill_lock is not None:
+            self._remove_spill(self.spill_path, self._spill_lock)
+            self._spill_lock = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush completed games, will retry")
+
+    def _save_each(self, batch: List[Dict]) -> List[Dict]:
+        """逐条写入批量写入失败的记录，隔离无法写入的记录
+        
+        数据库不可用时，剩余的记录放回队列头部并重新抛出异常。
+        
+        Returns:
+            List[Dict]: 写入的记录
+        """
+        saved = []
+        for i, record in enumerate(batch):
+            try:
+                GameDB.save_game_results([record])
+                saved.append(record)
+            except duckdb.OperationalError:
+                with self._lock:
+                    self._pending[:0] = batch[i:]
+                raise
+            except Exception:
+                if self._unsaved([record]):
+                    logger.exception(
+                        "Quarantining completed game %s to %s",
+                        record.get('game_id'), self.failed_path
+                    )
+                    self._quarantine(record)
+                else:
+                    logger.warning(
+                        "Completed game %s was already saved", record.get('game_id')
+                    )
+        return saved
+
+    def _announce_replayed(self, saved: List[Dict]) -> None:
+        """重放的获胜记录写入数据库后更新排行榜缓存
+        
+        排行榜缓存在启动时从数据库预热，不包含崩溃前尚未写入数据库的记录。
+        """
+        if not self._replayed:
+            return
+        for record in saved:
+            if record['game_id'] not in self._replayed:
+                continue
+            self._replayed.discard(record['game_id'])
+            if record['result']:
+                leaderboard_cache.record_win(
+                    record['difficulty'], record['user_name'],
+                    record['duration'], record['played_at']
+                )
+
+    def _quarantine(self, record: Dict) -> None:
+        """把无法写入的记录追加到隔离文件"""
+        with open(self.failed_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _claim_orphans(self) -> List[Tuple[str, Any]]:
+        """锁定所属进程已经退出的溢出文件
+        
+        包括旧版本所有进程共用的溢出文件。
+        
+        Returns:
+            List[Tuple[str, Any]]: 溢出文件路径和持有的锁
+        """
+        paths = [self._base_path]
+        for path in glob.glob(glob.escape(self._root) + '.*' + self._ext):
+            pid = path[len(self._root) + 1:len(path) - len(self._ext)]
+            if pid.isdigit() and path != self.spill_path:
+                paths.append(path)
+        claimed = []
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            lock = self._try_lock(path, blocking=False)
+            if lock is None:
+                continue
+            if os.path.exists(path):
+                claimed.append((path, lock))
+            else:
+                # 在加锁之前已经被其他进程接管
+                self._remove_spill(path, lock)
+        return claimed
+
+    @staticmethod
+    def _try_lock(path: str, blocking: bool) -> Optional[Any]:
+        """获取溢出文件旁 ``.lock`` 文件的排他锁，锁在文件关闭前一直有效
+        
+        Returns:
+            Optional[Any]: 打开的锁文件，非阻塞模式下锁被其他进程持有时返回 None
+        """
+        import fcntl
+        lock = open(path + '.lock', 'a')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            lock.close()
+            return None
+        return lock
+
+    @staticmethod
+    def _remove_spill(path: str, lock: Any) -> None:
+        """删除溢出文件和锁文件并释放锁"""
+        for name in (path, path + '.lock'):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+        lock.close()
+
+    @staticmethod
+    def _read_spill(path: str) -> List[Dict]:
+        """读取溢出文件中的记录"""
+        if not os.path.exists(path):
+            return []
+        
+        records = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # 崩溃时可能留下写了一半的最后一行
+                    logger.warning("Skipping corrupt write-behind record: %r", line)
+        return records
+
+    @staticmethod
+    def _unsaved(records: List[Dict]) -> List[Dict]:
+        """跳过已经写入数据库的记录"""
+        if not records:
+            return []
+        
+        with get_db() as conn:
+            saved = {
+                str(row[0]) for row in conn.execute(
+                    "SELECT game_id FROM game_records WHERE game_id IN (SELECT UNNEST(?::UUID[]))",
+                    [[record['game_id'] for record in records]]
+                ).fetchall()
+            }
+        return [record for record in records if record['game_id'] not in saved]
+
+    def _rewrite_spill(self, records: List[Dict]) -> None:
+        """原子地用给定记录替换溢出文件，并重新以追加方式打开"""
+        if self._spill is not None:
+            self._spill.close()
+        tmp_path = self.spill_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.spill_path)
+        self._spill = open(self.spill_path, 'a', encoding='utf-8')
+
+
+# 启用 write-behind 时由 start_write_behind 创建
+result_queue: Optional[WriteBehindQueue] = None
+
+
+def start_write_behind() -> None:
+    """按 ``MINESWEEPER_WRITE_BEHIND`` 配置启动异步批量写入"""
+    global result_queue
+    if WRITE_BEHIND and result_queue is None:
+        result_queue = WriteBehindQueue()
+        result_queue.start()
+
+
+def stop_write_behind() -> None:
+    """写入所有缓存的记录并停止异步批量写入"""
+    global result_queue
+    if result_queue is not None:
+        result_queue.close()
+        result_queue = None
+
+
+class LeaderboardCache:
+    """增量维护的排行榜缓存
+    
+    每个难度保存最佳用时最短的前 ``size`` 名用户（每个用户只保留最佳成绩），
+    启动时从数据库预热，之后每记录一次获胜就用二分插入更新，读取时不再访问
+    数据库。ETag 由排行榜内容
+    计算，因此在多个进程和重启之间保持一致。
+    
+    多个工作进程时，其他进程记录的成绩只能从数据库获得，因此缓存超过
+    ``refresh_interval`` 秒后会重新加载。
+    
+    Attributes:
+        size (int): 每个难度保存的条目数量
+        refresh_interval (Optional[float]): 重新加载的间隔，None 表示从不重新加载
+    """
+
+    def __init__(
+        self,
+        size: int = LEADERBOARD_SIZE,
+        refresh_interval: Optional[float] = None if DB_EXCLUSIVE else LEADERBOARD_REFRESH
+    ):
+        """初始化排行榜缓存
+        
+        Args:
+            size: 每个难度保存的条目数量
+            refresh_interval: 重新加载的间隔，None 表示从不重新加载
+        """
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        # difficulty -> [(用时, 完成时间, 用户名)]，按用时和完成时间排序
+        self._entries: Dict[str, List[tuple]] = {}
+        self._etags: Dict[str, str] = {}
+        self._loaded_at: Dict[str, float] = {}
+
+    def warm(self) -> None:
+        """从数据库加载所有预设难度的排行榜"""
+        for difficulty in DIFFICULTY_SETTINGS:
+            self.refresh(difficulty)
+
+    def refresh(self, difficulty: DifficultyLevel) -> None:
+        """从数据库重新加载指定难度的排行榜
+        
+        Args:
+            difficulty: 游戏难度
+        """
+        rows = GameDB.get_leaderboard(difficulty, self.size)
+        entries = [(r["best_time"], r["played_at"], r["user_name"]) for r in rows]
+        with self._lock:
+            self._set(difficulty.value, entries)
+            self._loaded_at[difficulty.value] = time.monotonic()
+
+    def get(self, difficulty: DifficultyLevel) -> Optional[tuple]:
+        """读取缓存的排行榜
+        
+        Args:
+            difficulty: 游戏难度
+            
+        Returns:
+            Optional[tuple]: ``(排行榜条目列表, ETag)``，尚未加载或需要刷新时
+                返回 None
+        """
+        with self._lock:
+            loaded_at = self._loaded_at.get(difficulty.value)
+            if loaded_at is None or (
+                self.refresh_interval is not None
+                and time.monotonic() - loaded_at > self.refresh_interval
+            ):
+                return None
+            entries = [
+                {
+                    "rank": rank,
+                    "user_name": user_name,
+                    "best_time": best_time,
+                    "played_at": played_at
+                }
+                for rank, (best_time, played_at, user_name)
+                in enumerate(self._entries[difficulty.value], start=1)
+            ]
+            return entries, self._etags[difficulty.value]
+
+    def record_win(self, difficulty: str, user_name: str, duration: int, played_at: str) -> None:
+        """记录一次获胜，只在成绩能进入排行榜且优于该用户已有成绩时更新
+        
+        Args:
+            difficulty: 游戏难度
+            user_name: 用户名
+            duration: 用时
+            played_at: 完成时间（ISO 格式）
+        """
+        with self._lock:
+            entries = self._entries.get(difficulty)
+            if entries is None:
+                return
+            entry = (duration, played_at, user_name)
+            if len(entries) >= self.size and entry >= entries[-1]:
+                return
+            previous = next((e for e in entries if e[2] == user_name), None)
+            if previous is not None and previous <= entry:
+                return
+            entries = [e for e in entries if e is not previous]
+            bisect.insort(entries, entry)
+            self._set(difficulty, entries[:self.size])
+
+    def _set(self, difficulty: str, entries: List[tuple]) -> None:
+        self._entries[difficulty] = entries
+        digest = hashlib.sha1(repr(entries).encode()).hexdigest()[:16]
+        self._etags[difficulty] = f'"{difficulty}-{digest}"'
+
+
+leaderboard_cache = LeaderboardCache()
+
+
+DB_QUERY_DURATION = Histogram(
+    "minesweeper_db_query_duration_seconds", "GameDB method duration", ("method",)
+)
+
 
 class GameDB:
     @staticmethod
@@ -64,55 +839,306 @@ class GameDB:
         mines_count: int,
         user_id: Optional[str] = None
     ) -> str:
-        """保存游戏结果"""
+        """保存游戏结果
+        
+        启用 write-behind 时记录写入溢出文件后立即返回，稍后批量写入数据库。
+        写入数据库的耗时计入 ``save_game_results``。
+        """
+        record = {
+            'game_id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'user_name': user_name,
+            'difficulty': difficulty.value,
+            'duration': duration,
+            'result': result,
+            'moves': moves,
+            'board_width': board_width,
+            'board_height': board_height,
+            'mines_count': mines_count,
+            'played_at': datetime.now().isoformat(),
+        }
+        if result_queue is not None:
+            result_queue.submit(record)
+        else:
+            GameDB.save_game_results([record])
+        if result:
+            leaderboard_cache.record_win(
+                record['difficulty'], user_name, duration, record['played_at']
+            )
+        return record['game_id']
+
+    @staticmethod
+    @timed(DB_QUERY_DURATION)
+    def save_game_results(records: List[Dict]) -> None:
+        """在一个事务中批量保存游戏记录并更新用户统计
+        
+        Args:
+            records: 按 ``RECORD_FIELDS`` 组织的游戏记录
+        """
         with get_db() as conn:
-            game_id = duckdb.default_connection.execute(
-                "SELECT uuid() as uuid"
-            ).fetchone()[0]
+            conn.begin()
+            try:
+                for start in range(0, len(records), INSERT_CHUNK):
+                    chunk = records[start:start + INSERT_CHUNK]
+                    placeholders = ", ".join(
+                        ["(" + ", ".join("?" * len(RECORD_FIELDS)) + ")"] * len(chunk)
+                    )
+                    conn.execute(
+                        f"INSERT INTO game_records ({', '.join(RECORD_FIELDS)}) "
+                        f"VALUES {placeholders}",
+                        [record[field] for record in chunk for field in RECORD_FIELDS]
+                    )
+                
+                GameDB._update_user_stats(conn, records)
+                GameDB._update_user_bests(conn, records)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    @staticmethod
+    def get_leaderboard(
+        difficulty: DifficultyLevel, limit: int = LEADERBOARD_SIZE
+    ) -> List[Dict]:
+        """获取指定难度全部时间内每个用户最佳成绩的排行榜
+        
+        耗时计入 ``get_leaderboard_page``，不单独统计。
+        """
+        return GameDB.get_leaderboard_page(difficulty, limit)["entries"]
+
+    @staticmethod
+    @timed(DB_QUERY_DURATION)
+    def get_leaderboard_page(
+        difficulty: DifficultyLevel,
+        limit: int = LEADERBOARD_SIZE,
+        window: LeaderboardWindow = LeaderboardWindow.ALL,
+        per_user: bool = True,
+        cursor: Optional[str] = None
+    ) -> Dict:
+        """分页获取排行榜
+        
+        按 (用时, 完成时间, 用户名/游戏ID) 排序，使用键集分页：游标记录上一页
+        最后一条的排序键和名次，下一页从该位置之后继续，不需要 OFFSET。
+        
+        ``per_user`` 为 True 时查询 user_bests 汇总表，每个用户只出现一次；
+        否则查询所有获胜记录（包括已归档的记录）。
+        
+        Args:
+            difficulty: 游戏难度
+            limit: 本页条目数量
+            window: 时间范围
+            per_user: 是否每个用户只保留最佳成绩
+            cursor: 上一页返回的游标
             
-            conn.execute("""
-                INSERT INTO game_records (
-                    game_id, user_id, user_name, difficulty, duration,
-                    result, moves, board_width, board_height, mines_count
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (game_id, user_id, user_name, difficulty.value, duration,
-                 result, moves, board_width, board_height, mines_count))
+        Returns:
+            Dict: ``entries`` 排行榜条目列表，``next_cursor`` 下一页游标
             
-            # 更新用户统计
-            GameDB._update_user_stats(
-                conn, user_id, user_name, difficulty.value, duration, result
+        Raises:
+            ValueError: 游标格式不正确
+        """
+        start = period_start(window, datetime.now())
+        if per_user:
+            time_column, key_column, key_type = "best_time", "user_name", "VARCHAR"
+            query = """
+                SELECT best_time, played_at, user_name, user_name
+                FROM user_bests
+                WHERE period = ? AND period_start = ? AND difficulty = ?
+            """
+            params: List[Any] = [window.value, start, difficulty.value]
+        else:
+            time_column, key_column, key_type = "duration", "game_id", "UUID"
+            query = """
+                SELECT duration, played_at, user_name, CAST(game_id AS VARCHAR)
+                FROM all_game_records
+                WHERE difficulty = ? AND result = true
+            """
+            params = [difficulty.value]
+            if window != LeaderboardWindow.ALL:
+                query += " AND played_at >= ?"
+                params.append(datetime.combine(start, datetime.min.time()))
+        
+        rank = 0
+        if cursor is not None:
+            best_time, played_at, key, rank = decode_cursor(cursor)
+            query += (
+                f" AND ({time_column}, played_at, {key_column})"
+                f" > (?, CAST(? AS TIMESTAMP), CAST(? AS {key_type}))"
             )
-            
-            return game_id
+            params += [best_time, played_at, key]
+        query += f" ORDER BY {time_column}, played_at, {key_column} LIMIT ?"
+        params.append(limit + 1)
+        
+        with get_db() as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        entries = [
+            {
+                "rank": rank + offset,
+                "user_name": row[2],
+                "best_time": row[0],
+                "played_at": row[1].isoformat()
+            }
+            for offset, row in enumerate(rows[:limit], start=1)
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(
+                (last[0], last[1].isoformat(), last[3], rank + limit)
+            )
+        return {"entries": entries, "next_cursor": next_cursor}
 
     @staticmethod
-    def get_leaderboard(difficulty: DifficultyLevel) -> List[Dict]:
-        """获取指定难度的排行榜"""
+    @timed(DB_QUERY_DURATION)
+    def get_user_rank(
+        difficulty: DifficultyLevel,
+        user_name: str,
+        window: LeaderboardWindow = LeaderboardWindow.ALL
+    ) -> Optional[Dict]:
+        """获取用户最佳成绩在排行榜中的名次
+        
+        Args:
+            difficulty: 游戏难度
+            user_name: 用户名
+            window: 时间范围
+            
+        Returns:
+            Optional[Dict]: 名次、最佳成绩、上榜人数和百分位，用户在该时间范围
+                内没有获胜记录时返回 None
+        """
+        partition = [window.value, period_start(window, datetime.now()), difficulty.value]
         with get_db() as conn:
-            result = conn.execute("""
-                SELECT 
-                    ROW_NUMBER() OVER (ORDER BY duration ASC) as rank,
-                    user_name,
-                    duration as best_time,
-                    played_at
-                FROM game_records
-                WHERE difficulty = ?
-                    AND result = true
-                ORDER BY duration ASC
-                LIMIT 10
-            """, [difficulty.value]).fetchall()
+            best = conn.execute("""
+                SELECT best_time, played_at FROM user_bests
+                WHERE period = ? AND period_start = ? AND difficulty = ?
+                    AND user_name = ?
+            """, partition + [user_name]).fetchone()
+            if best is None:
+                return None
+            ahead, total = conn.execute("""
+                SELECT
+                    COUNT(*) FILTER (
+                        WHERE (best_time, played_at, user_name) < (?, ?, ?)
+                    ),
+                    COUNT(*)
+                FROM user_bests
+                WHERE period = ? AND period_start = ? AND difficulty = ?
+            """, [best[0], best[1], user_name] + partition).fetchone()
+        
+        rank = ahead + 1
+        return {
+            "user_name": user_name,
+            "rank": rank,
+            "best_time": best[0],
+            "played_at": best[1].isoformat(),
+            "total": total,
+            "percentile": round((total - rank + 1) * 100 / total, 2)
+        }
+
+    @staticmethod
+    @timed(DB_QUERY_DURATION)
+    def archive_game_records(older_than_days: int = ARCHIVE_AFTER_DAYS) -> int:
+        """将旧的游戏记录移出数据库，写入按日期和难度分区的 Parquet 文件
+        
+        文件写入 ``ARCHIVE_DIR/played_date=<日期>/difficulty=<难度>/``，文件名
+        包含批次ID。批次记录、文件写入和删除数据库中的记录在同一事务中完成，
+        事务失败时删除本批次写入的文件。
+        
+        Args:
+            older_than_days: 归档完成时间早于该天数的记录
             
-            return [
-                {
-                    "rank": r[0],
-                    "user_name": r[1],
-                    "best_time": r[2],
-                    "played_at": r[3].isoformat()
-                }
-                for r in result
-            ]
+        Returns:
+            int: 归档的记录数量
+        """
+        cutoff = datetime.now() - timedelta(days=older_than_days)
+        batch_id = uuid.uuid4().hex
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        with get_db() as conn:
+            _remove_orphan_archives(conn)
+            conn.begin()
+            try:
+                count = conn.execute(
+                    "SELECT COUNT(*) FROM game_records WHERE played_at < ?", [cutoff]
+                ).fetchone()[0]
+                if count == 0:
+                    conn.rollback()
+                    return 0
+                conn.execute(
+                    "INSERT INTO archive_batches (batch_id, cutoff, records) VALUES (?, ?, ?)",
+                    [batch_id, cutoff, count]
+                )
+                directory = ARCHIVE_DIR.replace("'", "''")
+                conn.execute(f"""
+                    COPY (
+                        SELECT *, CAST(played_at AS DATE) AS played_date
+                        FROM game_records
+                        WHERE played_at < ?
+                    ) TO '{directory}' (
+                        FORMAT parquet,
+                        PARTITION_BY (played_date, difficulty),
+                        APPEND,
+                        FILENAME_PATTERN 'batch_{batch_id}_{{uuid}}'
+                    )
+                """, [cutoff])
+                conn.execute("DELETE FROM game_records WHERE played_at < ?", [cutoff])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                for path in _archive_files():
+                    if _archive_batch_id(path) == batch_id:
+                        os.remove(path)
+                raise
+            _refresh_archive_view(conn)
+            conn.execute("CHECKPOINT")
+        logger.info("archived %d game records older than %s", count, cutoff)
+        return count
+
+    @staticmethod
+    @timed(DB_QUERY_DURATION)
+    def rebuild_summaries() -> None:
+        """根据全部游戏记录（包括归档）重新计算 user_stats 和 user_bests
+        
+        已有用户的 user_id 保持不变。
+        """
+        per_level = ",\n".join(
+            f"COUNT(*) FILTER (WHERE difficulty = '{level.value}') AS {level.value}_games, "
+            f"COUNT(*) FILTER (WHERE difficulty = '{level.value}' AND result) "
+            f"AS {level.value}_wins, "
+            f"MIN(duration) FILTER (WHERE difficulty = '{level.value}' AND result) "
+            f"AS {level.value}_best_time"
+            for level in DIFFICULTY_SETTINGS
+        )
+        with get_db() as conn:
+            conn.begin()
+            try:
+                conn.execute(f"""
+                    CREATE TEMP TABLE rebuilt_user_stats AS
+                    SELECT
+                        COALESCE(s.user_id, CAST(uuid() AS VARCHAR)),
+                        r.*,
+                        now()
+                    FROM (
+                        SELECT
+                            user_name,
+                            {per_level},
+                            MAX(played_at) AS last_played_at
+                        FROM all_game_records
+                        GROUP BY user_name
+                    ) AS r
+                    LEFT JOIN user_stats AS s USING (user_name)
+                """)
+                conn.execute("DELETE FROM user_stats")
+                conn.execute("INSERT INTO user_stats SELECT * FROM rebuilt_user_stats")
+                conn.execute("DROP TABLE rebuilt_user_stats")
+                conn.execute("DELETE FROM user_bests")
+                _backfill_user_bests(conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
     @staticmethod
+    @timed(DB_QUERY_DURATION)
     def get_user_stats(user_name: str) -> Dict:
         """获取用户统计信息"""
         with get_db() as conn:
@@ -158,48 +1184,115 @@ class GameDB:
             }
 
     @staticmethod
-    def _update_user_stats(
-        conn,
-        user_id: Optional[str],
-        user_name: str,
-        difficulty: str,
-        duration: int,
-        result: bool
-    ):
-        """更新用户统计信息"""
-        games_field = f"{difficulty.lower()}_games"
-        wins_field = f"{difficulty.lower()}_wins"
-        best_time_field = f"{difficulty.lower()}_best_time"
-        
-        current_stats = conn.execute("""
-            SELECT * FROM user_stats WHERE user_name = ?
-        """, [user_name]).fetchone()
-        
-        if current_stats is None:
-            # 为新用户生成UUID
-            new_user_id = duckdb.default_connection.execute(
-                "SELECT uuid() as uuid"
-            ).fetchone()[0]
-            
+    def _update_user_bests(conn, records: List[Dict]) -> None:
+        """用 UPSERT 更新一批获胜记录在各个时间范围内的用户最佳成绩
+        
+        自定义游戏的尺寸各不相同，不参与排行榜。
+        
+        Args:
+            conn: 数据库连接
+            records: 按 ``RECORD_FIELDS`` 组织的游戏记录
+        """
+        bests: Dict[tuple, tuple] = {}
+        for record in records:
+            if not record['result'] or record['difficulty'] == DifficultyLevel.CUSTOM.value:
+                continue
+            played_at = datetime.fromisoformat(str(record['played_at']))
+            score = (record['duration'], played_at)
+            for window in LeaderboardWindow:
+                key = (
+                    window.value, period_start(window, played_at),
+                    record['difficulty'], record['user_name']
+                )
+                if key not in bests or score < bests[key]:
+                    bests[key] = score
+        
+        rows = list(bests.items())
+        for start in range(0, len(rows), INSERT_CHUNK):
+            chunk = rows[start:start + INSERT_CHUNK]
             conn.execute(f"""
-                INSERT INTO user_stats (
-                    user_id, user_name, {games_field}, {wins_field}, 
-                    {best_time_field}, last_played_at
-                ) VALUES (?, ?, 1, ?, ?, CURRENT_TIMESTAMP)
-            """, (new_user_id, user_name, 1 if result else 0, 
-                 duration if result else None))
-        else:
+                INSERT INTO user_bests (
+                    period, period_start, difficulty, user_name, best_time, played_at
+                ) VALUES {', '.join(['(?, ?, ?, ?, ?, ?)'] * len(chunk))}
+                ON CONFLICT (period, period_start, difficulty, user_name) DO UPDATE SET
+                    played_at = CASE
+                        WHEN (excluded.best_time, excluded.played_at) < (best_time, played_at)
+                        THEN excluded.played_at ELSE played_at END,
+                    best_time = LEAST(best_time, excluded.best_time)
+            """, [value for key, score in chunk for value in key + score])
+
+    @staticmethod
+    def _update_user_stats(conn, records: List[Dict]) -> None:
+        """用一条 UPSERT 语句更新一批游戏记录对应的用户统计
+        
+        同一批次中同一用户的记录先在内存中合并，因为 ``ON CONFLICT DO UPDATE``
+        不能在一条语句中多次更新同一行。统计只按预设难度分列，自定义游戏不计入。
+        
+        Args:
+            conn: 数据库连接
+            records: 按 ``RECORD_FIELDS`` 组织的游戏记录
+        """
+        levels = [level.value for level in DIFFICULTY_SETTINGS]
+        totals: Dict[str, Dict] = {}
+        for record in records:
+            level = record['difficulty'].lower()
+            if level not in levels:
+                continue
+            user = totals.get(record['user_name'])
+            if user is None:
+                user = totals[record['user_name']] = {
+                    'user_id': record['user_id'] or str(uuid.uuid4()),
+                    'last_played_at': record['played_at'],
+                    **{f'{level}_games': 0 for level in levels},
+                    **{f'{level}_wins': 0 for level in levels},
+                    **{f'{level}_best_time': None for level in levels},
+                }
+            user[f'{level}_games'] += 1
+            if record['result']:
+                user[f'{level}_wins'] += 1
+                best_time = user[f'{level}_best_time']
+                if best_time is None or record['duration'] < best_time:
+                    user[f'{level}_best_time'] = record['duration']
+            user['last_played_at'] = max(user['last_played_at'], record['played_at'])
+        if not totals:
+            return
+        
+        columns = ['user_id', 'user_name'] + [
+            f'{level}_{field}' for level in levels
+            for field in ('games', 'wins', 'best_time')
+        ] + ['last_played_at']
+        updates = ",\n".join(
+            f"{level}_games = {level}_games + excluded.{level}_games, "
+            f"{level}_wins = {level}_wins + excluded.{level}_wins, "
+            f"{level}_best_time = LEAST({level}_best_time, excluded.{level}_best_time)"
+            for level in levels
+        )
+        row = "(" + ", ".join("?" * len(columns)) + ")"
+        users = list(totals.items())
+        for start in range(0, len(users), INSERT_CHUNK):
+            chunk = users[start:start + INSERT_CHUNK]
             conn.execute(f"""
-                UPDATE user_stats 
-                SET {games_field} = {games_field} + 1,
-                    {wins_field} = {wins_field} + ?,
-                    {best_time_field} = CASE 
-                        WHEN {best_time_field} IS NULL OR 
-                             (? < {best_time_field} AND ? IS NOT NULL)
-                        THEN ?
-                        ELSE {best_time_field}
-                    END,
-                    last_played_at = CURRENT_TIMESTAMP,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE user_name = ?
-            """, (1 if result else 0, duration, duration, duration, user_name)) 
\ No newline at end of file
+                INSERT INTO user_stats ({', '.join(columns)})
+                VALUES {', '.join([row] * len(chunk))}
+                ON CONFLICT (user_name) DO UPDATE SET
+                    {updates},
+                    last_played_at = GREATEST(last_played_at, excluded.last_played_at),
+                    updated_at = now()
+            """, [
+                user_name if column == 'user_name' else user[column]
+                for user_name, user in chunk
+                for column in columns
+            ])
+
+
+async def archive_periodically(
+    interval: float = ARCHIVE_INTERVAL,
+    older_than_days: int = ARCHIVE_AFTER_DAYS
+) -> None:
+    """每隔 ``interval`` 秒归档一次旧的游戏记录，直到任务被取消"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_db(GameDB.archive_game_records, older_than_days)
+        except Exception:
+            logger.exception("archiving game records failed")
@@ -1,195 +1,645 @@
 import random
-from models import GameConfig, GameState, CellState, GameMove
-from typing import List, Tuple, Set
+import struct
+import time
+from array import array
+import numpy as np
+from metrics import ENGINE_BUCKETS, Histogram
+from models import (
+    GameConfig, GameState, CellState, CellUpdate, GameMove, MoveDelta, RegionState
+)
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+# 格子状态位：每个格子占用一个字节，低4位保存相邻地雷数量
+ADJACENT_MASK = 0x0F
+MINE = 0x10
+REVEALED = 0x20
+FLAGGED = 0x40
+
+# 超过该格子数量的游戏板使用 numpy 抽样地雷位置；random.sample 逐个抽样，
+# 在百万格子的游戏板上需要一秒以上
+LARGE_BOARD_CELLS = 1 << 16
+
+# 序列化头部：是否首次移动、是否结束、是否获胜、选项位、剩余地雷数、
+# 剩余安全格子数、版本号、地雷下标数量（旧版本格式使用，现在总是 0）、旗子数量；
+# 带有随机种子时种子附加在末尾
+_STATE_HEADER = struct.Struct("<BBBBiiIII")
+_SEED = struct.Struct("<Q")
+_OPTION_SEED = 0x01
+_OPTION_NO_GUESS = 0x02
+
+MOVE_DURATION = Histogram(
+    "minesweeper_move_duration_seconds", "Engine move duration by action",
+    ("action",), ENGINE_BUCKETS
+)
+CASCADE_CELLS = Histogram(
+    "minesweeper_cascade_cells", "Cells revealed by one cascading reveal", (),
+    (2, 5, 10, 25, 50, 100, 250, 500, 1000, 10000, 100000, 1000000)
+)
+MINE_PLACEMENT_DURATION = Histogram(
+    "minesweeper_mine_placement_seconds",
+    "First-move mine placement duration by layout source", ("source",), ENGINE_BUCKETS
+)
+# 预先取得子指标，移动操作的热路径上不再查找标签
+_MOVE_DURATION = {
+    action: MOVE_DURATION.labels(action) for action in ("reveal", "flag", "chord")
+}
+_MOVE_DURATION_OTHER = MOVE_DURATION.labels("other")
+
+# 第一次揭示时提供预先生成的游戏板，参数为游戏配置和第一次点击的坐标，返回
+# ``build_layout`` 格式的游戏板或 None（见 board_pool）
+LayoutProvider = Callable[[GameConfig, int, int], Optional[bytes]]
+_layout_provider: Optional[LayoutProvider] = None
+
+
+def set_layout_provider(provider: Optional[LayoutProvider]) -> None:
+    """设置第一次揭示时使用的预生成游戏板来源，None 表示总是同步生成
+
+    Args:
+        provider: 游戏板来源
+    """
+    global _layout_provider
+    _layout_provider = provider
+
+
+def _mine_positions(cells: bytearray) -> array:
+    """从游戏板的地雷位得到地雷下标"""
+    board = np.frombuffer(cells, dtype=np.uint8)
+    positions = array('I')
+    positions.frombytes(np.flatnonzero(board & MINE).astype(np.uint32).tobytes())
+    return positions
+
+
+def safe_indices(width: int, height: int, x: int, y: int) -> List[int]:
+    """获取第一次点击位置及其周围（不超出游戏板）格子的下标，按升序排列
+
+    Args:
+        width: 游戏板宽度
+        height: 游戏板高度
+        x: 点击的行索引
+        y: 点击的列索引
+
+    Returns:
+        List[int]: 需要保持安全的格子下标
+    """
+    return [
+        i * width + j
+        for i in range(max(0, x - 1), min(height, x + 2))
+        for j in range(max(0, y - 1), min(width, y + 2))
+    ]
+
+
+def build_layout(
+    width: int,
+    height: int,
+    mines: int,
+    rng: random.Random,
+    safe: Sequence[int] = ()
+) -> bytearray:
+    """随机生成只包含地雷位和相邻地雷数量的游戏板
+
+    地雷位置直接在排除安全格子后的下标范围内抽样，再映射回游戏板下标，不需要
+    构建所有位置的列表。超过 ``LARGE_BOARD_CELLS`` 的游戏板改用由 ``rng``
+    派生的 numpy 生成器抽样，结果仍由种子决定。
+
+    Args:
+        width: 游戏板宽度
+        height: 游戏板高度
+        mines: 地雷数量（超过可用格子数量时放满）
+        rng: 随机数生成器，相同种子生成相同的游戏板
+        safe: 必须保持安全的格子下标，按升序排列
+
+    Returns:
+        bytearray: 每个格子一个字节的游戏板
+    """
+    candidates = width * height - len(safe)
+    count = min(mines, candidates)
+    # 在 [0, candidates) 中抽样，加上不大于该位置的安全格子数量得到实际下标
+    if width * height > LARGE_BOARD_CELLS:
+        generator = np.random.default_rng(rng.getrandbits(64))
+        samples = generator.choice(candidates, count, replace=False).astype(np.intp)
+    else:
+        samples = np.array(rng.sample(range(candidates), count), dtype=np.intp)
+    skipped = np.array(safe, dtype=np.intp) - np.arange(len(safe))
+    positions = samples + np.searchsorted(skipped, samples, side="right")
+    return layout_from_mines(width, height, positions)
+
+
+def layout_from_mines(width: int, height: int, positions: np.ndarray) -> bytearray:
+    """根据地雷下标一次性计算所有格子的相邻地雷数量
+
+    在四周补零的地雷矩阵上把九个平移后的切片相加。
+
+    Args:
+        width: 游戏板宽度
+        height: 游戏板高度
+        positions: 地雷所在格子的下标
+
+    Returns:
+        bytearray: 每个格子一个字节的游戏板
+    """
+    mines = np.zeros((height + 2, width + 2), dtype=np.uint8)
+    rows, cols = np.divmod(np.asarray(positions, dtype=np.intp), width)
+    mines[rows + 1, cols + 1] = 1
+
+    counts = np.zeros((height, width), dtype=np.uint8)
+    for dx in range(3):
+        for dy in range(3):
+            counts += mines[dx:dx + height, dy:dy + width]
+    counts[mines[1:-1, 1:-1].astype(bool)] = MINE
+    return bytearray(counts.tobytes())
+
 
 class MinesweeperGame:
     """扫雷游戏逻辑处理类
-    
+
     处理游戏的核心逻辑，包括初始化游戏板、放置地雷、处理玩家操作等。
-    
+    游戏板以按行优先顺序排列的 ``bytearray`` 存储，格子 ``(x, y)`` 对应下标
+    ``x * width + y``，每个字节由 ``MINE``、``REVEALED``、``FLAGGED`` 状态位
+    和相邻地雷数量组成。Pydantic 的 ``GameState`` 仅在需要返回响应时构建。
+
     Attributes:
         config (GameConfig): 游戏配置信息
-        state (GameState): 当前游戏状态
+        width (int): 游戏板宽度（列数）
+        height (int): 游戏板高度（行数）
+        cells (bytearray): 紧凑存储的格子状态
+        seed (Optional[int]): 生成游戏板的随机种子，None 表示不固定
+        no_guess (bool): 是否为无需猜测模式，此时游戏板由调用方在第一次揭示前
+            通过 ``place_layout`` 提供（见 solver）
+        mine_positions (array): 地雷所在格子的下标，每个下标占用4个字节
+        flagged_positions (Set[int]): 被标记格子的下标
+        safe_remaining (int): 尚未揭示的非地雷格子数量
+        mines_remaining (int): 剩余地雷数量
+        is_game_over (bool): 游戏是否结束
+        is_won (bool): 是否获胜
+        version (int): 游戏板版本号，每次改变游戏板的操作后递增
         first_move (bool): 是否是第一次移动
     """
 
-    def __init__(self, config: GameConfig):
+    def __init__(
+        self, config: GameConfig, seed: Optional[int] = None, no_guess: bool = False
+    ):
         """初始化游戏实例
-        
+
         Args:
             config: 游戏配置，包含难度、尺寸和地雷数量
+            seed: 随机种子，相同种子和相同的第一次点击生成相同的游戏板
+            no_guess: 是否为无需猜测模式
         """
         self.config = config
+        self.seed = seed
+        self.no_guess = no_guess
+        self.width = config.width
+        self.height = config.height
         self.first_move = True
-        self.state = self._initialize_game()
+        self._initialize_game()
 
-    def _initialize_game(self) -> GameState:
+    def _initialize_game(self) -> None:
         """初始化游戏状态
-        
+
         创建空游戏板，初始状态下不放置地雷，等待第一次点击。
-        
+        """
+        self.cells = bytearray(self.width * self.height)
+        self.mine_positions = array('I')
+        self.flagged_positions: Set[int] = set()
+        self.safe_remaining = self.width * self.height - self.config.mines
+        self.mines_remaining = self.config.mines
+        self.is_game_over = False
+        self.is_won = False
+        self.version = 0
+
+    def copy(self) -> "MinesweeperGame":
+        """复制游戏，修改副本不会影响原游戏
+
+        地雷下标在放置地雷后不再修改，由副本共享；只复制游戏板和旗子。
+
+        Returns:
+            MinesweeperGame: 游戏的副本
+        """
+        game = object.__new__(type(self))
+        game.__dict__.update(self.__dict__)
+        game.cells = bytearray(self.cells)
+        game.flagged_positions = set(self.flagged_positions)
+        return game
+
+    def to_bytes(self) -> bytes:
+        """将游戏状态序列化为紧凑的字节串（不包含游戏配置）
+
+        地雷下标可以从游戏板的地雷位重新得到，不写入字节串。
+
+        Returns:
+            bytes: 头部、游戏板字节、旗子下标和随机种子依次拼接的结果
+        """
+        mines = array('I')
+        flags = array('I', self.flagged_positions)
+        options = (
+            (_OPTION_SEED if self.seed is not None else 0)
+            | (_OPTION_NO_GUESS if self.no_guess else 0)
+        )
+        header = _STATE_HEADER.pack(
+            self.first_move, self.is_game_over, self.is_won, options,
+            self.mines_remaining, self.safe_remaining, self.version,
+            len(mines), len(flags)
+        )
+        seed = b"" if self.seed is None else _SEED.pack(self.seed)
+        return b"".join((header, self.cells, mines.tobytes(), flags.tobytes(), seed))
+
+    @classmethod
+    def from_bytes(cls, config: GameConfig, data: bytes) -> "MinesweeperGame":
+        """从 ``to_bytes`` 生成的字节串恢复游戏
+
+        Args:
+            config: 游戏配置
+            data: 序列化的游戏状态
+
+        Returns:
+            MinesweeperGame: 恢复后的游戏实例
+        """
+        game = cls(config)
+        (first_move, is_game_over, is_won, options, game.mines_remaining,
+         game.safe_remaining, game.version, mine_count,
+         flag_count) = _STATE_HEADER.unpack_from(data)
+        game.first_move = bool(first_move)
+        game.is_game_over = bool(is_game_over)
+        game.is_won = bool(is_won)
+        game.no_guess = bool(options & _OPTION_NO_GUESS)
+
+        offset = _STATE_HEADER.size
+        size = len(game.cells)
+        game.cells[:] = data[offset:offset + size]
+        offset += size
+
+        # 旧版本的字节串在游戏板之后保存了地雷下标，跳过它们
+        offset += mine_count * 4
+        end = offset + flag_count * 4
+        flags = array('I')
+        flags.frombytes(data[offset:end])
+        game.flagged_positions = set(flags)
+        if not game.first_move:
+            game.mine_positions = _mine_positions(game.cells)
+        if options & _OPTION_SEED:
+            game.seed = _SEED.unpack_from(data, end)[0]
+        return game
+
+    @property
+    def state(self) -> GameState:
+        """当前游戏状态（按需构建的 Pydantic 模型）"""
+        return self.to_state()
+
+    def to_state(self) -> GameState:
+        """将紧凑游戏板转换为 ``GameState``
+
+        相同字节的格子共享同一个 ``CellState`` 实例，因此构建开销与格子种类
+        数量相关，而不是为每个格子都创建并校验一个对象。
+
         Returns:
-            GameState: 初始化后的游戏状态
+            GameState: 当前游戏状态
         """
-        # 创建空游戏板
-        board = [[CellState() for _ in range(self.config.width)] 
-                for _ in range(self.config.height)]
-        
         return GameState(
-            board=board,
-            mines_remaining=self.config.mines
+            board=self._rows(0, 0, self.height, self.width),
+            mines_remaining=self.mines_remaining,
+            is_game_over=self.is_game_over,
+            is_won=self.is_won,
+            version=self.version
         )
 
-    def _get_safe_cells(self, x: int, y: int) -> Set[Tuple[int, int]]:
-        """获取指定位置周围（包括自身）的所有格子坐标
-        
+    def to_region(self, x0: int, y0: int, x1: int, y1: int) -> RegionState:
+        """只转换游戏板的一个矩形区域，耗时与区域大小成正比
+
         Args:
-            x: 中心格子的x坐标
-            y: 中心格子的y坐标
-            
+            x0: 第一行的行索引
+            y0: 第一列的列索引
+            x1: 最后一行之后的行索引
+            y1: 最后一列之后的列索引
+
         Returns:
-            Set[Tuple[int, int]]: 需要保持安全的格子坐标集合
+            RegionState: 区域内的游戏状态
         """
-        safe_cells = set()
-        for i in range(max(0, x - 1), min(self.config.height, x + 2)):
-            for j in range(max(0, y - 1), min(self.config.width, y + 2)):
-                safe_cells.add((i, j))
-        return safe_cells
+        return RegionState(
+            board=self._rows(x0, y0, x1, y1),
+            mines_remaining=self.mines_remaining,
+            is_game_over=self.is_game_over,
+            is_won=self.is_won,
+            version=self.version,
+            x0=x0,
+            y0=y0,
+            width=self.width,
+            height=self.height
+        )
+
+    def _rows(self, x0: int, y0: int, x1: int, y1: int) -> List[List[CellState]]:
+        cache: Dict[int, CellState] = {}
+        board = []
+        for x in range(x0, x1):
+            row = []
+            base = x * self.width
+            for value in self.cells[base + y0:base + y1]:
+                cell = cache.get(value)
+                if cell is None:
+                    cell = cache[value] = CellState(
+                        is_revealed=bool(value & REVEALED),
+                        is_mine=bool(value & MINE),
+                        is_flagged=bool(value & FLAGGED),
+                        adjacent_mines=value & ADJACENT_MASK
+                    )
+                row.append(cell)
+            board.append(row)
+        return board
+
+    def to_delta(self, changed: List[int], base_version: int) -> MoveDelta:
+        """构建只包含变化格子的增量响应
+
+        Args:
+            changed: 发生变化的格子下标
+            base_version: 操作执行前的游戏板版本号
+
+        Returns:
+            MoveDelta: 增量游戏状态
+        """
+        changes = []
+        for index in changed:
+            x, y = divmod(index, self.width)
+            value = self.cells[index]
+            changes.append(CellUpdate(
+                x=x,
+                y=y,
+                is_revealed=bool(value & REVEALED),
+                is_mine=bool(value & MINE),
+                is_flagged=bool(value & FLAGGED),
+                adjacent_mines=value & ADJACENT_MASK
+            ))
+
+        return MoveDelta(
+            changes=changes,
+            mines_remaining=self.mines_remaining,
+            is_game_over=self.is_game_over,
+            is_won=self.is_won,
+            base_version=base_version,
+            version=self.version
+        )
 
     def _place_mines(self, first_x: int, first_y: int) -> None:
         """放置地雷，确保第一次点击的位置及其周围没有地雷
-        
+
+        未指定随机种子时优先使用预生成的游戏板（见 ``set_layout_provider``），
+        否则同步生成。
+
         Args:
             first_x: 第一次点击的x坐标
             first_y: 第一次点击的y坐标
         """
-        # 获取需要保持安全的格子
-        safe_cells = self._get_safe_cells(first_x, first_y)
-        
-        # 创建所有可能的位置列表（排除安全区域）
-        all_positions = [(x, y) for x in range(self.config.height) 
-                        for y in range(self.config.width)
-                        if (x, y) not in safe_cells]
-        
-        # 随机选择地雷位置
-        mine_positions = random.sample(all_positions, min(self.config.mines, len(all_positions)))
-        
-        # 放置地雷
-        for x, y in mine_positions:
-            self.state.board[x][y].is_mine = True
-
-        # 计算每个格子周围的地雷数量
-        for x in range(self.config.height):
-            for y in range(self.config.width):
-                if not self.state.board[x][y].is_mine:
-                    self.state.board[x][y].adjacent_mines = self._count_adjacent_mines(self.state.board, x, y)
+        start = time.perf_counter()
+        layout = None
+        source = "pool"
+        if self.seed is None and not self.no_guess and _layout_provider is not None:
+            layout = _layout_provider(self.config, first_x, first_y)
+        if layout is None:
+            source = "generated"
+            rng = random if self.seed is None else random.Random(self.seed)
+            layout = build_layout(
+                self.width, self.height, self.config.mines, rng,
+                safe_indices(self.width, self.height, first_x, first_y)
+            )
+        self.place_layout(layout)
+        MINE_PLACEMENT_DURATION.labels(source).observe(time.perf_counter() - start)
+
+    def place_layout(self, layout: bytes) -> None:
+        """在第一次揭示之前使用给定的游戏板放置地雷
+
+        Args:
+            layout: ``build_layout`` 格式的游戏板，第一次揭示的位置及其周围
+                必须没有地雷
+        """
+        # 合并到游戏板，保留第一次揭示之前放置的旗子
+        board = np.frombuffer(self.cells, dtype=np.uint8)
+        board |= np.frombuffer(layout, dtype=np.uint8)
+        self.mine_positions = _mine_positions(self.cells)
+        self.safe_remaining = len(self.cells) - len(self.mine_positions)
+        self.first_move = False
 
     def make_move(self, move: GameMove) -> GameState:
         """处理玩家的移动操作
-        
+
         Args:
             move: 玩家的移动操作，包含位置和操作类型
-            
+
         Returns:
             GameState: 更新后的游戏状态
         """
-        if self.state.is_game_over:
-            return self.state
+        self.apply_move(move)
+        return self.state
+
+    def apply_move(self, move: GameMove) -> List[int]:
+        """在紧凑游戏板上执行移动操作，不构建响应模型
+
+        游戏板发生变化时版本号加一。
+
+        Args:
+            move: 玩家的移动操作，包含位置和操作类型
+
+        Returns:
+            List[int]: 发生变化的格子下标
+        """
+        start = time.perf_counter()
+        changed = self._apply_move(move)
+        if changed:
+            self.version += 1
+        _MOVE_DURATION.get(move.action, _MOVE_DURATION_OTHER).observe(
+            time.perf_counter() - start
+        )
+        return changed
+
+    def apply_moves(self, moves: List[GameMove]) -> List[int]:
+        """依次执行多个移动操作，游戏结束后忽略剩余的操作
+
+        Args:
+            moves: 按顺序执行的移动操作
+
+        Returns:
+            List[int]: 发生变化的格子下标（去重，按首次变化的顺序排列）
+        """
+        changed: Dict[int, None] = {}
+        for move in moves:
+            if self.is_game_over:
+                break
+            changed.update(dict.fromkeys(self.apply_move(move)))
+        return list(changed)
+
+    def _apply_move(self, move: GameMove) -> List[int]:
+        """执行移动操作并返回发生变化的格子下标
+
+        Args:
+            move: 玩家的移动操作，包含位置和操作类型
+
+        Returns:
+            List[int]: 发生变化的格子下标
+        """
+        if self.is_game_over:
+            return []
 
         x, y = move.x, move.y
-        if not (0 <= x < self.config.height and 0 <= y < self.config.width):
-            return self.state
+        if not (0 <= x < self.height and 0 <= y < self.width):
+            return []
 
         # 如果是第一次点击且是揭示操作
         if self.first_move and move.action == "reveal":
             self._place_mines(x, y)
-            self.first_move = False
 
-        cell = self.state.board[x][y]
+        index = x * self.width + y
+        cell = self.cells[index]
 
         if move.action == "flag":
-            if not cell.is_revealed:
-                cell.is_flagged = not cell.is_flagged
-                self.state.mines_remaining += 1 if not cell.is_flagged else -1
+            if not cell & REVEALED:
+                self.cells[index] = cell ^ FLAGGED
+                if cell & FLAGGED:
+                    self.flagged_positions.discard(index)
+                    self.mines_remaining += 1
+                else:
+                    self.flagged_positions.add(index)
+                    self.mines_remaining -= 1
+                return [index]
         elif move.action == "reveal":
-            if cell.is_flagged:
-                return self.state
-            
-            if cell.is_mine:
-                self.state.is_game_over = True
-                self._reveal_all_mines()
-            else:
-                self._reveal_cell(x, y)
-                self._check_win_condition()
+            if cell & FLAGGED:
+                return []
 
-        return self.state
+            if cell & MINE:
+                self.is_game_over = True
+                return self._reveal_all_mines()
+
+            revealed = self._reveal_cell(x, y)
+            self.safe_remaining -= len(revealed)
+            self._check_win_condition()
+            return revealed
+        elif move.action == "chord":
+            return self._chord(x, y)
+
+        return []
+
+    def _chord(self, x: int, y: int) -> List[int]:
+        """揭示已揭示数字周围所有未标记的格子
+
+        只有相邻旗子数量等于该数字时才执行。每个格子按普通揭示处理（包括展开）；
+        其中有地雷（旗子标记错误）时游戏结束并揭示所有地雷。
 
-    def _count_adjacent_mines(self, board: List[List[CellState]], x: int, y: int) -> int:
-        """计算指定位置周围的地雷数量
-        
         Args:
-            board: 游戏板
-            x: x坐标
-            y: y坐标
-            
+            x: 数字所在的x坐标
+            y: 数字所在的y坐标
+
         Returns:
-            int: 周围地雷数量
+            List[int]: 发生变化的格子下标
         """
-        count = 0
-        for i in range(max(0, x - 1), min(self.config.height, x + 2)):
-            for j in range(max(0, y - 1), min(self.config.width, y + 2)):
-                if board[i][j].is_mine:
-                    count += 1
-        return count
+        cells = self.cells
+        width = self.width
+        cell = cells[x * width + y]
+        count = cell & ADJACENT_MASK
+        if not cell & REVEALED or not count:
+            return []
+
+        neighbors = []
+        flagged = 0
+        y0 = max(0, y - 1)
+        y1 = min(width, y + 2)
+        for i in range(max(0, x - 1), min(self.height, x + 2)):
+            row = i * width
+            for neighbor in range(row + y0, row + y1):
+                state = cells[neighbor]
+                if state & FLAGGED:
+                    flagged += 1
+                elif not state & REVEALED:
+                    neighbors.append(neighbor)
+        if flagged != count or not neighbors:
+            return []
+
+        revealed = []
+        hit_mine = False
+        for neighbor in neighbors:
+            if cells[neighbor] & MINE:
+                hit_mine = True
+            else:
+                revealed.extend(self._reveal_cell(*divmod(neighbor, width)))
+        self.safe_remaining -= len(revealed)
+        if hit_mine:
+            self.is_game_over = True
+            revealed.extend(self._reveal_all_mines())
+        else:
+            self._check_win_condition()
+        return revealed
 
-    def _reveal_cell(self, x: int, y: int):
+    def _reveal_cell(self, x: int, y: int) -> List[int]:
         """揭示指定位置的格子
-        
-        如果是空格子（周围没有地雷），则自动揭示周围的格子。
-        
+
+        如果是空格子（周围没有地雷），则自动揭示周围的格子。展开过程使用
+        显式栈迭代完成，不依赖递归深度；每个格子在入栈时即被标记为已揭示，
+        因此只会被处理一次，耗时与揭示的格子数量成线性关系。
+
         Args:
             x: x坐标
             y: y坐标
+
+        Returns:
+            List[int]: 本次新揭示的格子下标
         """
-        if not (0 <= x < self.config.height and 0 <= y < self.config.width):
-            return
-        
-        cell = self.state.board[x][y]
-        if cell.is_revealed or cell.is_flagged:
-            return
+        if not (0 <= x < self.height and 0 <= y < self.width):
+            return []
+
+        cells = self.cells
+        width = self.width
+        height = self.height
+
+        index = x * width + y
+        cell = cells[index]
+        if cell & (REVEALED | FLAGGED):
+            return []
+
+        cells[index] = cell | REVEALED
+        revealed = [index]
 
-        cell.is_revealed = True
-        
         # 如果是空格子，自动揭示周围的格子
-        if cell.adjacent_mines == 0:
-            for i in range(max(0, x - 1), min(self.config.height, x + 2)):
-                for j in range(max(0, y - 1), min(self.config.width, y + 2)):
-                    if (i, j) != (x, y):
-                        self._reveal_cell(i, j)
+        if cell & ADJACENT_MASK:
+            return revealed
 
-    def _reveal_all_mines(self):
+        stack = [index]
+        while stack:
+            cx, cy = divmod(stack.pop(), width)
+            y0 = max(0, cy - 1)
+            y1 = min(width, cy + 2)
+            for i in range(max(0, cx - 1), min(height, cx + 2)):
+                row = i * width
+                for neighbor in range(row + y0, row + y1):
+                    cell = cells[neighbor]
+                    if cell & (REVEALED | FLAGGED):
+                        continue
+                    cells[neighbor] = cell | REVEALED
+                    revealed.append(neighbor)
+                    if not cell & ADJACENT_MASK:
+                        stack.append(neighbor)
+
+        CASCADE_CELLS.observe(len(revealed))
+        return revealed
+
+    def _reveal_all_mines(self) -> List[int]:
         """揭示所有地雷
-        
-        游戏结束时调用，显示所有地雷的位置
-        """
-        for x in range(self.config.height):
-            for y in range(self.config.width):
-                cell = self.state.board[x][y]
-                if cell.is_mine:
-                    cell.is_revealed = True
-                # 标记错误的旗子（标记为地雷但实际不是地雷的位置）
-                elif cell.is_flagged:
-                    cell.is_revealed = True
+
+        游戏结束时调用，显示所有地雷的位置。只访问地雷和旗子所在的格子。
+
+        Returns:
+            List[int]: 新揭示的格子下标
+        """
+        cells = self.cells
+        revealed = []
+        # 地雷以及标记错误的旗子（标记为地雷但实际不是地雷的位置）
+        for index in (*self.mine_positions, *self.flagged_positions):
+            cell = cells[index]
+            if not cell & REVEALED:
+                cells[index] = cell | REVEALED
+                revealed.append(index)
+        return revealed
 
     def _check_win_condition(self):
         """检查是否获胜
-        
-        当所有非地雷格子都被揭示时，玩家获胜
-        """
-        for x in range(self.config.height):
-            for y in range(self.config.width):
-                cell = self.state.board[x][y]
-                if not cell.is_mine and not cell.is_revealed:
-                    return
-        self.state.is_won = True
-        self.state.is_game_over = True 
\ No newline at end of file
+
+        当所有非地雷格子都被揭示时，玩家获胜。依赖揭示过程维护的
+        ``safe_remaining`` 计数，耗时为常数。
+        """
+        if self.safe_remaining == 0:
+            self.is_won = True
+            self.is_game_over = True
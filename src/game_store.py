@@ -0,0 +1,587 @@
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+from game_logic import MinesweeperGame
+from models import GameConfig
+
+# 活跃游戏存储的默认配置，可通过环境变量覆盖
+MAX_GAMES = int(os.getenv('MINESWEEPER_MAX_GAMES', '10000'))
+MAX_MEMORY = int(os.getenv('MINESWEEPER_GAME_MEMORY_MB', '512')) * 1024 * 1024
+GAME_TTL = float(os.getenv('MINESWEEPER_GAME_TTL', '3600'))
+
+# uvicorn 工作进程数量；多于一个时默认使用进程间共享的存储
+WORKERS = int(os.getenv('MINESWEEPER_WORKERS', '1'))
+# 存储后端："memory" 或 "sqlite"
+GAME_STORE = os.getenv('MINESWEEPER_GAME_STORE', 'sqlite' if WORKERS > 1 else 'memory')
+GAME_STORE_PATH = os.getenv(
+    'MINESWEEPER_GAME_STORE_PATH',
+    str(Path.home() / '.minesweeper' / 'active_games.sqlite')
+)
+
+# 共享存储等待其他进程释放 SQLite 写锁的最长时间（秒），超时后请求返回 503
+GAME_STORE_BUSY_TIMEOUT = float(os.getenv('MINESWEEPER_GAME_STORE_BUSY_TIMEOUT', '2.0'))
+
+# 乐观并发冲突时的最大重试次数
+MAX_UPDATE_RETRIES = 5
+
+T = TypeVar('T')
+
+# 每个游戏实例除游戏板以外的固定开销（对象、属性字典等）的估计值
+_GAME_OVERHEAD = 1024
+# 地雷下标数组中每个元素的开销（uint32）
+_MINE_OVERHEAD = 4
+
+
+def estimate_game_size(config: GameConfig) -> int:
+    """估算一个游戏实例占用的内存字节数
+
+    Args:
+        config: 游戏配置
+
+    Returns:
+        int: 估算的字节数
+    """
+    return config.width * config.height + config.mines * _MINE_OVERHEAD + _GAME_OVERHEAD
+
+
+class GameConflictError(Exception):
+    """多次重试后仍然与其他请求的并发修改冲突"""
+
+
+class GameStoreBusyError(Exception):
+    """等待其他进程释放共享存储的写锁超时"""
+
+
+class GameStore:
+    """有界的活跃游戏存储
+
+    按最近访问顺序保存游戏，空闲超过 ``ttl`` 秒的游戏会被移除；游戏数量或
+    估算内存超过上限时，淘汰最久未访问的游戏。游戏ID单调递增，不会重复。
+
+    Attributes:
+        max_games (int): 最多保存的游戏数量
+        max_memory (int): 游戏占用内存的上限（字节）
+        ttl (float): 游戏的最长空闲时间（秒）
+        memory (int): 当前估算的内存占用（字节）
+        expired (int): 因空闲超时被移除的游戏数量
+        evicted (int): 因超出容量被淘汰的游戏数量
+    """
+
+    # 调用不会阻塞，可以直接在事件循环中执行
+    blocking = False
+
+    def __init__(
+        self,
+        max_games: int = MAX_GAMES,
+        max_memory: int = MAX_MEMORY,
+        ttl: float = GAME_TTL,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """初始化游戏存储
+
+        Args:
+            max_games: 最多保存的游戏数量
+            max_memory: 游戏占用内存的上限（字节）
+            ttl: 游戏的最长空闲时间（秒）
+            clock: 时间函数，默认为 ``time.monotonic``
+        """
+        self.max_games = max_games
+        self.max_memory = max_memory
+        self.ttl = ttl
+        self.memory = 0
+        self.expired = 0
+        self.evicted = 0
+        self._clock = clock
+        self._ids = itertools.count(1)
+        # game_id -> (游戏实例, 估算大小, 最后访问时间)，按访问顺序排列
+        self._games: "OrderedDict[int, Tuple[MinesweeperGame, int, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def __contains__(self, game_id: int) -> bool:
+        return self.get(game_id) is not None
+
+    def add(self, game: MinesweeperGame) -> int:
+        """保存新游戏并分配游戏ID
+
+        Args:
+            game: 游戏实例
+
+        Returns:
+            int: 新的游戏ID
+        """
+        game_id = next(self._ids)
+        self.put(game_id, game)
+        return game_id
+
+    def put(self, game_id: int, game: MinesweeperGame) -> None:
+        """保存或替换指定ID的游戏
+
+        Args:
+            game_id: 游戏ID
+            game: 游戏实例
+        """
+        now = self._clock()
+        self._remove(game_id)
+        size = estimate_game_size(game.config)
+        self._games[game_id] = (game, size, now)
+        self.memory += size
+        self._expire(now)
+        self._evict()
+
+    def get(self, game_id: int) -> Optional[MinesweeperGame]:
+        """获取游戏并刷新其访问时间
+
+        Args:
+            game_id: 游戏ID
+
+        Returns:
+            Optional[MinesweeperGame]: 游戏实例，不存在或已过期时返回 None
+        """
+        entry = self._games.get(game_id)
+        if entry is None:
+            return None
+
+        game, size, last_access = entry
+        now = self._clock()
+        if now - last_access > self.ttl:
+            self._remove(game_id)
+            self.expired += 1
+            return None
+
+        self._games[game_id] = (game, size, now)
+        self._games.move_to_end(game_id)
+        return game
+
+    def update(
+        self, game_id: int, operation: Callable[[MinesweeperGame], T]
+    ) -> Optional[Tuple[MinesweeperGame, T]]:
+        """在游戏上执行修改操作
+
+        内存存储中的游戏就是实例本身，修改后无需写回。
+
+        Args:
+            game_id: 游戏ID
+            operation: 修改游戏的函数，其返回值会一并返回
+
+        Returns:
+            Optional[Tuple[MinesweeperGame, T]]: 修改后的游戏和操作的返回值，
+                游戏不存在时返回 None
+        """
+        game = self.get(game_id)
+        if game is None:
+            return None
+        return game, operation(game)
+
+    def stats(self) -> Dict[str, int]:
+        """获取存储的统计信息
+
+        Returns:
+            Dict[str, int]: 游戏数量、内存占用和淘汰计数
+        """
+        return {
+            "games": len(self._games),
+            "memory": self.memory,
+            "max_games": self.max_games,
+            "max_memory": self.max_memory,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def _remove(self, game_id: int) -> None:
+        entry = self._games.pop(game_id, None)
+        if entry is not None:
+            self.memory -= entry[1]
+
+    def _expire(self, now: float) -> None:
+        """从最久未访问的一端开始移除空闲超时的游戏"""
+        while self._games:
+            game_id, (_, _, last_access) = next(iter(self._games.items()))
+            if now - last_access <= self.ttl:
+                break
+            self._remove(game_id)
+            self.expired += 1
+
+    def _evict(self) -> None:
+        """淘汰最久未访问的游戏，直到数量和内存都不超过上限
+
+        最近保存的游戏总是保留，即使它本身超过了内存上限。
+        """
+        while len(self._games) > 1 and (
+            len(self._games) > self.max_games or self.memory > self.max_memory
+        ):
+            game_id = next(iter(self._games))
+            self._remove(game_id)
+            self.evicted += 1
+
+
+class SQLiteGameStore:
+    """基于 SQLite 的共享活跃游戏存储
+
+    游戏以 ``MinesweeperGame.to_bytes`` 的紧凑格式保存在本地 SQLite 文件中
+    （WAL 模式），多个 uvicorn 工作进程可以打开同一个文件，因此任意进程都能
+    处理任意游戏。每行带有单调递增的 ``revision``，写回时只在 revision 未变
+    时生效，冲突时重新读取并重试操作。
+
+    每个进程在内存中缓存最近访问的游戏及其 revision（总大小不超过
+    ``cache_memory``）。读取时先只查询 revision，与缓存一致时直接使用缓存的
+    实例，不再读取和反序列化整个游戏板。缓存的实例可能同时被多个请求读取，
+    因此从不修改：``update`` 在副本上执行操作，写回成功后用副本替换缓存。
+
+    所有方法都可能等待其他进程释放 SQLite 的写锁（最多 ``busy_timeout`` 秒），
+    需要在线程池中调用，不能在事件循环中直接调用（见 ``blocking``）。
+
+    空闲超时、数量上限和内存上限与 ``GameStore`` 含义相同，由各进程定期执行
+    清理；``expired`` 和 ``evicted`` 计数只统计当前进程执行的清理。
+
+    Attributes:
+        path (str): SQLite 数据库文件路径
+        max_games (int): 最多保存的游戏数量
+        max_memory (int): 游戏占用内存的上限（字节）
+        ttl (float): 游戏的最长空闲时间（秒）
+        cache_memory (int): 进程内缓存的内存上限（字节）
+        expired (int): 因空闲超时被移除的游戏数量
+        evicted (int): 因超出容量被淘汰的游戏数量
+    """
+
+    # 调用会阻塞，需要在线程池中执行
+    blocking = True
+    # 两次清理之间的最小间隔（秒）
+    SWEEP_INTERVAL = 1.0
+    # 只读访问时刷新访问时间的最小间隔（秒）
+    TOUCH_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        path: str = GAME_STORE_PATH,
+        max_games: int = MAX_GAMES,
+        max_memory: int = MAX_MEMORY,
+        ttl: float = GAME_TTL,
+        clock: Callable[[], float] = time.time,
+        busy_timeout: float = GAME_STORE_BUSY_TIMEOUT,
+        cache_memory: int = MAX_MEMORY // max(WORKERS, 1)
+    ):
+        """初始化共享存储
+
+        Args:
+            path: SQLite 数据库文件路径
+            max_games: 最多保存的游戏数量
+            max_memory: 游戏占用内存的上限（字节）
+            ttl: 游戏的最长空闲时间（秒）
+            clock: 时间函数，各进程之间需要一致，默认为 ``time.time``
+            busy_timeout: 等待其他进程释放写锁的最长时间（秒）
+            cache_memory: 进程内缓存的内存上限（字节）
+        """
+        self.path = path
+        self.max_games = max_games
+        self.max_memory = max_memory
+        self.ttl = ttl
+        self.cache_memory = cache_memory
+        self.expired = 0
+        self.evicted = 0
+        self._clock = clock
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        # game_id -> (游戏实例, revision, 估算大小)，按访问顺序排列
+        self._cache: "OrderedDict[int, Tuple[MinesweeperGame, int, int]]" = OrderedDict()
+        self._cached_memory = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS active_games (
+                game_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                config TEXT NOT NULL,
+                state BLOB NOT NULL,
+                revision INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_active_games_last_access
+            ON active_games (last_access)
+        """)
+
+    def __len__(self) -> int:
+        with self._locked():
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM active_games"
+            ).fetchone()[0]
+
+    def __contains__(self, game_id: int) -> bool:
+        return self.get(game_id) is not None
+
+    def add(self, game: MinesweeperGame) -> int:
+        """保存新游戏并分配游戏ID
+
+        ID 由 SQLite 的 AUTOINCREMENT 分配，在所有进程之间唯一且不会复用。
+        保存后不能再修改 ``game``，它会作为缓存的实例返回给其他请求。
+
+        Args:
+            game: 游戏实例
+
+        Returns:
+            int: 新的游戏ID
+
+        Raises:
+            GameStoreBusyError: 等待写锁超时
+        """
+        now = self._clock()
+        state = game.to_bytes()
+        with self._locked():
+            cursor = self._conn.execute("""
+                INSERT INTO active_games (config, state, revision, size, last_access)
+                VALUES (?, ?, 0, ?, ?)
+            """, (game.config.model_dump_json(), state,
+                  estimate_game_size(game.config), now))
+            game_id = cursor.lastrowid
+            self._remember(game_id, game, 0)
+        self._sweep(now)
+        return game_id
+
+    def put(self, game_id: int, game: MinesweeperGame) -> None:
+        """保存或替换指定ID的游戏
+
+        保存后不能再修改 ``game``，它会作为缓存的实例返回给其他请求。
+
+        Args:
+            game_id: 游戏ID
+            game: 游戏实例
+
+        Raises:
+            GameStoreBusyError: 等待写锁超时
+        """
+        now = self._clock()
+        state = game.to_bytes()
+        with self._locked():
+            revision = self._conn.execute("""
+                INSERT INTO active_games
+                    (game_id, config, state, revision, size, last_access)
+                VALUES (?, ?, ?, 0, ?, ?)
+                ON CONFLICT (game_id) DO UPDATE SET
+                    config = excluded.config,
+                    state = excluded.state,
+                    revision = active_games.revision + 1,
+                    size = excluded.size,
+                    last_access = excluded.last_access
+                RETURNING revision
+            """, (game_id, game.config.model_dump_json(), state,
+                  estimate_game_size(game.config), now)).fetchone()[0]
+            self._remember(game_id, game, revision)
+        self._sweep(now)
+
+    def get(self, game_id: int) -> Optional[MinesweeperGame]:
+        """读取游戏的当前状态
+
+        返回的实例可能同时被其他请求使用，不能修改，需要修改时使用 ``update``。
+
+        Args:
+            game_id: 游戏ID
+
+        Returns:
+            Optional[MinesweeperGame]: 游戏实例，不存在或已过期时返回 None
+
+        Raises:
+            GameStoreBusyError: 等待写锁超时
+        """
+        loaded = self._load(game_id)
+        return None if loaded is None else loaded[0]
+
+    def update(
+        self, game_id: int, operation: Callable[[MinesweeperGame], T]
+    ) -> Optional[Tuple[MinesweeperGame, T]]:
+        """以乐观并发方式在游戏上执行修改操作
+
+        在当前状态的副本上执行操作；游戏板版本发生变化时写回，并要求
+        revision 未被其他请求修改，否则重新读取并重试。
+
+        Args:
+            game_id: 游戏ID
+            operation: 修改游戏的函数，其返回值会一并返回
+
+        Returns:
+            Optional[Tuple[MinesweeperGame, T]]: 修改后的游戏和操作的返回值，
+                游戏不存在时返回 None
+
+        Raises:
+            GameConflictError: 重试多次后仍然冲突
+            GameStoreBusyError: 等待写锁超时
+        """
+        for _ in range(MAX_UPDATE_RETRIES):
+            loaded = self._load(game_id)
+            if loaded is None:
+                return None
+
+            current, revision = loaded
+            game = current.copy()
+            result = operation(game)
+            if game.version == current.version:
+                return game, result
+
+            state = game.to_bytes()
+            with self._locked():
+                cursor = self._conn.execute("""
+                    UPDATE active_games
+                    SET state = ?, revision = revision + 1, last_access = ?
+                    WHERE game_id = ? AND revision = ?
+                """, (state, self._clock(), game_id, revision))
+                if cursor.rowcount == 1:
+                    self._remember(game_id, game, revision + 1)
+                    return game, result
+
+        raise GameConflictError(f"Game {game_id} is being modified concurrently")
+
+    def stats(self) -> Dict[str, int]:
+        """获取存储的统计信息
+
+        Returns:
+            Dict[str, int]: 游戏数量、内存占用、淘汰计数和进程内缓存的游戏数量
+
+        Raises:
+            GameStoreBusyError: 等待写锁超时
+        """
+        with self._locked():
+            games, memory = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM active_games"
+            ).fetchone()
+            cached = len(self._cache)
+        return {
+            "games": games,
+            "memory": memory,
+            "max_games": self.max_games,
+            "max_memory": self.max_memory,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "cached": cached,
+        }
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """持有连接锁，并把等待写锁超时转换为 ``GameStoreBusyError``"""
+        with self._lock:
+            try:
+                yield
+            except sqlite3.OperationalError as e:
+                if 'locked' in str(e) or 'busy' in str(e):
+                    raise GameStoreBusyError(str(e)) from e
+                raise
+
+    def _remember(self, game_id: int, game: MinesweeperGame, revision: int) -> None:
+        """缓存游戏的指定 revision，已经缓存了更新的 revision 时忽略（需要持有锁）"""
+        entry = self._cache.pop(game_id, None)
+        if entry is not None:
+            self._cached_memory -= entry[2]
+            if entry[1] > revision:
+                game, revision = entry[0], entry[1]
+        size = estimate_game_size(game.config)
+        self._cache[game_id] = (game, revision, size)
+        self._cached_memory += size
+        while len(self._cache) > 1 and self._cached_memory > self.cache_memory:
+            _, (_, _, size) = self._cache.popitem(last=False)
+            self._cached_memory -= size
+
+    def _forget(self, game_id: int) -> None:
+        """移除缓存的游戏（需要持有锁）"""
+        entry = self._cache.pop(game_id, None)
+        if entry is not None:
+            self._cached_memory -= entry[2]
+
+    def _load(self, game_id: int) -> Optional[Tuple[MinesweeperGame, int]]:
+        """读取游戏及其 revision，必要时刷新访问时间或移除过期游戏
+
+        revision 与缓存一致时直接返回缓存的实例。
+        """
+        now = self._clock()
+        with self._locked():
+            row = self._conn.execute("""
+                SELECT revision, last_access FROM active_games WHERE game_id = ?
+            """, (game_id,)).fetchone()
+            if row is None:
+                self._forget(game_id)
+                return None
+
+            revision, last_access = row
+            if now - last_access > self.ttl:
+                cursor = self._conn.execute("""
+                    DELETE FROM active_games WHERE game_id = ? AND revision = ?
+                """, (game_id, revision))
+                self.expired += cursor.rowcount
+                self._forget(game_id)
+                return None
+            if now - last_access > self.TOUCH_INTERVAL:
+                self._conn.execute("""
+                    UPDATE active_games SET last_access = ?
+                    WHERE game_id = ? AND last_access < ?
+                """, (now, game_id, now))
+
+            entry = self._cache.get(game_id)
+            if entry is not None and entry[1] == revision:
+                self._cache.move_to_end(game_id)
+                return entry[0], revision
+
+            row = self._conn.execute("""
+                SELECT config, state, revision FROM active_games WHERE game_id = ?
+            """, (game_id,)).fetchone()
+            if row is None:
+                self._forget(game_id)
+                return None
+
+        config, state, revision = row
+        game = MinesweeperGame.from_bytes(GameConfig.model_validate_json(config), state)
+        with self._lock:
+            self._remember(game_id, game, revision)
+        return game, revision
+
+    def _sweep(self, now: float) -> None:
+        """移除空闲超时的游戏，并淘汰超出数量或内存上限的最久未访问游戏"""
+        if now - self._last_sweep < self.SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+
+        with self._locked():
+            cursor = self._conn.execute(
+                "DELETE FROM active_games WHERE last_access < ?", (now - self.ttl,)
+            )
+            self.expired += cursor.rowcount
+
+            # 保留最近访问的游戏，直到数量或累计内存超过上限
+            cursor = self._conn.execute("""
+                DELETE FROM active_games WHERE game_id IN (
+                    SELECT game_id FROM (
+                        SELECT
+                            game_id,
+                            ROW_NUMBER() OVER w AS position,
+                            SUM(size) OVER w AS total
+                        FROM active_games
+                        WINDOW w AS (ORDER BY last_access DESC, game_id DESC)
+                    )
+                    WHERE position > 1 AND (position > ? OR total > ?)
+                )
+            """, (self.max_games, self.max_memory))
+            self.evicted += cursor.rowcount
+
+
+def create_game_store():
+    """根据 ``MINESWEEPER_GAME_STORE`` 创建活跃游戏存储
+
+    Returns:
+        Union[GameStore, SQLiteGameStore]: 进程内存储或共享存储
+    """
+    if GAME_STORE == 'memory':
+        return GameStore()
+    if GAME_STORE == 'sqlite':
+        return SQLiteGameStore()
+    raise ValueError(f"Unknown game store backend: {GAME_STORE}")
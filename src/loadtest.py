@@ -0,0 +1,783 @@
+"""HTTP 负载测试
+
+用法::
+
+    python loadtest.py run [--players 数量] [--duration 秒] [--profile 曲线]
+                           [--difficulty 难度 ...] [--think-time 秒] [--users 数量]
+                           [--url 地址] [--env 名称=值 ...] [--db-path 路径]
+                           [--output 结果.json] [--compare 基准.json] [--threshold 比例]
+    python loadtest.py diff 基准.json 结果.json [--threshold 比例]
+
+``run`` 在本地启动 ``main.py``（或使用 ``--url`` 指定的已运行服务），模拟大量
+并发的虚拟玩家。每个玩家循环进行完整的游戏流程：创建游戏，用与 benchmark 相同
+的机器人反复调用 ``/move``（增量响应），提交 ``/complete``，再读取排行榜、
+用户统计和用户名次。
+
+并发玩家数量按 ``--profile`` 随时间变化：
+
+- ``steady``：始终为 ``--players``
+- ``ramp``：从 0 线性增加到 ``--players``
+- ``step``：分四个阶段，每阶段增加四分之一
+- ``spike``：平时为十分之一，中间十分之一的时间达到 ``--players``
+- ``秒:人数,秒:人数,...``：自定义的分段线性曲线
+
+减少玩家时，被停止的玩家完成当前这局游戏后退出。
+
+结果包括每个接口的吞吐量、p50/p95/p99 延迟和错误数，以及按时间采样的玩家数、
+吞吐量和服务进程（包括工作进程）的常驻内存。``--compare`` 和 ``diff`` 逐项对比
+两次的结果，有指标变差超过 ``--threshold`` 时以状态码 1 退出。
+
+客户端只使用标准库实现 HTTP/1.1，每个玩家使用一个保持的连接。负载生成器和
+服务运行在同一台机器上时会相互争用 CPU，确定部署规模时应在另一台机器上运行
+``--url`` 模式。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from benchmark import Bot, Histogram, compare
+from game_logic import FLAGGED, REVEALED
+
+# 等待服务启动的最长时间（秒）
+STARTUP_TIMEOUT = 60.0
+# 测试结束后等待玩家完成当前游戏的最长时间（秒）
+DRAIN_TIMEOUT = 30.0
+# 等待服务正常退出的最长时间（秒）
+SHUTDOWN_TIMEOUT = 30.0
+# 连接失败后玩家重试前等待的时间（秒）
+RETRY_DELAY = 0.5
+# 调整玩家数量的间隔（秒）
+CONTROL_INTERVAL = 0.05
+
+# 对比结果时检查的指标：(路径, 数值越大越好)
+SUMMARY_METRICS: List[Tuple[str, bool]] = [
+    ("requests_per_second", True),
+    ("error_rate", False),
+    ("peak_rss_mb", False),
+]
+ENDPOINT_METRICS: List[Tuple[str, bool]] = [
+    ("requests_per_second", True),
+    ("latency_ms.p50", False),
+    ("latency_ms.p95", False),
+    ("latency_ms.p99", False),
+    ("error_rate", False),
+]
+
+
+class HttpError(Exception):
+    """HTTP 响应格式错误"""
+
+
+class HttpClient:
+    """单个保持连接上的最小 HTTP/1.1 客户端
+
+    Attributes:
+        host (str): 服务地址
+        port (int): 服务端口
+    """
+
+    def __init__(self, host: str, port: int):
+        """初始化客户端，第一次请求时建立连接
+
+        Args:
+            host: 服务地址
+            port: 服务端口
+        """
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(
+        self, method: str, path: str, body: Optional[Any] = None
+    ) -> Tuple[int, bytes]:
+        """发送请求并读取完整响应
+
+        复用的连接已被服务端关闭时重新连接并重试一次。
+
+        Args:
+            method: 请求方法
+            path: 请求路径（包括查询参数）
+            body: 请求体，以 JSON 编码
+
+        Returns:
+            Tuple[int, bytes]: 状态码和响应体
+
+        Raises:
+            OSError: 无法连接
+            HttpError: 响应格式错误
+        """
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+        )
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        message = (head + "\r\n").encode() + payload
+
+        reused = self._writer is not None
+        if not reused:
+            await self._connect()
+        try:
+            return await self._exchange(message)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+        await self._connect()
+        return await self._exchange(message)
+
+    async def close(self) -> None:
+        """关闭连接"""
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def _exchange(self, message: bytes) -> Tuple[int, bytes]:
+        reader = self._reader
+        self._writer.write(message)
+        await self._writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by server")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise HttpError(f"malformed status line {status_line!r}")
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            data = b"".join(chunks)
+        else:
+            data = await reader.readexactly(int(headers.get("content-length", "0")))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, data
+
+
+class Recorder:
+    """按接口统计请求
+
+    Attributes:
+        latency (Dict[str, Histogram]): 每个接口的延迟
+        statuses (Dict[str, Counter]): 每个接口的状态码计数，连接失败记为 0
+        errors (Counter): 每个接口不符合预期的响应数量
+        requests (int): 完成的请求总数
+        games (int): 完成的游戏数量
+        wins (int): 获胜的游戏数量
+    """
+
+    def __init__(self):
+        self.latency: Dict[str, Histogram] = {}
+        self.statuses: Dict[str, Counter] = {}
+        self.errors: Counter = Counter()
+        self.requests = 0
+        self.games = 0
+        self.wins = 0
+
+    def record(self, route: str, status: int, elapsed_ns: int, ok: bool) -> None:
+        """记录一次请求
+
+        Args:
+            route: 接口名称，例如 ``POST /game/{game_id}/move``
+            status: 状态码，连接失败时为 0
+            elapsed_ns: 耗时（纳秒）
+            ok: 状态码是否符合预期
+        """
+        if route not in self.latency:
+            self.latency[route] = Histogram()
+            self.statuses[route] = Counter()
+        self.latency[route].add(elapsed_ns)
+        self.statuses[route][status] += 1
+        self.requests += 1
+        if not ok:
+            self.errors[route] += 1
+
+
+class Server:
+    """在子进程中运行的 ``main.py``
+
+    Attributes:
+        port (int): 监听端口
+        log_path (Path): 服务输出的日志文件
+    """
+
+    def __init__(self, port: int, env: Dict[str, str], log_path: Path):
+        """初始化服务
+
+        Args:
+            port: 监听端口
+            env: 附加的环境变量
+            log_path: 服务输出的日志文件
+        """
+        self.port = port
+        self.log_path = log_path
+        self._env = {**os.environ, **env, "MINESWEEPER_HOST": "127.0.0.1",
+                     "MINESWEEPER_PORT": str(port)}
+        self._process: Optional[subprocess.Popen] = None
+
+    def start(self) -> None:
+        """启动服务并等待可以响应请求
+
+        Raises:
+            RuntimeError: 服务退出或超时仍未就绪
+        """
+        with open(self.log_path, "wb") as log:
+            self._process = subprocess.Popen(
+                [sys.executable, "main.py"], cwd=Path(__file__).parent, env=self._env,
+                stdout=log, stderr=subprocess.STDOUT
+            )
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"server exited, see {self.log_path}")
+            try:
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{self.port}/game/config", timeout=1
+                ):
+                    return
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"server not ready after {STARTUP_TIMEOUT}s, see {self.log_path}")
+
+    def stop(self) -> None:
+        """发送 SIGINT 让服务写入缓存的数据后退出，超时后强制结束"""
+        if self._process is None or self._process.poll() is not None:
+            return
+        self._process.send_signal(signal.SIGINT)
+        try:
+            self._process.wait(SHUTDOWN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+
+    @property
+    def returncode(self) -> Optional[int]:
+        """服务的退出状态，仍在运行时为 None"""
+        return self._process.poll() if self._process is not None else None
+
+    def rss_mb(self) -> float:
+        """读取服务进程及其所有子进程的常驻内存之和
+
+        Returns:
+            float: 常驻内存（MB），进程已退出时为 0
+        """
+        children: Dict[int, List[int]] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # 进程名可能包含空格，父进程号位于右括号之后的第二个字段
+                    parent = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+
+        total_kb = 0
+        stack = [self._process.pid]
+        while stack:
+            pid = stack.pop()
+            stack.extend(children.get(pid, ()))
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            total_kb += int(line.split()[1])
+                            break
+            except OSError:
+                continue
+        return total_kb / 1024
+
+
+def parse_profile(spec: str, players: int, duration: float) -> Callable[[float], int]:
+    """解析并发玩家数量随时间变化的曲线
+
+    Args:
+        spec: 预设名称或 ``秒:人数,秒:人数,...``
+        players: 预设曲线的最大玩家数量
+        duration: 测试时长（秒）
+
+    Returns:
+        Callable[[float], int]: 从开始经过的秒数到目标玩家数量的函数
+
+    Raises:
+        ValueError: 曲线格式错误
+    """
+    presets = {
+        "steady": [(0, players), (duration, players)],
+        "ramp": [(0, 0), (duration, players)],
+        "step": [
+            point
+            for step in range(4)
+            for point in ((duration * step / 4, players * (step + 1) / 4),
+                          (duration * (step + 1) / 4, players * (step + 1) / 4))
+        ],
+        "spike": [
+            (0, players / 10), (duration * 0.45, players / 10),
+            (duration * 0.45, players), (duration * 0.55, players),
+            (duration * 0.55, players / 10), (duration, players / 10),
+        ],
+    }
+    if spec in presets:
+        points = presets[spec]
+    else:
+        points = []
+        for part in spec.split(","):
+            seconds, _, count = part.partition(":")
+            points.append((float(seconds), float(count)))
+        if not points or any(b[0] < a[0] for a, b in zip(points, points[1:])):
+            raise ValueError(f"invalid profile {spec!r}")
+
+    def target(elapsed: float) -> int:
+        # 同一时间点有多个值时取最后一个，用于表示阶跃
+        previous = points[0]
+        for point in points:
+            if point[0] > elapsed:
+                span = point[0] - previous[0]
+                fraction = (elapsed - previous[0]) / span if span else 1.0
+                return round(previous[1] + (point[1] - previous[1]) * fraction)
+            previous = point
+        return round(previous[1])
+
+    return target
+
+
+async def _call(
+    client: HttpClient,
+    recorder: Recorder,
+    route: str,
+    method: str,
+    path: str,
+    body: Optional[Any] = None,
+    expected: Sequence[int] = (200,)
+) -> Tuple[int, bytes]:
+    start = time.perf_counter_ns()
+    try:
+        status, data = await client.request(method, path, body)
+    except (OSError, asyncio.IncompleteReadError, HttpError):
+        recorder.record(route, 0, time.perf_counter_ns() - start, False)
+        raise
+    recorder.record(route, status, time.perf_counter_ns() - start, status in expected)
+    return status, data
+
+
+async def play_session(
+    client: HttpClient,
+    recorder: Recorder,
+    rng: random.Random,
+    difficulty: str,
+    user_name: str,
+    think_time: float
+) -> None:
+    """完成一局游戏的完整流程
+
+    Args:
+        client: 玩家的连接
+        recorder: 请求统计
+        rng: 玩家的随机数生成器
+        difficulty: 游戏难度
+        user_name: 提交结果和读取统计使用的用户名
+        think_time: 两次操作之间的平均等待时间（秒）
+    """
+    status, data = await _call(
+        client, recorder, "POST /game/new/{difficulty}", "POST", f"/game/new/{difficulty}"
+    )
+    if status != 200:
+        return
+    created = json.loads(data)
+    game_id = created["game_id"]
+    board = created["state"]["board"]
+    height, width = len(board), len(board[0])
+
+    # 根据增量响应维护可见的游戏板，格式与引擎相同
+    cells = bytearray(width * height)
+    bot = Bot(width, height, cells, rng)
+    started = time.monotonic()
+    moves = 0
+    won = False
+    while True:
+        index, action = bot.next_move()
+        status, data = await _call(
+            client, recorder, "POST /game/{game_id}/move", "POST",
+            f"/game/{game_id}/move?delta=true",
+            {"x": index // width, "y": index % width, "action": action}
+        )
+        if status != 200:
+            return
+        delta = json.loads(data)
+        changed = []
+        for change in delta["changes"]:
+            changed_index = change["x"] * width + change["y"]
+            cells[changed_index] = (
+                (REVEALED if change["is_revealed"] else 0)
+                | (FLAGGED if change["is_flagged"] else 0)
+                | change["adjacent_mines"]
+            )
+            changed.append(changed_index)
+        bot.observe(index, action, changed)
+        moves += 1
+        if delta["is_game_over"]:
+            won = delta["is_won"]
+            break
+        if think_time > 0:
+            await asyncio.sleep(rng.uniform(0, 2 * think_time))
+
+    recorder.games += 1
+    recorder.wins += won
+    await _call(
+        client, recorder, "POST /game/{game_id}/complete", "POST",
+        f"/game/{game_id}/complete",
+        {"user_name": user_name, "duration": max(1, round(time.monotonic() - started)),
+         "moves": moves}
+    )
+    await _call(
+        client, recorder, "GET /leaderboard/{difficulty}", "GET", f"/leaderboard/{difficulty}"
+    )
+    await _call(client, recorder, "GET /stats/{user_name}", "GET", f"/stats/{user_name}")
+    # 没有获胜记录的用户返回 404
+    await _call(
+        client, recorder, "GET /leaderboard/{difficulty}/rank/{user_name}", "GET",
+        f"/leaderboard/{difficulty}/rank/{user_name}", expected=(200, 404)
+    )
+
+
+async def player(
+    host: str,
+    port: int,
+    recorder: Recorder,
+    stop: asyncio.Event,
+    rng: random.Random,
+    args: argparse.Namespace
+) -> None:
+    """虚拟玩家：循环进行游戏，直到 ``stop`` 被设置后完成当前这局
+
+    Args:
+        host: 服务地址
+        port: 服务端口
+        recorder: 请求统计
+        stop: 停止信号
+        rng: 玩家的随机数生成器
+        args: 命令行参数
+    """
+    client = HttpClient(host, port)
+    try:
+        while not stop.is_set():
+            try:
+                await play_session(
+                    client, recorder, rng, rng.choice(args.difficulty),
+                    f"loadtest-{rng.randrange(args.users)}", args.think_time
+                )
+            except (OSError, asyncio.IncompleteReadError, HttpError):
+                await client.close()
+                await asyncio.sleep(RETRY_DELAY)
+    finally:
+        await client.close()
+
+
+async def run_load(
+    host: str, port: int, args: argparse.Namespace, server: Optional[Server]
+) -> Dict[str, Any]:
+    """按曲线调整并发玩家数量，运行 ``args.duration`` 秒
+
+    Args:
+        host: 服务地址
+        port: 服务端口
+        args: 命令行参数
+        server: 本地启动的服务，用于采样内存；使用 ``--url`` 时为 None
+
+    Returns:
+        Dict[str, Any]: 汇总、各接口的指标和时间线
+    """
+    profile = parse_profile(args.profile, args.players, args.duration)
+    recorder = Recorder()
+    seeds = random.Random(args.seed)
+    loop = asyncio.get_running_loop()
+    tasks: List[asyncio.Task] = []
+    active: List[asyncio.Event] = []
+    timeline: List[Dict[str, Any]] = []
+    peak_players = 0
+
+    start = loop.time()
+    next_sample = 0.0
+    sampled_requests = 0
+    while True:
+        elapsed = loop.time() - start
+        if elapsed >= args.duration:
+            break
+        target = profile(elapsed)
+        while len(active) < target:
+            stop = asyncio.Event()
+            active.append(stop)
+            tasks.append(asyncio.create_task(player(
+                host, port, recorder, stop, random.Random(seeds.getrandbits(64)), args
+            )))
+        while len(active) > target:
+            active.pop().set()
+        peak_players = max(peak_players, len(active))
+        if elapsed >= next_sample:
+            timeline.append({
+                "t": round(elapsed, 3),
+                "players": len(active),
+                "requests_per_second": (
+                    (recorder.requests - sampled_requests) / args.sample_interval
+                    if timeline else 0.0
+                ),
+                "rss_mb": server.rss_mb() if server is not None else None,
+            })
+            sampled_requests = recorder.requests
+            next_sample += args.sample_interval
+        await asyncio.sleep(CONTROL_INTERVAL)
+    duration = loop.time() - start
+
+    for stop in active:
+        stop.set()
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=DRAIN_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    endpoints = {}
+    for route in sorted(recorder.latency):
+        count = recorder.latency[route].count
+        endpoints[route] = {
+            "requests": count,
+            "requests_per_second": count / duration,
+            "errors": recorder.errors[route],
+            "error_rate": recorder.errors[route] / count,
+            "statuses": {str(status): n for status, n in sorted(recorder.statuses[route].items())},
+            "latency_ms": recorder.latency[route].summary_ms(),
+        }
+    errors = sum(recorder.errors.values())
+    rss = [sample["rss_mb"] for sample in timeline if sample["rss_mb"] is not None]
+    summary = {
+        "duration_seconds": duration,
+        "requests": recorder.requests,
+        "requests_per_second": recorder.requests / duration,
+        "errors": errors,
+        "error_rate": errors / recorder.requests if recorder.requests else 0.0,
+        "games": recorder.games,
+        "wins": recorder.wins,
+        "peak_players": peak_players,
+        "peak_rss_mb": max(rss) if rss else None,
+        "final_rss_mb": rss[-1] if rss else None,
+    }
+    return {"summary": summary, "endpoints": endpoints, "timeline": timeline}
+
+
+def diff(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> bool:
+    """对比两次负载测试的汇总和各接口指标
+
+    Args:
+        baseline: 之前的结果
+        current: 本次的结果
+        threshold: 允许变差的比例
+
+    Returns:
+        bool: 是否有指标变差超过 ``threshold``
+    """
+    regressed = compare(
+        {"summary": baseline["summary"]}, {"summary": current["summary"]}, threshold,
+        SUMMARY_METRICS
+    )
+    return compare(
+        baseline["endpoints"], current["endpoints"], threshold, ENDPOINT_METRICS
+    ) or regressed
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _raise_open_files_limit() -> None:
+    # 每个玩家占用一个连接，尽量提高可以打开的文件数量
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def _metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": {
+            name: value for name, value in vars(args).items()
+            if name not in ("command", "output", "compare", "threshold")
+        },
+    }
+
+
+def run(args: argparse.Namespace) -> bool:
+    """执行 ``run`` 子命令
+
+    Returns:
+        bool: 与 ``--compare`` 对比时是否有指标变差
+    """
+    _raise_open_files_limit()
+    server = None
+    data_dir = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        data_dir = Path(tempfile.mkdtemp(prefix="minesweeper-loadtest-"))
+        env = dict(item.split("=", 1) for item in args.env)
+        env.setdefault("MINESWEEPER_DB_PATH", args.db_path or str(data_dir / "minesweeper.db"))
+        host, port = "127.0.0.1", _free_port()
+        server = Server(port, env, data_dir / "server.log")
+        server.start()
+
+    try:
+        result = asyncio.run(run_load(host, port, args, server))
+    finally:
+        if server is not None:
+            server.stop()
+            if server.returncode not in (0, -signal.SIGINT):
+                print(f"server exited with {server.returncode}, "
+                      f"log kept in {server.log_path}", file=sys.stderr)
+                data_dir = None
+        if data_dir is not None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    result = {"meta": _metadata(args), **result}
+    summary = result["summary"]
+    print(
+        f"{summary['requests']} requests in {summary['duration_seconds']:.1f}s "
+        f"({summary['requests_per_second']:.1f}/s), {summary['errors']} errors, "
+        f"{summary['games']} games, peak {summary['peak_players']} players",
+        file=sys.stderr
+    )
+    for route, metrics in result["endpoints"].items():
+        latency = metrics["latency_ms"]
+        print(
+            f"  {route:<46} {metrics['requests_per_second']:>9.1f}/s  "
+            f"p50 {latency['p50']:8.2f}  p95 {latency['p95']:8.2f}  "
+            f"p99 {latency['p99']:8.2f} ms  errors {metrics['errors']}",
+            file=sys.stderr
+        )
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            return diff(json.load(f), result, args.threshold)
+    return False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="扫雷服务负载测试")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="运行负载测试")
+    run_parser.add_argument("--players", type=int, default=100, help="最大并发玩家数量（默认 100）")
+    run_parser.add_argument("--duration", type=float, default=60, help="测试时长，单位秒（默认 60）")
+    run_parser.add_argument(
+        "--profile", default="steady",
+        help="玩家数量曲线：steady、ramp、step、spike 或 秒:人数,...（默认 steady）"
+    )
+    run_parser.add_argument(
+        "--difficulty", nargs="*", default=["beginner", "intermediate", "expert"],
+        help="玩家随机选择的难度（默认全部）"
+    )
+    run_parser.add_argument(
+        "--think-time", type=float, default=0.0, help="两次操作之间的平均等待时间，单位秒（默认 0）"
+    )
+    run_parser.add_argument("--users", type=int, default=1000, help="不同用户名的数量（默认 1000）")
+    run_parser.add_argument("--seed", type=int, default=0, help="玩家随机数的种子（默认 0）")
+    run_parser.add_argument(
+        "--sample-interval", type=float, default=1.0, help="时间线的采样间隔，单位秒（默认 1）"
+    )
+    run_parser.add_argument("--url", help="测试已运行的服务，例如 http://127.0.0.1:8000")
+    run_parser.add_argument(
+        "--env", action="append", default=[], metavar="NAME=VALUE",
+        help="传给本地启动的服务的环境变量，可以重复"
+    )
+    run_parser.add_argument("--db-path", help="本地启动的服务使用的数据库文件（默认为临时文件）")
+    run_parser.add_argument("--output", help="结果 JSON 文件，默认输出到标准输出")
+    run_parser.add_argument("--compare", help="与之前的结果 JSON 文件对比")
+    run_parser.add_argument(
+        "--threshold", type=float, default=0.1, help="对比时允许变差的比例（默认 0.1）"
+    )
+
+    diff_parser = commands.add_parser("diff", help="对比两次负载测试的结果")
+    diff_parser.add_argument("baseline", help="之前的结果 JSON 文件")
+    diff_parser.add_argument("current", help="本次的结果 JSON 文件")
+    diff_parser.add_argument(
+        "--threshold", type=float, default=0.1, help="允许变差的比例（默认 0.1）"
+    )
+    args = parser.parse_args()
+
+    if args.command == "run":
+        parse_profile(args.profile, args.players, args.duration)
+        regressed = run(args)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressed = diff(baseline, current, args.threshold)
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,72 @@
 import os
+import hmac
+import math
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
+from fastapi import (
+    Depends, FastAPI, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from models import (
     GameConfig, GameState, GameMove, DifficultyLevel, 
     DIFFICULTY_SETTINGS, NewGameResponse, LeaderboardEntry,
-    UserStats, GameResult
+    CellPosition, CellProbability, Hint, ProfilerSettings,
+    LeaderboardPage, LeaderboardWindow, UserRank,
+    UserStats, GameResult, MoveDelta, RegionState, Viewport
+)
+from game_logic import MINE_PLACEMENT_DURATION, MinesweeperGame, set_layout_provider
+from metrics import CallbackMetric, MetricsMiddleware, render as render_metrics
+from profiler import ProfilerMiddleware, profiler
+from board_pool import POOL_SIZE, board_pool
+from solver import analyze, no_guess_generator
+from board_codec import (
+    BOARD_MEDIA_TYPE, accepts_board_encoding, encode_board, encode_delta,
+    encode_region, visible_cells
 )
-from game_logic import MinesweeperGame
-from typing import Dict, Union, List
-from db import GameDB, init_db
+from typing import Any, Callable, Dict, Union, List, Optional, Tuple, TypeVar
+from pydantic import ValidationError
+from db import (
+    ARCHIVE_INTERVAL, LEADERBOARD_MAX_PAGE, LEADERBOARD_SIZE, GameDB,
+    archive_periodically, database, init_db, leaderboard_cache, run_db,
+    start_write_behind, stop_write_behind
+)
+from game_store import GameConflictError, GameStoreBusyError, WORKERS, create_game_store
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：预热排行榜缓存，启动异步批量写入、定期归档和游戏板池；
+    退出时写入缓存的游戏记录并关闭连接
+    
+    排行榜缓存需要在启动异步批量写入之前预热：重放的获胜记录写入数据库后
+    才更新缓存（见 ``WriteBehindQueue``）。
+    """
+    no_guess_generator.start()
+    await run_db(leaderboard_cache.warm)
+    await run_db(start_write_behind)
+    if POOL_SIZE > 0:
+        board_pool.start()
+        set_layout_provider(board_pool.take)
+    archiver = (
+        asyncio.create_task(archive_periodically()) if ARCHIVE_INTERVAL > 0 else None
+    )
+    yield
+    if archiver is not None:
+        archiver.cancel()
+    if POOL_SIZE > 0:
+        set_layout_provider(None)
+        board_pool.close()
+    no_guess_generator.close()
+    await run_db(stop_write_behind)
+    database.close()
 
 app = FastAPI(
     title="Minesweeper API",
     description="扫雷游戏后端API服务",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 初始化数据库
@@ -34,9 +84,50 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+# 活跃游戏存储（带 LRU 淘汰和空闲超时），多进程部署时使用共享存储
+games = create_game_store()
+
+T = TypeVar("T")
+
+CallbackMetric(
+    "minesweeper_active_games", "Games held in the active game store",
+    lambda: games.stats()["games"]
+)
+CallbackMetric(
+    "minesweeper_game_store_memory_bytes", "Estimated memory used by active games",
+    lambda: games.stats()["memory"]
+)
+CallbackMetric(
+    "minesweeper_evicted_games_total", "Games evicted from the active game store",
+    lambda: games.stats()["evicted"], "counter"
+)
+CallbackMetric(
+    "minesweeper_expired_games_total", "Idle games expired from the active game store",
+    lambda: games.stats()["expired"], "counter"
+)
+
+# 单次批量请求允许的最大操作数量
+MAX_BATCH_MOVES = 10000
+
+# 自定义游戏板的最大边长，以及地雷密度（地雷数量 / 格子数量）的范围；密度过低时
+# 第一次揭示可能展开大部分游戏板
+CUSTOM_MAX_SIZE = int(os.getenv('MINESWEEPER_CUSTOM_MAX_SIZE', '2000'))
+CUSTOM_MIN_DENSITY = float(os.getenv('MINESWEEPER_CUSTOM_MIN_DENSITY', '0.1'))
+CUSTOM_MAX_DENSITY = float(os.getenv('MINESWEEPER_CUSTOM_MAX_DENSITY', '0.35'))
+# 单个响应最多包含的格子数量：更大的游戏板只按视口返回区域，也不提供提示
+MAX_REGION_CELLS = int(os.getenv('MINESWEEPER_MAX_REGION_CELLS', '16384'))
+# 没有指定视口时大游戏板返回的左上角区域的边长
+INITIAL_REGION_SIZE = 32
+
+# 管理接口的访问令牌（请求头 X-Admin-Token），未设置时需要令牌的接口不可用
+ADMIN_TOKEN = os.getenv('MINESWEEPER_ADMIN_TOKEN')
 
-# Store active games in memory
-games = {}
+# 直接运行时服务监听的地址和端口
+HOST = os.getenv('MINESWEEPER_HOST', '0.0.0.0')
+PORT = int(os.getenv('MINESWEEPER_PORT', '8000'))
 
 # ┌─────────────────────────┐
 # │ Serving the frontend UI │
@@ -79,45 +170,480 @@ async def get_game_config():
             "beginner": DIFFICULTY_SETTINGS[DifficultyLevel.BEGINNER],
             "intermediate": DIFFICULTY_SETTINGS[DifficultyLevel.INTERMEDIATE],
             "expert": DIFFICULTY_SETTINGS[DifficultyLevel.EXPERT]
+        },
+        "custom": {
+            "max_size": CUSTOM_MAX_SIZE,
+            "min_density": CUSTOM_MIN_DENSITY,
+            "max_density": CUSTOM_MAX_DENSITY,
+            "max_region_cells": MAX_REGION_CELLS
         }
     }
 
+def custom_config(
+    width: Optional[int], height: Optional[int], mines: Optional[int]
+) -> GameConfig:
+    """校验自定义游戏板的尺寸和地雷数量
+    
+    地雷数量需要满足密度范围，并且至少留出第一次点击的 3x3 安全区域。
+    
+    Args:
+        width: 游戏板宽度
+        height: 游戏板高度
+        mines: 地雷数量
+        
+    Returns:
+        GameConfig: 自定义游戏配置
+        
+    Raises:
+        HTTPException: 参数缺失或地雷数量超出范围时抛出400错误
+    """
+    if width is None or height is None or mines is None:
+        raise HTTPException(
+            status_code=400, detail="Custom games require width, height and mines"
+        )
+    cells = width * height
+    low = max(1, math.ceil(cells * CUSTOM_MIN_DENSITY))
+    high = min(int(cells * CUSTOM_MAX_DENSITY), cells - 9)
+    if not low <= mines <= high:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A {width}x{height} board needs between {low} and {high} mines"
+        )
+    return GameConfig(
+        difficulty=DifficultyLevel.CUSTOM, width=width, height=height, mines=mines
+    )
+
+def check_viewport(viewport: Viewport) -> Viewport:
+    """校验视口不为空且不超过 ``MAX_REGION_CELLS``
+    
+    Raises:
+        HTTPException: 视口为空时抛出400错误，过大时抛出413错误
+    """
+    if (min(viewport.x0, viewport.y0) < 0
+            or viewport.x0 >= viewport.x1 or viewport.y0 >= viewport.y1):
+        raise HTTPException(status_code=400, detail="Invalid viewport")
+    if (viewport.x1 - viewport.x0) * (viewport.y1 - viewport.y0) > MAX_REGION_CELLS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {MAX_REGION_CELLS} cells per viewport"
+        )
+    return viewport
+
+def get_viewport(
+    x0: Optional[int] = None,
+    y0: Optional[int] = None,
+    x1: Optional[int] = None,
+    y1: Optional[int] = None
+) -> Optional[Viewport]:
+    """从查询参数读取客户端视口，四个参数需要同时提供
+    
+    Raises:
+        HTTPException: 只提供部分参数或视口无效时抛出400错误，视口过大时抛出413错误
+    """
+    values = (x0, y0, x1, y1)
+    if all(value is None for value in values):
+        return None
+    if any(value is None for value in values):
+        raise HTTPException(
+            status_code=400, detail="Viewport requires x0, y0, x1 and y1"
+        )
+    return check_viewport(Viewport(x0=x0, y0=y0, x1=x1, y1=y1))
+
+def clip_viewport(game: MinesweeperGame, viewport: Viewport) -> Tuple[int, int, int, int]:
+    """把视口限制在游戏板范围内，返回 ``(x0, y0, x1, y1)``"""
+    x1 = min(viewport.x1, game.height)
+    y1 = min(viewport.y1, game.width)
+    return min(viewport.x0, x1), min(viewport.y0, y1), x1, y1
+
+def response_bounds(
+    game: MinesweeperGame, viewport: Optional[Viewport]
+) -> Optional[Tuple[int, int, int, int]]:
+    """确定响应中包含的格子范围
+    
+    指定视口时为截去游戏板以外部分的视口；没有指定视口且游戏板超过
+    ``MAX_REGION_CELLS`` 时为左上角 ``INITIAL_REGION_SIZE`` 见方的区域；
+    否则返回 None，表示整个游戏板。
+    """
+    if viewport is not None:
+        return clip_viewport(game, viewport)
+    if game.width * game.height > MAX_REGION_CELLS:
+        return (
+            0, 0, min(game.height, INITIAL_REGION_SIZE), min(game.width, INITIAL_REGION_SIZE)
+        )
+    return None
+
+def in_viewport(
+    changed: List[int], width: int, bounds: Tuple[int, int, int, int]
+) -> List[int]:
+    """只保留位于视口内的格子下标"""
+    x0, y0, x1, y1 = bounds
+    low, high = x0 * width, x1 * width
+    return [index for index in changed if low <= index < high and y0 <= index % width < y1]
+
+def check_ranked(difficulty: DifficultyLevel) -> None:
+    """自定义游戏不参与排行榜，查询时抛出404错误"""
+    if difficulty == DifficultyLevel.CUSTOM:
+        raise HTTPException(status_code=404, detail="Custom games are not ranked")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """校验管理接口的访问令牌，不匹配或未配置令牌时抛出403错误"""
+    if (not ADMIN_TOKEN or x_admin_token is None
+            or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN)):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+async def store_call(func: Callable[..., T], *args: Any) -> T:
+    """调用活跃游戏存储的方法
+    
+    共享存储的调用可能等待其他进程释放 SQLite 写锁，在线程池中执行，不阻塞
+    事件循环；进程内存储直接调用。
+    
+    Raises:
+        HTTPException: 等待共享存储的写锁超时时抛出503错误
+    """
+    try:
+        if games.blocking:
+            return await asyncio.to_thread(profiler.follow, func, *args)
+        return func(*args)
+    except GameStoreBusyError as e:
+        raise HTTPException(status_code=503, detail=f"Game store is busy: {e}")
+
+async def get_game(game_id: int) -> MinesweeperGame:
+    """获取活跃游戏，不存在时抛出404错误
+    
+    返回的实例可能与其他请求共享，不能修改。
+    """
+    game = await store_call(games.get, game_id)
+    if game is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return game
+
+async def play(
+    game_id: int,
+    apply: Callable[[MinesweeperGame], List[int]],
+    layout: Optional[bytes] = None
+) -> Tuple[MinesweeperGame, List[int], int]:
+    """在存储中的游戏上执行操作
+    
+    Args:
+        game_id: 游戏ID
+        apply: 执行操作并返回发生变化的格子下标的函数
+        layout: 游戏尚未放置地雷时使用的游戏板（见 ``first_layout``）
+        
+    Returns:
+        Tuple[MinesweeperGame, List[int], int]: 游戏、发生变化的格子下标和
+            操作执行前的游戏板版本号
+        
+    Raises:
+        HTTPException: 游戏不存在时抛出404错误，并发修改冲突时抛出409错误，
+            等待共享存储的写锁超时时抛出503错误
+    """
+    def operation(game: MinesweeperGame) -> Tuple[int, List[int]]:
+        base_version = game.version
+        if layout is not None and game.first_move:
+            game.place_layout(layout)
+        return base_version, apply(game)
+    
+    try:
+        updated = await store_call(games.update, game_id, operation)
+    except GameConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    game, (base_version, changed) = updated
+    return game, changed, base_version
+
+async def first_layout(game_id: int, moves: List[GameMove]) -> Optional[bytes]:
+    """无需猜测模式的游戏在第一次揭示之前生成游戏板
+    
+    生成需要模拟求解，在进程池中执行，不阻塞事件循环。
+    
+    Args:
+        game_id: 游戏ID
+        moves: 即将执行的移动操作
+        
+    Returns:
+        Optional[bytes]: 第一个有效揭示操作对应的游戏板，不需要时返回 None
+    """
+    game = await store_call(games.get, game_id)
+    if game is None or not game.no_guess or not game.first_move:
+        return None
+    for move in moves:
+        if (move.action == "reveal"
+                and 0 <= move.x < game.height and 0 <= move.y < game.width):
+            with MINE_PLACEMENT_DURATION.labels("no_guess").time():
+                return await no_guess_generator.generate(
+                    game.config, move.x, move.y, game.seed
+                )
+    return None
+
+def wants_board_encoding(request: Request) -> bool:
+    """客户端是否通过 Accept 请求头协商了二进制游戏板格式"""
+    return accepts_board_encoding(request.headers.get("accept", ""))
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """``If-None-Match`` 请求头是否匹配给定的 ETag
+    
+    请求头是逗号分隔的 ETag 列表或 ``*``，按弱比较逐个判断是否相等。
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+def board_response(game: MinesweeperGame, game_id: int) -> Response:
+    """以二进制格式返回完整游戏板"""
+    return Response(
+        content=encode_board(game, game_id), media_type=BOARD_MEDIA_TYPE
+    )
+
+def state_response(
+    request: Request,
+    game: MinesweeperGame,
+    game_id: int,
+    viewport: Optional[Viewport]
+) -> Union[GameState, RegionState, Response]:
+    """按客户端要求的格式返回完整游戏板，或只返回视口内的区域
+    
+    没有指定视口且游戏板超过 ``MAX_REGION_CELLS`` 时返回左上角
+    ``INITIAL_REGION_SIZE`` 见方的区域，客户端根据其中的游戏板尺寸再按视口获取。
+    
+    Args:
+        request: 请求对象，用于内容协商
+        game: 游戏实例
+        game_id: 游戏ID
+        viewport: 客户端视口
+        
+    Returns:
+        Union[GameState, RegionState, Response]: 完整状态、区域状态或二进制响应
+    """
+    bounds = response_bounds(game, viewport)
+    if bounds is None:
+        if wants_board_encoding(request):
+            return board_response(game, game_id)
+        return game.state
+    if wants_board_encoding(request):
+        return Response(
+            content=encode_region(game, game_id, *bounds), media_type=BOARD_MEDIA_TYPE
+        )
+    return game.to_region(*bounds)
+
+def move_response(
+    request: Request,
+    game: MinesweeperGame,
+    game_id: int,
+    changed: List[int],
+    base_version: int,
+    delta: bool,
+    viewport: Optional[Viewport] = None
+) -> Union[GameState, RegionState, MoveDelta, Response]:
+    """按客户端要求的格式返回移动操作的结果
+    
+    增量响应和完整响应包含相同范围内的格子（见 ``response_bounds``），超过
+    ``MAX_REGION_CELLS`` 的游戏板不会返回整个游戏板上变化的格子。
+    
+    Args:
+        request: 请求对象，用于内容协商
+        game: 游戏实例
+        game_id: 游戏ID
+        changed: 发生变化的格子下标
+        base_version: 操作执行前的游戏板版本号
+        delta: 是否只返回发生变化的单元格
+        viewport: 客户端视口，指定时只返回视口内的格子
+        
+    Returns:
+        Union[GameState, RegionState, MoveDelta, Response]: 完整状态、区域状态、
+            增量状态或二进制响应
+    """
+    binary = wants_board_encoding(request)
+    if delta:
+        bounds = response_bounds(game, viewport)
+        if bounds is not None:
+            changed = in_viewport(changed, game.width, bounds)
+        if binary:
+            return Response(
+                content=encode_delta(game, game_id, changed, base_version),
+                media_type=BOARD_MEDIA_TYPE
+            )
+        return game.to_delta(changed, base_version)
+    return state_response(request, game, game_id, viewport)
+
 @app.post("/game/new/{difficulty}")
-async def new_game(difficulty: DifficultyLevel) -> NewGameResponse:
+async def new_game(
+    difficulty: DifficultyLevel,
+    request: Request,
+    seed: Optional[int] = Query(None, ge=0, lt=2 ** 64),
+    no_guess: bool = False,
+    width: Optional[int] = Query(None, ge=1, le=CUSTOM_MAX_SIZE),
+    height: Optional[int] = Query(None, ge=1, le=CUSTOM_MAX_SIZE),
+    mines: Optional[int] = Query(None, ge=1),
+    viewport: Optional[Viewport] = Depends(get_viewport)
+) -> NewGameResponse:
     """创建新游戏
     
     Args:
         difficulty: 游戏难度级别
+        request: 请求对象，用于内容协商
+        seed: 随机种子，相同种子和相同的第一次点击生成相同的游戏板
+        no_guess: 是否生成从第一次点击开始只靠逻辑推理即可完成的游戏板
+        width: 自定义游戏板的宽度
+        height: 自定义游戏板的高度
+        mines: 自定义游戏板的地雷数量
+        viewport: 客户端视口，指定时初始状态只包含视口内的区域
         
     Returns:
         NewGameResponse: 包含游戏ID和初始状态的响应
+        
+    Raises:
+        HTTPException: 自定义参数无效或自定义游戏请求无需猜测模式时抛出400错误
     """
-    config = DIFFICULTY_SETTINGS[difficulty]
-    game = MinesweeperGame(config)
-    game_id = len(games)  # Simple incrementing ID (use UUID in production)
-    games[game_id] = game
-    return NewGameResponse(game_id=game_id, state=game.state)
+    if difficulty == DifficultyLevel.CUSTOM:
+        if no_guess:
+            # 生成无需猜测的游戏板需要反复模拟求解，只支持固定难度
+            raise HTTPException(
+                status_code=400, detail="No-guess mode is not available for custom games"
+            )
+        config = custom_config(width, height, mines)
+    else:
+        config = DIFFICULTY_SETTINGS[difficulty]
+    game = MinesweeperGame(config, seed, no_guess)
+    game_id = await store_call(games.add, game)
+    state = state_response(request, game, game_id, viewport)
+    if isinstance(state, Response):
+        return state
+    return NewGameResponse(game_id=game_id, state=state)
 
 @app.post("/game/{game_id}/move")
-async def make_move(game_id: int, move: GameMove) -> GameState:
+async def make_move(
+    game_id: int,
+    move: GameMove,
+    request: Request,
+    delta: bool = False,
+    viewport: Optional[Viewport] = Depends(get_viewport)
+) -> Union[RegionState, GameState, MoveDelta]:
     """执行游戏操作
     
     Args:
         game_id: 游戏ID
         move: 移动操作信息
+        request: 请求对象，用于内容协商
+        delta: 是否只返回本次操作改变的单元格
+        viewport: 客户端视口，指定时只返回视口内的格子
         
     Returns:
-        GameState: 更新后的游戏状态
+        Union[RegionState, GameState, MoveDelta]: 更新后的游戏状态或视口内的
+            区域，或增量状态
         
     Raises:
-        HTTPException: 当游戏ID不存在时抛出404错误
+        HTTPException: 当游戏ID不存在时抛出404错误，并发修改冲突时抛出409错误
     """
-    if game_id not in games:
-        raise HTTPException(status_code=404, detail="Game not found")
+    layout = await first_layout(game_id, [move])
+    game, changed, base_version = await play(
+        game_id, lambda game: game.apply_move(move), layout
+    )
+    return move_response(
+        request, game, game_id, changed, base_version, delta, viewport
+    )
+
+@app.post("/game/{game_id}/moves")
+async def make_moves(
+    game_id: int,
+    moves: List[GameMove],
+    request: Request,
+    delta: bool = False,
+    viewport: Optional[Viewport] = Depends(get_viewport)
+) -> Union[RegionState, GameState, MoveDelta]:
+    """批量执行游戏操作
+    
+    按顺序执行所有操作，游戏结束后忽略剩余操作，并返回一个合并后的结果。
+    
+    Args:
+        game_id: 游戏ID
+        moves: 按顺序执行的移动操作列表
+        request: 请求对象，用于内容协商
+        delta: 是否只返回这批操作改变的单元格
+        viewport: 客户端视口，指定时只返回视口内的格子
+        
+    Returns:
+        Union[RegionState, GameState, MoveDelta]: 最终的游戏状态或视口内的
+            区域，或合并后的增量状态
+        
+    Raises:
+        HTTPException: 当游戏ID不存在时抛出404错误，并发修改冲突时抛出409错误，
+            操作数量过多时抛出413错误
+    """
+    if len(moves) > MAX_BATCH_MOVES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BATCH_MOVES} moves per batch"
+        )
+    
+    layout = await first_layout(game_id, moves)
+    game, changed, base_version = await play(
+        game_id, lambda game: game.apply_moves(moves), layout
+    )
+    return move_response(
+        request, game, game_id, changed, base_version, delta, viewport
+    )
+
+@app.websocket("/game/{game_id}/ws")
+async def game_session(websocket: WebSocket, game_id: int):
+    """游戏会话 WebSocket 通道
+    
+    客户端在同一连接上持续发送 ``GameMove`` JSON 消息，服务器按顺序为每条
+    消息返回一个 ``MoveDelta``；消息格式错误时返回 ``{"detail": ...}`` 并保持
+    连接。每条消息都会重新查找游戏，因此通过 REST 重新开始游戏后连接仍然有效。
+    
+    客户端也可以发送 ``Viewport`` 消息，此后的增量只包含视口内的格子；视口
+    消息有效时没有应答。超过 ``MAX_REGION_CELLS`` 的游戏板在收到视口之前只
+    返回左上角 ``INITIAL_REGION_SIZE`` 见方区域内的格子。
+    
+    Args:
+        websocket: WebSocket 连接
+        game_id: 游戏ID
+    """
+    if await store_call(games.get, game_id) is None:
+        await websocket.close(code=4404)
+        return
     
-    game = games[game_id]
-    new_state = game.make_move(move)
-    return new_state
+    await websocket.accept()
+    viewport: Optional[Viewport] = None
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                move = GameMove.model_validate_json(message)
+            except ValidationError as e:
+                try:
+                    viewport = check_viewport(Viewport.model_validate_json(message))
+                except ValidationError:
+                    await websocket.send_json({"detail": str(e)})
+                except HTTPException as error:
+                    await websocket.send_json({"detail": error.detail})
+                continue
+            
+            try:
+                layout = await first_layout(game_id, [move])
+                game, changed, base_version = await play(
+                    game_id, lambda game: game.apply_move(move), layout
+                )
+            except HTTPException as e:
+                if e.status_code == 404:
+                    await websocket.close(code=4404)
+                    return
+                await websocket.send_json({"detail": e.detail})
+                continue
+            
+            bounds = response_bounds(game, viewport)
+            if bounds is not None:
+                changed = in_viewport(changed, game.width, bounds)
+            await websocket.send_text(
+                game.to_delta(changed, base_version).model_dump_json()
+            )
+    except WebSocketDisconnect:
+        pass
 
 @app.post("/game/{game_id}/complete")
 async def complete_game(game_id: int, result: GameResult) -> Dict:
@@ -133,17 +659,15 @@ async def complete_game(game_id: int, result: GameResult) -> Dict:
     Raises:
         HTTPException: 当游戏ID不存在时抛出404错误
     """
-    if game_id not in games:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    game = games[game_id]
+    game = await get_game(game_id)
     
     # 保存游戏结果
-    game_record_id = GameDB.save_game_result(
+    game_record_id = await run_db(
+        GameDB.save_game_result,
         user_name=result.user_name,
         difficulty=game.config.difficulty,
         duration=result.duration,
-        result=game.state.is_won,
+        result=game.is_won,
         moves=result.moves,
         board_width=game.config.width,
         board_height=game.config.height,
@@ -153,11 +677,17 @@ async def complete_game(game_id: int, result: GameResult) -> Dict:
     return {"message": "Game result saved", "record_id": game_record_id}
 
 @app.post("/game/{game_id}/restart")
-async def restart_game(game_id: int) -> NewGameResponse:
+async def restart_game(
+    game_id: int,
+    request: Request,
+    viewport: Optional[Viewport] = Depends(get_viewport)
+) -> NewGameResponse:
     """重新开始游戏
     
     Args:
         game_id: 游戏ID
+        request: 请求对象，用于内容协商
+        viewport: 客户端视口，指定时初始状态只包含视口内的区域
         
     Returns:
         NewGameResponse: 包含游戏ID和新的初始状态的响应
@@ -165,44 +695,289 @@ async def restart_game(game_id: int) -> NewGameResponse:
     Raises:
         HTTPException: 当游戏ID不存在时抛出404错误
     """
-    if game_id not in games:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    game = games[game_id]
+    game = await get_game(game_id)
     # Create a new game with the same configuration
-    new_game = MinesweeperGame(game.config)
-    games[game_id] = new_game
-    return NewGameResponse(game_id=game_id, state=new_game.state)
+    new_game = MinesweeperGame(game.config, no_guess=game.no_guess)
+    await store_call(games.put, game_id, new_game)
+    state = state_response(request, new_game, game_id, viewport)
+    if isinstance(state, Response):
+        return state
+    return NewGameResponse(game_id=game_id, state=state)
 
 @app.get("/game/{game_id}")
-async def get_game_state(game_id: int) -> GameState:
+async def get_game_state(
+    game_id: int,
+    request: Request,
+    viewport: Optional[Viewport] = Depends(get_viewport)
+) -> Union[RegionState, GameState]:
     """获取游戏状态
     
     Args:
         game_id: 游戏ID
+        request: 请求对象，用于内容协商
+        viewport: 客户端视口，指定时只返回视口内的区域
         
     Returns:
-        GameState: 当前游戏状态
+        Union[RegionState, GameState]: 当前游戏状态，大游戏板或指定视口时为区域
         
     Raises:
         HTTPException: 当游戏ID不存在时抛出404错误
     """
-    if game_id not in games:
-        raise HTTPException(status_code=404, detail="Game not found")
+    return state_response(request, await get_game(game_id), game_id, viewport)
+
+@app.get("/game/{game_id}/region")
+async def get_region(
+    game_id: int, x0: int, y0: int, x1: int, y1: int, request: Request
+) -> RegionState:
+    """获取游戏板的一个矩形区域，超出游戏板的部分被截去
+    
+    Args:
+        game_id: 游戏ID
+        x0: 第一行的行索引
+        y0: 第一列的列索引
+        x1: 最后一行之后的行索引
+        y1: 最后一列之后的列索引
+        request: 请求对象，用于内容协商
+        
+    Returns:
+        RegionState: 区域内的游戏状态
+        
+    Raises:
+        HTTPException: 当游戏ID不存在时抛出404错误，区域无效时抛出400错误，
+            区域超过 ``MAX_REGION_CELLS`` 时抛出413错误
+    """
+    viewport = check_viewport(Viewport(x0=x0, y0=y0, x1=x1, y1=y1))
+    game = await get_game(game_id)
+    bounds = clip_viewport(game, viewport)
+    if wants_board_encoding(request):
+        return Response(
+            content=encode_region(game, game_id, *bounds), media_type=BOARD_MEDIA_TYPE
+        )
+    return game.to_region(*bounds)
+
+@app.get("/game/{game_id}/hint")
+async def get_hint(game_id: int) -> Hint:
+    """根据玩家可见的信息计算提示
+    
+    Args:
+        game_id: 游戏ID
+        
+    Returns:
+        Hint: 一定安全和一定是地雷的格子，以及每个格子是地雷的概率
+        
+    Raises:
+        HTTPException: 当游戏ID不存在时抛出404错误，游戏已结束时抛出409错误，
+            游戏板超过 ``MAX_REGION_CELLS`` 时抛出413错误
+    """
+    game = await get_game(game_id)
+    if game.width * game.height > MAX_REGION_CELLS:
+        raise HTTPException(status_code=413, detail="Board is too large for hints")
+    if game.is_game_over:
+        raise HTTPException(status_code=409, detail="Game is over")
+    if game.first_move:
+        # 第一次揭示总是安全的，此时没有可推理的信息
+        return Hint(
+            version=game.version, safe=[], mines=[], probabilities=[],
+            other_probability=0.0, exact=True
+        )
+
+    config = game.config
+    analysis = await asyncio.get_running_loop().run_in_executor(
+        None, analyze, config.width, config.height, config.mines, visible_cells(game)
+    )
+
+    def positions(indices: List[int]) -> List[CellPosition]:
+        return [CellPosition(x=index // config.width, y=index % config.width)
+                for index in indices]
+
+    return Hint(
+        version=game.version,
+        safe=positions(analysis.safe),
+        mines=positions(analysis.mines),
+        probabilities=[
+            CellProbability(
+                x=index // config.width, y=index % config.width, probability=probability
+            )
+            for index, probability in analysis.probabilities
+        ],
+        other_probability=analysis.other_probability,
+        exact=analysis.exact
+    )
+
+@app.get("/metrics")
+async def get_metrics() -> Response:
+    """以 Prometheus 文本格式导出运行指标
+    
+    Returns:
+        Response: 请求耗时、活跃游戏、引擎操作耗时和数据库操作耗时等指标
+    """
+    # 活跃游戏数量等指标的回调会查询游戏存储
+    content = await store_call(render_metrics)
+    return Response(
+        content=content, media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@app.get("/admin/game-store", dependencies=[Depends(require_admin)])
+async def get_game_store_stats() -> Dict[str, int]:
+    """获取活跃游戏存储的统计信息
+    
+    Returns:
+        Dict[str, int]: 游戏数量、内存占用和淘汰计数
+    """
+    return await store_call(games.stats)
+
+@app.get("/admin/board-pool", dependencies=[Depends(require_admin)])
+async def get_board_pool_stats() -> Dict[str, int]:
+    """获取游戏板池的统计信息
+    
+    Returns:
+        Dict[str, int]: 各难度的可用数量和命中、平移、未命中、生成计数
+    """
+    return board_pool.stats()
+
+@app.get("/admin/no-guess", dependencies=[Depends(require_admin)])
+async def get_no_guess_stats() -> Dict[str, int]:
+    """获取无需猜测模式游戏板生成的统计信息
+    
+    Returns:
+        Dict[str, int]: 成功生成和超时后退回普通游戏板的次数
+    """
+    return no_guess_generator.stats()
+
+@app.get("/admin/profiler", dependencies=[Depends(require_admin)])
+async def get_profiler() -> Dict:
+    """获取采样分析器的配置和统计信息
+    
+    Returns:
+        Dict: 比例、路径、采样间隔、文件位置以及已分析的请求和采样数量
+    """
+    return profiler.stats()
+
+@app.put("/admin/profiler", dependencies=[Depends(require_admin)])
+async def configure_profiler(settings: ProfilerSettings) -> Dict:
+    """修改采样分析器的配置，比例为 0 且不设置路径时停止分析
     
-    return games[game_id].state
+    Args:
+        settings: 分析的请求比例、总是分析的请求路径和采样间隔
+        
+    Returns:
+        Dict: 修改后的配置和统计信息
+        
+    Raises:
+        HTTPException: 参数无效时抛出400错误
+    """
+    try:
+        profiler.configure(settings.rate, settings.route, settings.interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return profiler.stats()
+
+@app.get("/admin/profiler/stacks", dependencies=[Depends(require_admin)])
+async def get_profiler_stacks(route: Optional[str] = None) -> Response:
+    """获取汇总的折叠调用栈，可以直接用于生成火焰图
+    
+    Args:
+        route: 只返回该路由的调用栈，例如 ``POST /game/{game_id}/move``
+        
+    Returns:
+        Response: 每行 ``根;...;叶 次数`` 的纯文本
+    """
+    return Response(content=profiler.stacks(route), media_type="text/plain")
+
+@app.delete("/admin/profiler/stacks", dependencies=[Depends(require_admin)])
+async def reset_profiler_stacks() -> Dict:
+    """清空汇总的调用栈"""
+    profiler.reset()
+    return {"message": "Profiler stacks cleared"}
 
 @app.get("/leaderboard/{difficulty}")
-async def get_leaderboard(difficulty: DifficultyLevel) -> List[LeaderboardEntry]:
+async def get_leaderboard(
+    difficulty: DifficultyLevel, request: Request, response: Response
+) -> List[LeaderboardEntry]:
     """获取排行榜
     
+    排行榜从内存缓存中读取。响应带有 ETag，客户端携带匹配的
+    ``If-None-Match`` 时返回 304。
+    
     Args:
         difficulty: 游戏难度
+        request: 请求对象
+        response: 响应对象，用于设置缓存相关的响应头
         
     Returns:
         List[LeaderboardEntry]: 排行榜条目列表
+        
+    Raises:
+        HTTPException: 自定义难度没有排行榜，抛出404错误
+    """
+    check_ranked(difficulty)
+    cached = leaderboard_cache.get(difficulty)
+    if cached is None:
+        await run_db(leaderboard_cache.refresh, difficulty)
+        cached = leaderboard_cache.get(difficulty)
+    entries, etag = cached
+    
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return entries
+
+@app.get("/leaderboard/{difficulty}/page")
+async def get_leaderboard_page(
+    difficulty: DifficultyLevel,
+    window: LeaderboardWindow = LeaderboardWindow.ALL,
+    per_user: bool = True,
+    limit: int = Query(LEADERBOARD_SIZE, ge=1, le=LEADERBOARD_MAX_PAGE),
+    cursor: Optional[str] = None
+) -> LeaderboardPage:
+    """分页获取排行榜
+    
+    Args:
+        difficulty: 游戏难度
+        window: 时间范围
+        per_user: 是否每个用户只保留最佳成绩
+        limit: 本页条目数量
+        cursor: 上一页返回的 ``next_cursor``
+        
+    Returns:
+        LeaderboardPage: 本页条目和下一页游标
+        
+    Raises:
+        HTTPException: 游标格式不正确时抛出400错误，自定义难度抛出404错误
+    """
+    check_ranked(difficulty)
+    try:
+        return await run_db(
+            GameDB.get_leaderboard_page, difficulty, limit, window, per_user, cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/leaderboard/{difficulty}/rank/{user_name}")
+async def get_user_rank(
+    difficulty: DifficultyLevel,
+    user_name: str,
+    window: LeaderboardWindow = LeaderboardWindow.ALL
+) -> UserRank:
+    """获取用户在排行榜中的名次和百分位
+    
+    Args:
+        difficulty: 游戏难度
+        user_name: 用户名
+        window: 时间范围
+        
+    Returns:
+        UserRank: 用户名次
+        
+    Raises:
+        HTTPException: 用户在该时间范围内没有获胜记录或查询自定义难度时抛出404错误
     """
-    return GameDB.get_leaderboard(difficulty)
+    check_ranked(difficulty)
+    rank = await run_db(GameDB.get_user_rank, difficulty, user_name, window)
+    if rank is None:
+        raise HTTPException(status_code=404, detail="User has no wins in this window")
+    return rank
 
 @app.get("/stats/{user_name}")
 async def get_user_stats(user_name: str) -> UserStats:
@@ -214,8 +989,12 @@ async def get_user_stats(user_name: str) -> UserStats:
     Returns:
         UserStats: 用户统计信息
     """
-    return GameDB.get_user_stats(user_name)
+    return await run_db(GameDB.get_user_stats, user_name)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    if WORKERS > 1:
+        # 多个工作进程需要以导入字符串的方式加载应用
+        uvicorn.run("main:app", host=HOST, port=PORT, workers=WORKERS)
+    else:
+        uvicorn.run(app, host=HOST, port=PORT) 
\ No newline at end of file
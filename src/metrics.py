@@ -0,0 +1,298 @@
+"""进程内的运行指标，以 Prometheus 文本格式导出
+
+只实现服务需要的计数器、直方图和回调指标，不依赖 prometheus_client。指标在
+定义它的模块中创建并自动注册，``render`` 输出所有已注册的指标。
+
+记录一次观测只需要一次二分查找和几次加法，不加锁，可以用在移动操作等热路径
+上；带标签的指标应预先调用 ``labels`` 取得子指标并保存，避免每次查找。多个线程
+同时更新同一个子指标时，极少数情况下可能丢失一次计数，对监控没有影响。
+
+多进程部署时每个工作进程各自统计，``/metrics`` 返回处理该请求的进程的指标。
+"""
+import bisect
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+# 请求和数据库操作耗时的分桶上界（秒）
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# 引擎操作耗时的分桶上界（秒）
+ENGINE_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5
+)
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """指标的公共部分：名称、说明、标签和子指标"""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def labels(self, *values: str) -> Any:
+        """获取指定标签值的子指标
+
+        Args:
+            *values: 按 ``labelnames`` 顺序排列的标签值
+
+        Returns:
+            子指标，可以保存下来重复使用
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """以 Prometheus 文本格式输出指标"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(
+            f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples()
+        )
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def inc(self, amount: float = 1) -> None:
+        """没有标签时直接增加计数"""
+        self._default.inc(amount)
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        return [
+            (self.name, _format_labels(self.labelnames, key), child.value)
+            for key, child in sorted(self._children.items())
+        ]
+
+
+class _HistogramChild:
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # 最后一个分桶对应 +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self._bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    """记录 ``with`` 代码块耗时的上下文管理器"""
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class Histogram(_Metric):
+    """按固定分桶统计观测值的直方图"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def observe(self, value: float) -> None:
+        """没有标签时直接记录观测值"""
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        """没有标签时记录 ``with`` 代码块的耗时"""
+        return self._default.time()
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        samples = []
+        for key, child in sorted(self._children.items()):
+            counts = list(child.counts)
+            total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((
+                    f"{self.name}_bucket",
+                    _format_labels(self.labelnames + ("le",), key + (_format_value(bound),)),
+                    cumulative
+                ))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class CallbackMetric(_Metric):
+    """在导出时调用函数读取当前值的指标，用于已有的统计数据"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        function: Callable[[], float],
+        type: str = "gauge"
+    ):
+        """初始化指标
+
+        Args:
+            name: 指标名称
+            documentation: 说明
+            function: 返回当前值的函数
+            type: ``gauge`` 或 ``counter``
+        """
+        super().__init__(name, documentation)
+        self.type = type
+        self._function = function
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        return [(self.name, "", self._function())]
+
+
+def timed(histogram: Histogram) -> Callable[[Callable], Callable]:
+    """记录函数耗时的装饰器，以函数名作为直方图唯一的标签值
+
+    Args:
+        histogram: 带有一个标签的直方图
+
+    Returns:
+        Callable[[Callable], Callable]: 装饰器
+    """
+    def decorator(func: Callable) -> Callable:
+        child = histogram.labels(func.__name__)
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def render() -> str:
+    """以 Prometheus 文本格式输出所有已注册的指标
+
+    Returns:
+        str: 指标文本
+    """
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+class MetricsMiddleware:
+    """记录每个路由请求数量和耗时的 ASGI 中间件
+
+    路由标签使用路由模板（例如 ``/game/{game_id}/move``），没有匹配的路由时为
+    ``unmatched``，避免标签数量随请求路径增长。WebSocket 连接不计入。
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_DURATION.labels(method, path).observe(time.perf_counter() - start)
+            REQUESTS.labels(method, path, status).inc()
+
+
+REQUEST_DURATION = Histogram(
+    "minesweeper_http_request_duration_seconds", "HTTP request duration by route",
+    ("method", "route")
+)
+REQUESTS = Counter(
+    "minesweeper_http_requests_total", "HTTP requests by route and status",
+    ("method", "route", "status")
+)
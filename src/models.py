@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 from enum import Enum
 from datetime import datetime
 
@@ -10,10 +10,12 @@ class DifficultyLevel(str, Enum):
         BEGINNER: 初级难度 (9x9 网格，10个地雷)
         INTERMEDIATE: 中级难度 (16x16 网格，40个地雷)
         EXPERT: 高级难度 (30x16 网格，99个地雷)
+        CUSTOM: 自定义尺寸和地雷数量，不参与排行榜
     """
     BEGINNER = "beginner"
     INTERMEDIATE = "intermediate"
     EXPERT = "expert"
+    CUSTOM = "custom"
 
 class GameConfig(BaseModel):
     """游戏配置模型
@@ -51,11 +53,123 @@ class GameState(BaseModel):
         mines_remaining: 剩余地雷数量
         is_game_over: 游戏是否结束
         is_won: 是否获胜
+        version: 游戏板版本号
     """
     board: List[List[CellState]]
     mines_remaining: int
     is_game_over: bool = False
     is_won: bool = False
+    version: int = 0
+
+class RegionState(GameState):
+    """游戏板矩形区域的状态模型
+
+    ``board`` 只包含区域内的格子，``board[i][j]`` 对应游戏板上的
+    ``(x0 + i, y0 + j)``。
+
+    Attributes:
+        x0: 区域第一行的行索引
+        y0: 区域第一列的列索引
+        width: 整个游戏板的宽度
+        height: 整个游戏板的高度
+    """
+    x0: int
+    y0: int
+    width: int
+    height: int
+
+class Viewport(BaseModel):
+    """客户端可见的游戏板区域，包含 ``x0``、``y0``，不包含 ``x1``、``y1``
+
+    Attributes:
+        x0: 第一行的行索引
+        y0: 第一列的列索引
+        x1: 最后一行之后的行索引
+        y1: 最后一列之后的列索引
+    """
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+
+class CellUpdate(CellState):
+    """单元格变化模型
+
+    Attributes:
+        x: 单元格的行索引
+        y: 单元格的列索引
+    """
+    x: int
+    y: int
+
+class MoveDelta(BaseModel):
+    """增量游戏状态模型
+
+    只包含本次操作改变的单元格，客户端基于 ``base_version`` 对应的本地状态
+    应用变化；版本号不一致时应通过 ``GET /game/{game_id}`` 重新同步。
+
+    Attributes:
+        changes: 发生变化的单元格
+        mines_remaining: 剩余地雷数量
+        is_game_over: 游戏是否结束
+        is_won: 是否获胜
+        base_version: 操作前的游戏板版本号
+        version: 操作后的游戏板版本号
+    """
+    changes: List[CellUpdate]
+    mines_remaining: int
+    is_game_over: bool
+    is_won: bool
+    base_version: int
+    version: int
+
+class CellPosition(BaseModel):
+    """单元格位置模型
+
+    Attributes:
+        x: 单元格的行索引
+        y: 单元格的列索引
+    """
+    x: int
+    y: int
+
+class CellProbability(CellPosition):
+    """单元格是地雷的概率
+
+    Attributes:
+        probability: 是地雷的概率
+    """
+    probability: float
+
+class Hint(BaseModel):
+    """根据已揭示的游戏板推理得到的提示
+
+    Attributes:
+        version: 推理所基于的游戏板版本号
+        safe: 一定安全的未揭示单元格
+        mines: 一定是地雷的未揭示单元格
+        probabilities: 与已揭示数字相邻的未揭示单元格是地雷的概率
+        other_probability: 其余未揭示单元格是地雷的概率
+        exact: 概率是否精确；部分区域超出时间预算时为近似值
+    """
+    version: int
+    safe: List[CellPosition]
+    mines: List[CellPosition]
+    probabilities: List[CellProbability]
+    other_probability: float
+    exact: bool
+
+class ProfilerSettings(BaseModel):
+    """采样分析器配置
+
+    Attributes:
+        rate: 分析的请求比例，取值范围 [0, 1]
+        route: 总是分析的请求路径（正则表达式）
+        interval: 采样间隔（秒）
+    """
+    rate: float = 0.0
+    route: Optional[str] = None
+    interval: float = 0.001
 
 class GameMove(BaseModel):
     """游戏移动操作模型
@@ -63,21 +177,22 @@ class GameMove(BaseModel):
     Attributes:
         x: 操作的行索引
         y: 操作的列索引
-        action: 操作类型 ("reveal" 揭示或 "flag" 标记)
+        action: 操作类型 ("reveal" 揭示、"flag" 标记或 "chord" 揭示已满足的数字周围
+            未标记的格子)
     """
     x: int
     y: int
-    action: str  # "reveal" or "flag"
+    action: str  # "reveal", "flag" or "chord"
 
 class NewGameResponse(BaseModel):
     """新游戏响应模型
     
     Attributes:
         game_id: 游戏ID
-        state: 初始游戏状态
+        state: 初始游戏状态，大游戏板或指定视口时只包含视口内的区域
     """
     game_id: int
-    state: GameState
+    state: Union[RegionState, GameState]
 
 # 新增的模型
 class LeaderboardEntry(BaseModel):
@@ -86,6 +201,48 @@ class LeaderboardEntry(BaseModel):
     best_time: int
     played_at: str
 
+class LeaderboardWindow(str, Enum):
+    """排行榜时间范围
+    
+    Attributes:
+        ALL: 全部时间
+        DAY: 当天
+        WEEK: 本周（从周一开始）
+        MONTH: 本月
+    """
+    ALL = "all"
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+class LeaderboardPage(BaseModel):
+    """分页排行榜
+    
+    Attributes:
+        entries: 本页的排行榜条目
+        next_cursor: 获取下一页的游标，没有更多条目时为 None
+    """
+    entries: List[LeaderboardEntry]
+    next_cursor: Optional[str] = None
+
+class UserRank(BaseModel):
+    """用户在排行榜中的名次
+    
+    Attributes:
+        user_name: 用户名
+        rank: 名次，从 1 开始
+        best_time: 最佳用时
+        played_at: 取得最佳用时的时间
+        total: 排行榜中的用户数量
+        percentile: 排名不在该用户之前的玩家（含该用户）所占百分比，第一名为 100
+    """
+    user_name: str
+    rank: int
+    best_time: int
+    played_at: str
+    total: int
+    percentile: float
+
 class UserStats(BaseModel):
     user_name: str
     stats: Dict[str, Dict[str, Optional[int]]]
@@ -0,0 +1,361 @@
+"""按需开启的请求采样分析器
+
+开启后按比例（``rate``）或按路径（``route``，匹配请求路径的正则表达式）选择
+请求进行分析。后台线程每隔 ``interval`` 秒通过 ``sys._current_frames`` 采集
+正在处理这些请求的线程的调用栈：
+
+- 事件循环线程上只统计位于该请求的中间件帧之下的调用栈，同一线程上交错执行的
+  其他请求不会计入；
+- 通过 ``Database.run`` 提交到数据库线程池的调用（``GameDB`` 方法）继承请求的
+  上下文，执行期间该线程的调用栈同样计入该请求。
+
+每个被分析的请求结束后，其调用栈以折叠格式（``根;...;叶 次数``，根为
+``方法 路由模板``）追加写入按大小轮转的本地文件，同时合并到内存中的汇总，
+可以直接用 flamegraph.pl 或 speedscope 生成火焰图。内存中的汇总在文件轮转时
+清空，与当前文件覆盖相同的时间段。
+
+没有被分析的请求只有一次属性判断的开销；没有进行中的分析时采样线程处于等待
+状态。
+"""
+import contextvars
+import logging
+import logging.handlers
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Pattern, TypeVar
+
+# 分析的请求比例，0 表示只分析匹配 PROFILE_ROUTE 的请求
+PROFILE_RATE = float(os.getenv('MINESWEEPER_PROFILE_RATE', '0'))
+# 总是分析的请求路径（正则表达式），未设置时只按比例分析
+PROFILE_ROUTE = os.getenv('MINESWEEPER_PROFILE_ROUTE')
+# 采样间隔（秒）
+PROFILE_INTERVAL = float(os.getenv('MINESWEEPER_PROFILE_INTERVAL', '0.001'))
+# 折叠调用栈文件的位置、单个文件的大小上限（MB）和保留的旧文件数量
+PROFILE_PATH = os.getenv(
+    'MINESWEEPER_PROFILE_PATH', str(Path.home() / '.minesweeper' / 'profiles' / 'stacks.folded')
+)
+PROFILE_FILE_MB = float(os.getenv('MINESWEEPER_PROFILE_FILE_MB', '10'))
+PROFILE_FILES = int(os.getenv('MINESWEEPER_PROFILE_FILES', '5'))
+
+T = TypeVar('T')
+
+
+class RequestProfile:
+    """一个被分析的请求的采样结果
+
+    Attributes:
+        thread (int): 处理请求的事件循环线程
+        samples (Counter): 调用栈（从根到叶的帧名称元组）到采样次数的映射
+    """
+
+    def __init__(self, thread: int):
+        self.thread = thread
+        self.samples: Counter = Counter()
+
+
+# 当前请求的分析结果，随上下文传递到数据库线程
+_current: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    'profile', default=None
+)
+
+
+class Profiler:
+    """采样分析器
+
+    Attributes:
+        rate (float): 分析的请求比例
+        route (Optional[Pattern]): 总是分析的请求路径
+        interval (float): 采样间隔（秒）
+        path (str): 折叠调用栈文件的位置
+        requests (int): 已分析的请求数量
+        sample_count (int): 已采集的调用栈数量
+    """
+
+    def __init__(
+        self,
+        rate: float = PROFILE_RATE,
+        route: Optional[str] = PROFILE_ROUTE,
+        interval: float = PROFILE_INTERVAL,
+        path: str = PROFILE_PATH,
+        max_bytes: int = int(PROFILE_FILE_MB * 1024 * 1024),
+        backups: int = PROFILE_FILES
+    ):
+        """初始化分析器，文件在第一次写入时创建
+
+        Args:
+            rate: 分析的请求比例
+            route: 总是分析的请求路径（正则表达式）
+            interval: 采样间隔（秒）
+            path: 折叠调用栈文件的位置
+            max_bytes: 单个文件的大小上限
+            backups: 保留的旧文件数量
+        """
+        self.configure(rate, route, interval)
+        self.path = path
+        self.requests = 0
+        self.sample_count = 0
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._writer: Optional[logging.Logger] = None
+        # 正在分析的请求：中间件帧到结果的映射；以及正在为请求执行数据库调用的线程
+        self._frames: Dict[Any, RequestProfile] = {}
+        self._threads: Dict[int, RequestProfile] = {}
+        self._totals: Counter = Counter()
+        self._labels: Dict[Any, str] = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        """是否会分析任何请求"""
+        return self.rate > 0 or self.route is not None
+
+    def configure(self, rate: float, route: Optional[str], interval: float) -> None:
+        """修改分析的范围和采样间隔
+
+        Args:
+            rate: 分析的请求比例，取值范围 [0, 1]
+            route: 总是分析的请求路径（正则表达式），None 表示不按路径选择
+            interval: 采样间隔（秒）
+
+        Raises:
+            ValueError: 参数超出范围或正则表达式无效
+        """
+        if not 0 <= rate <= 1:
+            raise ValueError("rate must be between 0 and 1")
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        try:
+            pattern = re.compile(route) if route else None
+        except re.error as e:
+            raise ValueError(f"invalid route pattern: {e}")
+        self.rate = rate
+        self.route: Optional[Pattern] = pattern
+        self.interval = interval
+
+    def should_profile(self, path: str) -> bool:
+        """判断是否分析该请求
+
+        Args:
+            path: 请求路径
+
+        Returns:
+            bool: 是否分析
+        """
+        if self.route is not None and self.route.search(path):
+            return True
+        return self.rate > 0 and random.random() < self.rate
+
+    def begin(self, frame: Any) -> RequestProfile:
+        """开始分析一个请求
+
+        Args:
+            frame: 处理该请求的中间件帧，只统计位于它之下的调用栈
+
+        Returns:
+            RequestProfile: 请求的分析结果
+        """
+        profile = RequestProfile(threading.get_ident())
+        with self._lock:
+            self._frames[frame] = profile
+        self._ensure_sampler()
+        self._active.set()
+        return profile
+
+    def end(self, frame: Any, root: str) -> None:
+        """结束分析，写入并汇总请求的调用栈
+
+        Args:
+            frame: ``begin`` 时传入的中间件帧
+            root: 调用栈的根，例如 ``POST /game/{game_id}/move``
+        """
+        with self._lock:
+            profile = self._frames.pop(frame, None)
+            if not self._frames and not self._threads:
+                self._active.clear()
+            if profile is None:
+                return
+            self.requests += 1
+            samples = {(root,) + stack: count for stack, count in profile.samples.items()}
+        if samples:
+            # 先写文件：写入触发的轮转会清空汇总，本次的调用栈写在新文件中
+            self._write(samples)
+            with self._lock:
+                self._totals.update(samples)
+
+    def follow(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在其他线程中执行函数；当前上下文属于被分析的请求时同时采集该线程
+
+        Args:
+            func: 要执行的函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            T: 函数的返回值
+        """
+        profile = _current.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = profile
+        self._active.set()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._threads.pop(ident, None)
+                if not self._frames and not self._threads:
+                    self._active.clear()
+
+    def stacks(self, route: Optional[str] = None) -> str:
+        """获取汇总的折叠调用栈
+
+        Args:
+            route: 只返回根以该字符串开头的调用栈，例如 ``POST /game/{game_id}/move``
+
+        Returns:
+            str: 每行 ``根;...;叶 次数``，按次数从多到少排列
+        """
+        with self._lock:
+            items = list(self._totals.items())
+        return "".join(
+            f"{';'.join(stack)} {count}\n"
+            for stack, count in sorted(items, key=lambda item: -item[1])
+            if route is None or stack[0].startswith(route)
+        )
+
+    def reset(self) -> None:
+        """清空汇总的调用栈"""
+        with self._lock:
+            self._totals.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取分析器的配置和统计信息
+
+        Returns:
+            Dict[str, Any]: 比例、路径、采样间隔、文件位置以及请求和采样数量
+        """
+        return {
+            "rate": self.rate,
+            "route": self.route.pattern if self.route is not None else None,
+            "interval": self.interval,
+            "path": self.path,
+            "requests": self.requests,
+            "samples": self.sample_count,
+            "stacks": len(self._totals),
+        }
+
+    def _ensure_sampler(self) -> None:
+        if self._sampler is None:
+            with self._lock:
+                if self._sampler is None:
+                    self._sampler = threading.Thread(
+                        target=self._run, name='profiler', daemon=True
+                    )
+                    self._sampler.start()
+
+    def _label(self, code: Any) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            label = f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+            self._labels[code] = label
+        return label
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            self._active.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                requests = dict(self._frames)
+                threads = dict(self._threads)
+            for ident in {profile.thread for profile in requests.values()}:
+                # 沿调用链向上查找所属请求的中间件帧
+                stack = []
+                frame = frames.get(ident)
+                while frame is not None and frame not in requests:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                if frame is not None and stack:
+                    self._record(requests[frame], stack)
+            for ident, profile in threads.items():
+                if ident == me:
+                    continue
+                stack = []
+                frame = frames.get(ident)
+                while frame is not None and frame.f_code is not Profiler.follow.__code__:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                if frame is not None and stack:
+                    self._record(profile, stack + ["[database thread]"])
+            del frames
+            time.sleep(self.interval)
+
+    def _record(self, profile: RequestProfile, stack: list) -> None:
+        stack.reverse()
+        with self._lock:
+            profile.samples[tuple(stack)] += 1
+            self.sample_count += 1
+
+    def _write(self, samples: Dict[tuple, int]) -> None:
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            handler = _RotatingHandler(
+                self.path, self.reset, maxBytes=self._max_bytes, backupCount=self._backups
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            writer = logging.getLogger(f"{__name__}.stacks")
+            writer.propagate = False
+            writer.setLevel(logging.INFO)
+            writer.addHandler(handler)
+            self._writer = writer
+        self._writer.info(
+            "\n".join(f"{';'.join(stack)} {count}" for stack, count in samples.items())
+        )
+
+
+class _RotatingHandler(logging.handlers.RotatingFileHandler):
+    """按大小轮转的文件，轮转后调用 ``on_rollover``"""
+
+    def __init__(self, filename: str, on_rollover: Callable[[], None], **kwargs: Any):
+        super().__init__(filename, **kwargs)
+        self.on_rollover = on_rollover
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.on_rollover()
+
+
+class ProfilerMiddleware:
+    """选择并分析请求的 ASGI 中间件"""
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if (scope["type"] != "http" or not profiler.enabled
+                or not profiler.should_profile(scope["path"])):
+            await self.app(scope, receive, send)
+            return
+
+        frame = sys._getframe()
+        token = _current.set(profiler.begin(frame))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            profiler.end(frame, f"{scope['method']} {route}")
+            _current.reset(token)
+
+
+profiler = Profiler()
@@ -0,0 +1,594 @@
+"""无需猜测的扫雷求解器和游戏板生成
+
+求解器从第一次点击开始模拟玩家，只使用逻辑推理：
+
+1. 单个数字：剩余地雷数为 0 时周围未知格子都安全，等于未知格子数量时都是地雷；
+2. 两个相邻数字：设 A、B 为两个数字的未知格子集合，``a``、``b`` 为各自剩余的
+   地雷数量，若 ``a - b == |A - B|``，则 ``A - B`` 全是地雷、``B - A`` 全部安全
+   （包含子集推理）；
+3. 全局地雷数量：剩余地雷为 0 或等于剩余未知格子数量。
+
+格子集合用 Python 整数表示的位集，推理失败时认为需要猜测。求解器是保守的：
+判定为可解的游戏板一定无需猜测，反之不一定。
+
+``analyze`` 只根据玩家可见的信息计算提示：与已揭示数字相邻的未揭示格子按
+约束划分为相互独立的区域，每个区域枚举所有满足约束的地雷分布，再结合总地雷
+数量精确计算每个格子是地雷的概率。
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from game_logic import ADJACENT_MASK, MINE, REVEALED, build_layout, safe_indices
+from models import GameConfig
+
+# 生成一个无需猜测的游戏板的时间预算（秒），超时后退回普通游戏板
+NO_GUESS_BUDGET = float(os.getenv('MINESWEEPER_NO_GUESS_BUDGET', '0.5'))
+# 并行生成的进程数量
+NO_GUESS_WORKERS = int(
+    os.getenv('MINESWEEPER_NO_GUESS_WORKERS', str(min(4, os.cpu_count() or 1)))
+)
+# 单个生成任务最多尝试的游戏板数量
+MAX_ATTEMPTS = 10000
+
+# 计算提示的时间预算（秒），超出预算的区域使用近似概率
+HINT_BUDGET = float(os.getenv('MINESWEEPER_HINT_BUDGET', '0.05'))
+# 精确枚举的最大区域格子数量，更大的区域直接使用近似概率
+MAX_EXACT_CELLS = 400
+# 缓存的提示数量
+HINT_CACHE_SIZE = 256
+
+logger = logging.getLogger(__name__)
+
+_UNKNOWN = 0
+_SAFE = 1
+_MINE = 2
+
+
+@lru_cache(maxsize=16)
+def _neighbours(width: int, height: int) -> Tuple[Tuple[int, ...], ...]:
+    """每个格子周围（不含自身）格子的下标"""
+    return tuple(
+        tuple(
+            i * width + j
+            for i in range(max(0, x - 1), min(height, x + 2))
+            for j in range(max(0, y - 1), min(width, y + 2))
+            if (i, j) != (x, y)
+        )
+        for x in range(height)
+        for y in range(width)
+    )
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def _cells(mask: int) -> List[int]:
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() - 1)
+        mask ^= low
+    return cells
+
+
+def is_solvable(width: int, height: int, layout: Sequence[int], first_x: int, first_y: int) -> bool:
+    """判断游戏板能否从第一次点击开始只靠逻辑推理完成
+
+    Args:
+        width: 游戏板宽度
+        height: 游戏板高度
+        layout: ``build_layout`` 格式的游戏板
+        first_x: 第一次点击的行索引
+        first_y: 第一次点击的列索引
+
+    Returns:
+        bool: 是否无需猜测
+    """
+    neighbours = _neighbours(width, height)
+    size = width * height
+    mines_left = sum(1 for value in layout if value & MINE)
+    safe_left = size - mines_left
+    known = bytearray(size)
+    frontier = set()
+
+    def reveal(start: int) -> int:
+        # 揭示一个安全格子，周围没有地雷时继续展开
+        revealed = 0
+        stack = [start]
+        while stack:
+            index = stack.pop()
+            if known[index] != _UNKNOWN:
+                continue
+            known[index] = _SAFE
+            revealed += 1
+            if layout[index] & ADJACENT_MASK:
+                frontier.add(index)
+            else:
+                stack.extend(n for n in neighbours[index] if known[n] == _UNKNOWN)
+        return revealed
+
+    safe_left -= reveal(first_x * width + first_y)
+    while safe_left:
+        progress = False
+
+        # 单个数字的推理，同时收集约束
+        constraints = []
+        for index in list(frontier):
+            unknown = 0
+            need = layout[index] & ADJACENT_MASK
+            for n in neighbours[index]:
+                if known[n] == _UNKNOWN:
+                    unknown |= 1 << n
+                elif known[n] == _MINE:
+                    need -= 1
+            if not unknown:
+                frontier.discard(index)
+                continue
+            if need == 0:
+                for n in _cells(unknown):
+                    safe_left -= reveal(n)
+                progress = True
+            elif need == _popcount(unknown):
+                for n in _cells(unknown):
+                    if known[n] == _UNKNOWN:
+                        known[n] = _MINE
+                        mines_left -= 1
+                progress = True
+            else:
+                constraints.append((unknown, need))
+        if progress:
+            continue
+
+        # 两个约束的重叠推理
+        for i, (a_mask, a_need) in enumerate(constraints):
+            for b_mask, b_need in constraints[i + 1:]:
+                if not a_mask & b_mask:
+                    continue
+                for (x_mask, x_need), (y_mask, y_need) in (
+                    ((a_mask, a_need), (b_mask, b_need)),
+                    ((b_mask, b_need), (a_mask, a_need)),
+                ):
+                    x_only = x_mask & ~y_mask
+                    if x_need - y_need != _popcount(x_only):
+                        continue
+                    y_only = y_mask & ~x_mask
+                    if not x_only and not y_only:
+                        continue
+                    for n in _cells(x_only):
+                        if known[n] == _UNKNOWN:
+                            known[n] = _MINE
+                            mines_left -= 1
+                    for n in _cells(y_only):
+                        if known[n] == _UNKNOWN:
+                            safe_left -= reveal(n)
+                    progress = True
+                    break
+                if progress:
+                    break
+            if progress:
+                break
+        if progress:
+            continue
+
+        # 全局地雷数量
+        unknown = [index for index in range(size) if known[index] == _UNKNOWN]
+        if mines_left == 0:
+            for index in unknown:
+                safe_left -= reveal(index)
+        elif mines_left == len(unknown):
+            return True
+        else:
+            return False
+    return True
+
+
+class BoardAnalysis(NamedTuple):
+    """``analyze`` 的结果，格子以下标表示
+
+    Attributes:
+        safe: 一定安全的未揭示格子
+        mines: 一定是地雷的未揭示格子
+        probabilities: 与已揭示数字相邻的未揭示格子及其是地雷的概率
+        other_probability: 其余未揭示格子是地雷的概率
+        exact: 概率是否精确
+    """
+    safe: Tuple[int, ...]
+    mines: Tuple[int, ...]
+    probabilities: Tuple[Tuple[int, float], ...]
+    other_probability: float
+    exact: bool
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _enumerate(
+    cells: List[int], constraints: List[Tuple[List[int], int]], deadline: float
+) -> Tuple[Dict[int, int], Dict[int, List[int]]]:
+    """枚举一个区域内所有满足约束的地雷分布
+
+    Returns:
+        Tuple[Dict[int, int], Dict[int, List[int]]]: 按地雷数量 k 统计的分布
+            数量，以及每个格子在这些分布中是地雷的次数（与 ``cells`` 顺序一致）
+
+    Raises:
+        _Timeout: 超过截止时间
+    """
+    # 沿约束的广度优先顺序赋值，使约束尽早完整以便剪枝
+    cell_constraints: Dict[int, List[int]] = {cell: [] for cell in cells}
+    for c, (members, _) in enumerate(constraints):
+        for cell in members:
+            cell_constraints[cell].append(c)
+    order: List[int] = []
+    seen = set()
+    for start in cells:
+        if start in seen:
+            continue
+        seen.add(start)
+        queue = [start]
+        while queue:
+            cell = queue.pop(0)
+            order.append(cell)
+            for c in cell_constraints[cell]:
+                for other in constraints[c][0]:
+                    if other not in seen:
+                        seen.add(other)
+                        queue.append(other)
+
+    position = {cell: i for i, cell in enumerate(cells)}
+    slots = [position[cell] for cell in order]
+    touching = [cell_constraints[cell] for cell in order]
+    need = [count for _, count in constraints]
+    assigned = [0] * len(constraints)
+    remaining = [len(members) for members, _ in constraints]
+    chosen: List[int] = []
+    weights: Dict[int, int] = {}
+    counts: Dict[int, List[int]] = {}
+    size = len(order)
+    nodes = 0
+
+    def visit(depth: int) -> None:
+        nonlocal nodes
+        if depth == size:
+            k = len(chosen)
+            weights[k] = weights.get(k, 0) + 1
+            row = counts.get(k)
+            if row is None:
+                row = counts[k] = [0] * size
+            for slot in chosen:
+                row[slot] += 1
+            return
+        nodes += 1
+        if not nodes & 1023 and time.perf_counter() > deadline:
+            raise _Timeout
+        for value in (0, 1):
+            feasible = True
+            for c in touching[depth]:
+                remaining[c] -= 1
+                assigned[c] += value
+                if assigned[c] > need[c] or assigned[c] + remaining[c] < need[c]:
+                    feasible = False
+            if feasible:
+                if value:
+                    chosen.append(slots[depth])
+                visit(depth + 1)
+                if value:
+                    chosen.pop()
+            for c in touching[depth]:
+                remaining[c] += 1
+                assigned[c] -= value
+
+    visit(0)
+    return weights, counts
+
+
+def _convolve(a: Dict[int, int], b: Dict[int, int]) -> Dict[int, int]:
+    result: Dict[int, int] = {}
+    for i, x in a.items():
+        for j, y in b.items():
+            result[i + j] = result.get(i + j, 0) + x * y
+    return result
+
+
+@lru_cache(maxsize=HINT_CACHE_SIZE)
+def analyze(
+    width: int, height: int, mines: int, visible: bytes, budget: float = HINT_BUDGET
+) -> BoardAnalysis:
+    """根据玩家可见的游戏板计算一定安全、一定是地雷的格子和地雷概率
+
+    结果按可见游戏板的内容缓存，游戏板版本变化时可见内容随之变化。
+
+    Args:
+        width: 游戏板宽度
+        height: 游戏板高度
+        mines: 地雷总数
+        visible: 每个格子一个字节，只使用 ``REVEALED`` 位和已揭示格子的数字；
+            旗子是玩家的猜测，不参与推理
+        budget: 时间预算（秒）
+
+    Returns:
+        BoardAnalysis: 推理结果
+    """
+    deadline = time.perf_counter() + budget
+    neighbours = _neighbours(width, height)
+    board = np.frombuffer(visible, dtype=np.uint8)
+    revealed = (board & REVEALED) != 0
+    hidden = ~revealed
+
+    # 每个已揭示数字与其未揭示邻居构成一个约束
+    constraints: List[Tuple[List[int], int]] = []
+    for index in np.flatnonzero(revealed & ((board & ADJACENT_MASK) > 0)).tolist():
+        members = [n for n in neighbours[index] if hidden[n]]
+        if members:
+            constraints.append((members, visible[index] & ADJACENT_MASK))
+
+    # 用并查集把共享约束的格子划分为独立区域
+    parent: Dict[int, int] = {}
+
+    def find(cell: int) -> int:
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for members, _ in constraints:
+        for cell in members:
+            parent.setdefault(cell, cell)
+        root = find(members[0])
+        for cell in members[1:]:
+            parent[find(cell)] = root
+
+    components: Dict[int, Tuple[List[int], List[Tuple[List[int], int]]]] = {}
+    for cell in parent:
+        components.setdefault(find(cell), ([], []))[0].append(cell)
+    for constraint in constraints:
+        components[find(constraint[0][0])][1].append(constraint)
+
+    others = int(np.count_nonzero(hidden)) - len(parent)
+    exact_results = []
+    approximate: Dict[int, float] = {}
+    for cells, component_constraints in components.values():
+        try:
+            if len(cells) > MAX_EXACT_CELLS:
+                raise _Timeout
+            weights, counts = _enumerate(cells, component_constraints, deadline)
+            exact_results.append((cells, weights, counts))
+        except _Timeout:
+            # 近似：取每个格子所在约束的平均地雷密度
+            totals: Dict[int, List[float]] = {}
+            for members, count in component_constraints:
+                for cell in members:
+                    totals.setdefault(cell, []).append(count / len(members))
+            for cell, densities in totals.items():
+                approximate[cell] = sum(densities) / len(densities)
+
+    probabilities: Dict[int, float] = dict(approximate)
+    safe: List[int] = [cell for cell, p in approximate.items() if p == 0]
+    certain_mines: List[int] = [cell for cell, p in approximate.items() if p == 1]
+
+    distributions = [weights for _, weights, _ in exact_results]
+    prefix = [{0: 1}]
+    for weights in distributions:
+        prefix.append(_convolve(prefix[-1], weights))
+    total = prefix[-1]
+    denominator = sum(w * math.comb(others, mines - k) for k, w in total.items()
+                      if 0 <= mines - k <= others)
+    exact = not approximate and denominator > 0
+
+    if exact:
+        suffix = [{0: 1}]
+        for weights in reversed(distributions):
+            suffix.append(_convolve(suffix[-1], weights))
+        suffix.reverse()
+        for i, (cells, weights, counts) in enumerate(exact_results):
+            rest = _convolve(prefix[i], suffix[i + 1])
+            factor = {
+                k: sum(w * math.comb(others, mines - k - s) for s, w in rest.items()
+                       if 0 <= mines - k - s <= others)
+                for k in weights
+            }
+            for slot, cell in enumerate(cells):
+                numerator = sum(counts[k][slot] * factor[k] for k in counts)
+                probabilities[cell] = numerator / denominator
+                if numerator == 0:
+                    safe.append(cell)
+                elif numerator == denominator:
+                    certain_mines.append(cell)
+        expected = sum(w * math.comb(others, mines - k) * (mines - k)
+                       for k, w in total.items() if 0 <= mines - k <= others)
+        other_numerator = expected
+        other_denominator = denominator * others
+    else:
+        # 不能结合总地雷数量时，各区域分别按满足约束的分布计算
+        for cells, weights, counts in exact_results:
+            solutions = sum(weights.values())
+            for slot, cell in enumerate(cells):
+                numerator = sum(row[slot] for row in counts.values())
+                probabilities[cell] = numerator / solutions
+                if numerator == 0:
+                    safe.append(cell)
+                elif numerator == solutions:
+                    certain_mines.append(cell)
+        expected = sum(probabilities.values())
+        other_numerator = min(max(mines - expected, 0.0), float(others))
+        other_denominator = others
+
+    other_probability = other_numerator / other_denominator if others else 0.0
+    if others and other_numerator in (0, other_denominator):
+        frontier = set(parent)
+        rest_cells = [
+            index for index in np.flatnonzero(hidden).tolist() if index not in frontier
+        ]
+        (safe if other_numerator == 0 else certain_mines).extend(rest_cells)
+
+    return BoardAnalysis(
+        safe=tuple(sorted(safe)),
+        mines=tuple(sorted(certain_mines)),
+        probabilities=tuple(sorted(probabilities.items())),
+        other_probability=other_probability,
+        exact=exact,
+    )
+
+
+def generate_no_guess(
+    width: int,
+    height: int,
+    mines: int,
+    first_x: int,
+    first_y: int,
+    seed: int,
+    deadline: float,
+    max_attempts: int = MAX_ATTEMPTS
+) -> Optional[bytes]:
+    """生成从第一次点击开始无需猜测的游戏板（在工作进程中执行）
+
+    Args:
+        width: 游戏板宽度
+        height: 游戏板高度
+        mines: 地雷数量
+        first_x: 第一次点击的行索引
+        first_y: 第一次点击的列索引
+        seed: 随机种子
+        deadline: 停止尝试的时间（``time.time()``）
+        max_attempts: 最多尝试的游戏板数量
+
+    Returns:
+        Optional[bytes]: ``build_layout`` 格式的游戏板，超时或超过尝试次数时
+            返回 None
+    """
+    rng = random.Random(seed)
+    safe = safe_indices(width, height, first_x, first_y)
+    for _ in range(max_attempts):
+        layout = build_layout(width, height, mines, rng, safe)
+        if is_solvable(width, height, layout, first_x, first_y):
+            return bytes(layout)
+        if time.time() > deadline:
+            break
+    return None
+
+
+class NoGuessGenerator:
+    """在进程池中并行生成无需猜测的游戏板
+
+    每次生成时向每个工作进程提交一个使用不同随机种子的任务，采用最先完成的
+    结果。所有任务在 ``budget`` 秒后停止尝试；超时仍未找到时退回普通的随机
+    游戏板。指定随机种子时只提交一个任务，并且不受时间预算限制，一直等到
+    尝试了 ``MAX_ATTEMPTS`` 个游戏板，结果与负载无关、可以复现。
+
+    工作进程以 spawn 方式启动：服务进程中已经运行着数据库、批量写入和分析器
+    等线程，fork 会复制这些线程持有的锁并可能导致子进程死锁。
+
+    Attributes:
+        budget (float): 生成一个游戏板的时间预算（秒）
+        workers (int): 工作进程数量
+        generated (int): 成功生成的无需猜测游戏板数量
+        fallbacks (int): 超时后退回普通游戏板的次数
+    """
+
+    def __init__(self, budget: float = NO_GUESS_BUDGET, workers: int = NO_GUESS_WORKERS):
+        """初始化生成器
+
+        Args:
+            budget: 生成一个游戏板的时间预算（秒）
+            workers: 工作进程数量
+        """
+        self.budget = budget
+        self.workers = workers
+        self.generated = 0
+        self.fallbacks = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        """创建进程池"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+            )
+
+    async def generate(
+        self, config: GameConfig, first_x: int, first_y: int, seed: Optional[int] = None
+    ) -> bytes:
+        """生成第一次点击位置周围没有地雷、尽量无需猜测的游戏板
+
+        Args:
+            config: 游戏配置
+            first_x: 第一次点击的行索引
+            first_y: 第一次点击的列索引
+            seed: 随机种子
+
+        Returns:
+            bytes: ``build_layout`` 格式的游戏板
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        deadline = time.time() + self.budget if seed is None else math.inf
+        seeds = [seed] if seed is not None else [
+            random.getrandbits(64) for _ in range(self.workers)
+        ]
+        pending = {
+            loop.run_in_executor(
+                self._executor, generate_no_guess, config.width, config.height,
+                config.mines, first_x, first_y, task_seed, deadline
+            )
+            for task_seed in seeds
+        }
+
+        layout = None
+        while pending and layout is None:
+            # 工作进程在超过截止时间后最多再完成一次尝试
+            timeout = None if seed is not None else max(0.0, deadline - time.time()) + 0.1
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None and future.result() is not None:
+                    layout = future.result()
+                    break
+        for future in pending:
+            future.cancel()
+
+        if layout is not None:
+            self.generated += 1
+            return layout
+        self.fallbacks += 1
+        logger.warning(
+            "no-guess generation for %s failed within %s, using a random board",
+            config.difficulty.value,
+            f"{self.budget:.2f}s" if seed is None else f"{MAX_ATTEMPTS} attempts"
+        )
+        rng = random if seed is None else random.Random(seed)
+        return bytes(build_layout(
+            config.width, config.height, config.mines, rng,
+            safe_indices(config.width, config.height, first_x, first_y)
+        ))
+
+    def stats(self) -> Dict[str, int]:
+        """获取生成计数
+
+        Returns:
+            Dict[str, int]: 成功生成和退回普通游戏板的次数
+        """
+        return {"generated": self.generated, "fallbacks": self.fallbacks}
+
+    def close(self) -> None:
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+no_guess_generator = NoGuessGenerator()
@@ -0,0 +1,11 @@
+"""测试公共配置：模块从 src 导入，数据库和溢出文件放在临时目录中"""
+import os
+import sys
+import tempfile
+
+# db 在导入时读取数据库路径，必须在导入被测模块之前设置
+_DATA_DIR = tempfile.mkdtemp(prefix='minesweeper-test-')
+os.environ['MINESWEEPER_DB_PATH'] = os.path.join(_DATA_DIR, 'minesweeper.duckdb')
+os.environ.setdefault('MINESWEEPER_WRITE_BEHIND', '0')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
@@ -0,0 +1,100 @@
+"""二进制游戏板编码测试：按 board_codec 文档中的格式解码并检查隐藏信息不会泄露"""
+import struct
+
+import pytest
+
+from board_codec import (
+    KIND_BOARD, KIND_DELTA, KIND_REGION, STATUS_GAME_OVER,
+    encode_board, encode_delta, encode_region,
+)
+from game_logic import ADJACENT_MASK, FLAGGED, MINE, REVEALED, MinesweeperGame
+from models import DIFFICULTY_SETTINGS, DifficultyLevel, GameMove
+
+_HEADER = struct.Struct("<4sBBBBqIIiII")
+
+
+def _decode_header(data: bytes):
+    magic, fmt, kind, status, _, game_id, width, height, mines, base, version = (
+        _HEADER.unpack_from(data)
+    )
+    assert magic == b"MSWB" and fmt == 1
+    return {
+        "kind": kind, "status": status, "game_id": game_id, "width": width,
+        "height": height, "mines_remaining": mines,
+        "base_version": base, "version": version,
+    }, data[_HEADER.size:]
+
+
+def _visible(value: int) -> int:
+    return value if value & REVEALED else value & FLAGGED
+
+
+@pytest.fixture
+def game() -> MinesweeperGame:
+    """揭示中心格子并标记一个未揭示格子的高级游戏"""
+    game = MinesweeperGame(DIFFICULTY_SETTINGS[DifficultyLevel.EXPERT], seed=42)
+    game.apply_move(GameMove(x=8, y=15, action="reveal"))
+    hidden = next(i for i, value in enumerate(game.cells) if not value & REVEALED)
+    game.apply_move(GameMove(x=hidden // game.width, y=hidden % game.width, action="flag"))
+    return game
+
+
+def test_board_round_trip_masks_hidden_cells(game):
+    header, body = _decode_header(encode_board(game, 7))
+
+    assert header == {
+        "kind": KIND_BOARD, "status": 0, "game_id": 7, "width": game.width,
+        "height": game.height, "mines_remaining": game.mines_remaining,
+        "base_version": game.version, "version": game.version,
+    }
+    assert len(body) == game.width * game.height
+    assert list(body) == [_visible(value) for value in game.cells]
+    # 隐藏的格子只剩标记位：地雷和相邻数量都不会出现在编码中
+    hidden = [body[i] for i, value in enumerate(game.cells) if not value & REVEALED]
+    assert any(game.cells[i] & MINE for i in range(len(body)) if not body[i] & REVEALED)
+    assert all(value & (MINE | ADJACENT_MASK) == 0 for value in hidden)
+    assert any(value & FLAGGED for value in hidden)
+    assert any(value & ADJACENT_MASK for value in body if value & REVEALED)
+
+
+def test_delta_round_trip(game):
+    base_version = game.version
+    hidden = [i for i, value in enumerate(game.cells) if not value & (REVEALED | FLAGGED)]
+    safe = next(i for i in hidden if not game.cells[i] & MINE)
+    mine = next(i for i in hidden if game.cells[i] & MINE)
+    changed = game.apply_move(GameMove(x=safe // game.width, y=safe % game.width, action="reveal"))
+    changed += game.apply_move(GameMove(x=mine // game.width, y=mine % game.width, action="flag"))
+
+    header, body = _decode_header(encode_delta(game, 7, changed, base_version))
+    (count,) = struct.unpack_from("<I", body)
+    indices = list(struct.unpack_from(f"<{count}I", body, 4))
+    values = body[4 + 4 * count:]
+
+    assert header["kind"] == KIND_DELTA
+    assert (header["base_version"], header["version"]) == (base_version, game.version)
+    assert indices == changed
+    assert list(values) == [_visible(game.cells[i]) for i in changed]
+    assert values[indices.index(mine)] == FLAGGED
+
+
+def test_region_round_trip(game):
+    x0, y0, x1, y1 = 2, 5, 9, 20
+    header, body = _decode_header(encode_region(game, 7, x0, y0, x1, y1))
+
+    assert header["kind"] == KIND_REGION
+    assert struct.unpack_from("<IIII", body) == (x0, y0, x1, y1)
+    rows = body[16:]
+    expected = [
+        _visible(game.cells[x * game.width + y]) for x in range(x0, x1) for y in range(y0, y1)
+    ]
+    assert list(rows) == expected
+
+
+def test_lost_game_reveals_mines(game):
+    mine = next(i for i, value in enumerate(game.cells) if value & MINE and not value & FLAGGED)
+    game.apply_move(GameMove(x=mine // game.width, y=mine % game.width, action="reveal"))
+
+    header, body = _decode_header(encode_board(game, 7))
+
+    assert header["status"] & STATUS_GAME_OVER
+    assert body[mine] & (MINE | REVEALED) == MINE | REVEALED
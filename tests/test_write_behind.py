@@ -0,0 +1,104 @@
+"""write-behind 队列测试：进程崩溃后重启，溢出文件中的记录恰好写入一次"""
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+import db
+from db import GameDB, WriteBehindQueue, get_db, init_db
+
+
+def _record(user_name: str, result: bool = True) -> dict:
+    return {
+        'game_id': str(uuid.uuid4()),
+        'user_id': None,
+        'user_name': user_name,
+        'difficulty': 'beginner',
+        'duration': 30,
+        'result': result,
+        'moves': 12,
+        'board_width': 9,
+        'board_height': 9,
+        'mines_count': 10,
+        'played_at': datetime.now().isoformat(),
+    }
+
+
+def _counts(records: list) -> list:
+    with get_db() as conn:
+        return [
+            conn.execute(
+                "SELECT COUNT(*) FROM game_records WHERE game_id = ?", [record['game_id']]
+            ).fetchone()[0]
+            for record in records
+        ]
+
+
+def _crash(queue: WriteBehindQueue) -> None:
+    """模拟进程崩溃：后台线程不再写入，溢出文件和锁随进程退出被关闭"""
+    queue.flush = lambda: 0
+    queue._stopped.set()
+    queue._wakeup.set()
+    queue._thread.join()
+    queue._spill.close()
+    queue._spill_lock.close()
+
+
+@pytest.fixture
+def spill_path(tmp_path) -> str:
+    init_db()
+    return str(tmp_path / 'pending.jsonl')
+
+
+def test_replay_after_crash_saves_each_record_once(spill_path, monkeypatch):
+    # 崩溃的进程使用另一个进程号，重启后作为无主的溢出文件被接管
+    with monkeypatch.context() as m:
+        m.setattr(os, 'getpid', lambda: 999999)
+        crashed = WriteBehindQueue(spill_path, batch_size=1000, interval=3600)
+    crashed.start()
+    records = [_record(f'player{i}') for i in range(5)]
+    for record in records:
+        crashed.submit(record)
+    # 前两条在崩溃前已经写入数据库，但还没有从溢出文件中移除
+    GameDB.save_game_results(records[:2])
+    _crash(crashed)
+    assert os.path.exists(crashed.spill_path)
+
+    queue = WriteBehindQueue(spill_path, batch_size=1000, interval=3600)
+    queue.start()
+    assert not os.path.exists(crashed.spill_path)
+    assert [r['game_id'] for r in queue._pending] == [r['game_id'] for r in records[2:]]
+    assert queue.flush() == 3
+    queue.close()
+
+    assert _counts(records) == [1] * len(records)
+    assert not os.path.exists(queue.spill_path)
+
+    # 再次启动时没有需要重放的记录
+    restarted = WriteBehindQueue(spill_path, batch_size=1000, interval=3600)
+    restarted.start()
+    assert restarted._pending == []
+    restarted.close()
+    assert _counts(records) == [1] * len(records)
+
+
+def test_replayed_wins_reach_leaderboard_cache(spill_path, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(os, 'getpid', lambda: 999998)
+        crashed = WriteBehindQueue(spill_path, batch_size=1000, interval=3600)
+    crashed.start()
+    win = _record(f'replayed-{uuid.uuid4().hex[:8]}')
+    crashed.submit(win)
+    _crash(crashed)
+
+    wins = []
+    monkeypatch.setattr(
+        db.leaderboard_cache, 'record_win', lambda *args: wins.append(args)
+    )
+    queue = WriteBehindQueue(spill_path, batch_size=1000, interval=3600)
+    queue.start()
+    queue.close()
+
+    assert wins == [('beginner', win['user_name'], 30, win['played_at'])]
+    assert _counts([win]) == [1]
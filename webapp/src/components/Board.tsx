@@ -1,6 +1,7 @@
-import React from 'react';
+import React, { useCallback, useEffect, useRef, useState } from 'react';
 import styled from 'styled-components';
-import { GameState } from '../types';
+import { CellState, GameState, MoveAction, RegionState, Viewport } from '../types';
+import { getRegion, isRegionState } from '../services/api';
 import { Cell } from './Cell';
 
 const BoardContainer = styled.div`
@@ -12,12 +13,147 @@ const BoardContainer = styled.div`
     box-shadow: inset 0 0 3px rgba(0, 0, 0, ${props => props.theme.name === 'dark' ? '0.4' : '0.2'});
 `;
 
+const ScrollContainer = styled.div`
+    max-width: min(90vw, 960px);
+    max-height: 640px;
+    overflow: auto;
+    background: ${props => props.theme.colors.background.secondary};
+    border-radius: 4px;
+    box-shadow: inset 0 0 3px rgba(0, 0, 0, ${props => props.theme.name === 'dark' ? '0.4' : '0.2'});
+`;
+
+// 格子尺寸加上 1px 间隔
+const CELL_SIZE = 31;
+// 视口按 TILE x TILE 的分块对齐，小范围滚动不会重新获取
+const TILE = 32;
+
+// 尚未获取的格子
+const UNKNOWN_CELL: CellState = {
+    is_revealed: false,
+    is_mine: false,
+    is_flagged: false,
+    adjacent_mines: 0
+};
+
 export interface BoardProps {
     state: GameState;
-    onCellClick: (x: number, y: number, action: 'reveal' | 'flag') => void;
+    onCellClick: (x: number, y: number, action: MoveAction) => void;
+    gameId?: number | null;
+    onRegion?: (region: RegionState) => void;
+    onViewportChange?: (viewport: Viewport) => void;
 }
 
-export const Board: React.FC<BoardProps> = ({ state, onCellClick }) => {
+const cellAction = (cell: CellState): MoveAction =>
+    cell.is_revealed && cell.adjacent_mines > 0 ? 'chord' : 'reveal';
+
+const contains = (outer: Viewport | null, inner: Viewport) =>
+    outer !== null && outer.x0 <= inner.x0 && outer.y0 <= inner.y0
+    && outer.x1 >= inner.x1 && outer.y1 >= inner.y1;
+
+interface TiledBoardProps extends BoardProps {
+    state: RegionState;
+}
+
+// 大游戏板：只渲染滚动区域内可见的格子，滚动到尚未获取的分块时按视口获取区域
+const TiledBoard: React.FC<TiledBoardProps> = ({
+    state, onCellClick, gameId, onRegion, onViewportChange
+}) => {
+    const { width, height } = state;
+    const containerRef = useRef<HTMLDivElement>(null);
+    const fetchedRef = useRef<Viewport | null>(null);
+    const frameRef = useRef<number | null>(null);
+    const [visible, setVisible] = useState<Viewport>({ x0: 0, y0: 0, x1: 0, y1: 0 });
+
+    const update = useCallback(() => {
+        frameRef.current = null;
+        const container = containerRef.current;
+        if (!container) {
+            return;
+        }
+        const next = {
+            x0: Math.floor(container.scrollTop / CELL_SIZE),
+            y0: Math.floor(container.scrollLeft / CELL_SIZE),
+            x1: Math.min(height, Math.ceil((container.scrollTop + container.clientHeight) / CELL_SIZE)),
+            y1: Math.min(width, Math.ceil((container.scrollLeft + container.clientWidth) / CELL_SIZE))
+        };
+        setVisible(next);
+        if (contains(fetchedRef.current, next)) {
+            return;
+        }
+        const viewport = {
+            x0: Math.floor(next.x0 / TILE) * TILE,
+            y0: Math.floor(next.y0 / TILE) * TILE,
+            x1: Math.min(height, Math.ceil(next.x1 / TILE) * TILE),
+            y1: Math.min(width, Math.ceil(next.y1 / TILE) * TILE)
+        };
+        fetchedRef.current = viewport;
+        onViewportChange?.(viewport);
+        if (gameId) {
+            getRegion(gameId, viewport).then(onRegion).catch(error => {
+                console.error('Failed to fetch board region:', error);
+            });
+        }
+    }, [gameId, width, height, onRegion, onViewportChange]);
+
+    const handleScroll = () => {
+        if (frameRef.current === null) {
+            frameRef.current = requestAnimationFrame(update);
+        }
+    };
+
+    // 新游戏或游戏板尺寸变化时重新获取可见区域
+    useEffect(() => {
+        fetchedRef.current = null;
+        update();
+        return () => {
+            if (frameRef.current !== null) {
+                cancelAnimationFrame(frameRef.current);
+                frameRef.current = null;
+            }
+        };
+    }, [update]);
+
+    const cells: React.ReactElement[] = [];
+    for (let x = visible.x0; x < visible.x1; x++) {
+        const row = state.board[x];
+        for (let y = visible.y0; y < visible.y1; y++) {
+            const cell = row?.[y] ?? UNKNOWN_CELL;
+            cells.push(
+                <div
+                    key={`${x}-${y}`}
+                    style={{ position: 'absolute', top: x * CELL_SIZE, left: y * CELL_SIZE }}
+                >
+                    <Cell
+                        state={cell}
+                        onLeftClick={() => onCellClick(x, y, cellAction(cell))}
+                        onRightClick={(e: React.MouseEvent) => {
+                            e.preventDefault();
+                            onCellClick(x, y, 'flag');
+                        }}
+                    />
+                </div>
+            );
+        }
+    }
+
+    return (
+        <ScrollContainer
+            ref={containerRef}
+            onScroll={handleScroll}
+            onContextMenu={(e) => e.preventDefault()}
+        >
+            <div style={{ position: 'relative', width: width * CELL_SIZE, height: height * CELL_SIZE }}>
+                {cells}
+            </div>
+        </ScrollContainer>
+    );
+};
+
+export const Board: React.FC<BoardProps> = (props) => {
+    const { state, onCellClick } = props;
+    if (isRegionState(state)) {
+        return <TiledBoard {...props} state={state} />;
+    }
     return (
         <BoardContainer
             style={{
@@ -30,7 +166,7 @@ export const Board: React.FC<BoardProps> = ({ state, onCellClick }) => {
                     <Cell
                         key={`${x}-${y}`}
                         state={cell}
-                        onLeftClick={() => onCellClick(x, y, 'reveal')}
+                        onLeftClick={() => onCellClick(x, y, cellAction(cell))}
                         onRightClick={(e: React.MouseEvent) => {
                             e.preventDefault();
                             onCellClick(x, y, 'flag');
@@ -40,4 +176,4 @@ export const Board: React.FC<BoardProps> = ({ state, onCellClick }) => {
             )}
         </BoardContainer>
     );
-}; 
\ No newline at end of file
+};
@@ -51,6 +51,12 @@ export const DifficultySelector: React.FC<DifficultySelectorProps> = ({
             >
                 高级
             </Button>
+            <Button
+                active={currentDifficulty === 'custom'}
+                onClick={() => onSelect('custom')}
+            >
+                自定义
+            </Button>
         </Container>
     );
 }; 
\ No newline at end of file
@@ -1,11 +1,14 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import styled from 'styled-components';
 import { Board } from './Board';
 import { UserNamePrompt } from './UserNamePrompt';
 import { DifficultySelector } from './DifficultySelector';
 import { Timer } from './Timer';
-import { DifficultyLevel, GameState } from '../types';
-import { createNewGame, makeMove, restartGame, completeGame } from '../services/api';
+import { CustomBoard, DifficultyLevel, GameState, MoveAction, RegionState, Viewport } from '../types';
+import {
+    createNewGame, makeMove, restartGame, completeGame, GameSocket,
+    applyRegion, getRegion, isRegionState, toLocalState
+} from '../services/api';
 
 const GameContainer = styled.div`
     display: flex;
@@ -65,6 +68,22 @@ const UserName = styled.div`
     }
 `;
 
+const CustomInputs = styled.div`
+    display: flex;
+    gap: 8px;
+    align-items: center;
+    color: ${props => props.theme.colors.text.primary};
+
+    input {
+        width: 70px;
+        padding: 4px;
+    }
+`;
+
+const ErrorMessage = styled.div`
+    color: #f44336;
+`;
+
 interface GameProps {
     initialDifficulty?: DifficultyLevel;
     onGameComplete?: () => void;
@@ -82,27 +101,67 @@ export const Game: React.FC<GameProps> = ({
     const [time, setTime] = useState(0);
     const [moves, setMoves] = useState(0);
     const [isTimerRunning, setIsTimerRunning] = useState(false);
+    const [customBoard, setCustomBoard] = useState<CustomBoard>({ width: 100, height: 100, mines: 1500 });
+    const [error, setError] = useState<string | null>(null);
+    const socketRef = useRef<GameSocket | null>(null);
+    // 大游戏板上已获取的区域，移动操作只返回其中的格子
+    const viewportRef = useRef<Viewport | null>(null);
+    const gameStateRef = useRef<GameState | null>(null);
+    gameStateRef.current = gameState;
 
-    const startNewGame = useCallback(async () => {
-        if (!userName) {
-            setShowPrompt(true);
-            return;
-        }
+    const createGame = useCallback(async (level: DifficultyLevel) => {
+        setError(null);
         try {
-            const response = await createNewGame(difficulty);
+            const response = await createNewGame(
+                level, level === 'custom' ? { custom: customBoard } : {}
+            );
             if (response && response.game_id && response.state) {
+                viewportRef.current = null;
                 setGameId(response.game_id);
-                setGameState(response.state);
+                setGameState(toLocalState(response.state));
                 setTime(0);
                 setMoves(0);
                 setIsTimerRunning(true);
             } else {
                 console.error('Invalid game response:', response);
             }
-        } catch (error) {
+        } catch (error: any) {
             console.error('Failed to start new game:', error);
+            setError(error?.response?.data?.detail ?? '无法创建游戏');
+        }
+    }, [customBoard]);
+
+    const startNewGame = useCallback(async () => {
+        if (!userName) {
+            setShowPrompt(true);
+            return;
+        }
+        await createGame(difficulty);
+    }, [createGame, difficulty, userName]);
+
+    const handleViewportChange = useCallback((viewport: Viewport) => {
+        viewportRef.current = viewport;
+        socketRef.current?.setViewport(viewport);
+    }, []);
+
+    // 合并滚动时获取的区域；区域早于本地状态时按当前视口重新获取
+    const handleRegion = useCallback((region: RegionState) => {
+        const current = gameStateRef.current;
+        if (!current || !isRegionState(current) || !gameId) {
+            return;
+        }
+        if (region.version < current.version) {
+            if (viewportRef.current) {
+                getRegion(gameId, viewportRef.current).then(handleRegion).catch(error => {
+                    console.error('Failed to fetch board region:', error);
+                });
+            }
+            return;
         }
-    }, [difficulty, userName]);
+        setGameState(state => state && region.version >= state.version
+            ? applyRegion(state, region)
+            : state);
+    }, [gameId]);
 
     useEffect(() => {
         const savedUserName = localStorage.getItem('minesweeper_username');
@@ -112,6 +171,27 @@ export const Game: React.FC<GameProps> = ({
         }
     }, []);
 
+    // 为当前游戏建立 WebSocket 会话，连接失败时回退到 HTTP 请求
+    useEffect(() => {
+        if (!gameId) {
+            return;
+        }
+        const socket = new GameSocket(gameId);
+        socketRef.current = socket;
+        if (viewportRef.current) {
+            socket.setViewport(viewportRef.current);
+        }
+        socket.ready.catch(error => {
+            console.warn('WebSocket unavailable, falling back to HTTP:', error);
+        });
+        return () => {
+            socket.close();
+            if (socketRef.current === socket) {
+                socketRef.current = null;
+            }
+        };
+    }, [gameId]);
+
     useEffect(() => {
         let timer: NodeJS.Timeout;
         if (isTimerRunning && gameState && !gameState.is_game_over) {
@@ -122,13 +202,19 @@ export const Game: React.FC<GameProps> = ({
         return () => clearInterval(timer);
     }, [isTimerRunning, gameState?.is_game_over]);
 
-    const handleCellClick = async (x: number, y: number, action: 'reveal' | 'flag') => {
+    const handleCellClick = async (x: number, y: number, action: MoveAction) => {
         if (!gameState || gameState.is_game_over) return;
         if (gameId) {
             try {
-                const response = await makeMove(gameId, { x, y, action });
+                const socket = socketRef.current;
+                const response = socket?.isOpen
+                    ? await socket.move({ x, y, action }, gameState)
+                    : await makeMove(
+                        gameId, { x, y, action }, gameState, viewportRef.current ?? undefined
+                    );
+                if (response.version === gameState.version) return;
                 setGameState(response);
-                if (action === 'reveal') {
+                if (action !== 'flag') {
                     setMoves(m => m + 1);
                 }
                 if (response.is_game_over) {
@@ -149,11 +235,12 @@ export const Game: React.FC<GameProps> = ({
     };
 
     const handleStartOrRestart = async () => {
-        if (gameId) {
+        if (gameId && difficulty !== 'custom') {
             try {
                 const response = await restartGame(gameId);
                 if (response && response.state) {
-                    setGameState(response.state);
+                    viewportRef.current = null;
+                    setGameState(toLocalState(response.state));
                     setTime(0);
                     setMoves(0);
                     setIsTimerRunning(true);
@@ -193,22 +280,15 @@ export const Game: React.FC<GameProps> = ({
     const handleDifficultyChange = async (newDifficulty: DifficultyLevel) => {
         setDifficulty(newDifficulty);
         // 直接开始新游戏
-        try {
-            const response = await createNewGame(newDifficulty);
-            if (response && response.game_id && response.state) {
-                setGameId(response.game_id);
-                setGameState(response.state);
-                setTime(0);
-                setMoves(0);
-                setIsTimerRunning(true);
-            } else {
-                console.error('Invalid game response:', response);
-            }
-        } catch (error) {
-            console.error('Failed to start new game:', error);
-        }
+        await createGame(newDifficulty);
     };
 
+    const handleCustomChange = (field: keyof CustomBoard) =>
+        (e: React.ChangeEvent<HTMLInputElement>) => {
+            const value = Number(e.target.value);
+            setCustomBoard(board => ({ ...board, [field]: value }));
+        };
+
     if (showPrompt) {
         return <UserNamePrompt onSubmit={handleUserNameSubmit} />;
     }
@@ -224,10 +304,21 @@ export const Game: React.FC<GameProps> = ({
                     currentDifficulty={difficulty}
                     onSelect={handleDifficultyChange}
                 />
+                {difficulty === 'custom' && (
+                    <CustomInputs>
+                        宽 <input type="number" min={1} value={customBoard.width}
+                            onChange={handleCustomChange('width')} />
+                        高 <input type="number" min={1} value={customBoard.height}
+                            onChange={handleCustomChange('height')} />
+                        地雷 <input type="number" min={1} value={customBoard.mines}
+                            onChange={handleCustomChange('mines')} />
+                    </CustomInputs>
+                )}
                 <Button onClick={handleStartOrRestart}>
-                    {gameId ? '重新开始' : '开始游戏'}
+                    {gameId && difficulty !== 'custom' ? '重新开始' : '开始游戏'}
                 </Button>
             </Controls>
+            {error && <ErrorMessage>{error}</ErrorMessage>}
 
             <GameInfo>
                 <div>剩余地雷: {gameState?.mines_remaining ?? 0}</div>
@@ -240,9 +331,13 @@ export const Game: React.FC<GameProps> = ({
                     board: getEmptyBoard(),
                     mines_remaining: 0,
                     is_game_over: false,
-                    is_won: false
+                    is_won: false,
+                    version: 0
                 }}
                 onCellClick={gameId ? handleCellClick : () => { }}
+                gameId={gameId}
+                onRegion={handleRegion}
+                onViewportChange={handleViewportChange}
             />
 
             {gameState?.is_game_over && (
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import styled from 'styled-components';
-import { DifficultyLevel, LeaderboardEntry } from '../types';
+import { LeaderboardEntry, RankedDifficulty } from '../types';
 import { getLeaderboard } from '../services/api';
 
 const LeaderboardContainer = styled.div`
@@ -146,13 +146,13 @@ const formatDate = (dateStr: string): string => {
 };
 
 interface LeaderboardProps {
-    initialDifficulty?: DifficultyLevel;
+    initialDifficulty?: RankedDifficulty;
 }
 
 export const Leaderboard: React.FC<LeaderboardProps> = ({
     initialDifficulty = 'beginner'
 }) => {
-    const [difficulty, setDifficulty] = useState<DifficultyLevel>(initialDifficulty);
+    const [difficulty, setDifficulty] = useState<RankedDifficulty>(initialDifficulty);
     const [entries, setEntries] = useState<LeaderboardEntry[]>([]);
     const [loading, setLoading] = useState(true);
 
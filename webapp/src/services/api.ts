@@ -1,7 +1,9 @@
 import axios from 'axios';
 import {
     GameState, GameMove, DifficultyLevel, NewGameResponse,
-    LeaderboardEntry, UserStats, GameResult
+    LeaderboardEntry, LeaderboardPage, LeaderboardWindow, UserRank,
+    UserStats, GameResult, MoveDelta, Hint, RankedDifficulty,
+    CellState, CustomBoard, RegionState, Viewport
 } from '../types';
 
 const IS_DEV_MODE = import.meta.env.MODE === "development";
@@ -34,9 +36,14 @@ export const getGameConfig = async () => {
     return response.data;
 };
 
-export const createNewGame = async (difficulty: DifficultyLevel): Promise<NewGameResponse> => {
+export const createNewGame = async (
+    difficulty: DifficultyLevel,
+    options: { noGuess?: boolean; seed?: number; custom?: CustomBoard } = {}
+): Promise<NewGameResponse> => {
     try {
-        const response = await api.post(`/game/new/${difficulty}`);
+        const response = await api.post(`/game/new/${difficulty}`, null, {
+            params: { no_guess: options.noGuess, seed: options.seed, ...options.custom },
+        });
         console.log('API Response:', response);
         if (!response.data || !response.data.game_id || !response.data.state) {
             throw new Error('Invalid response format');
@@ -48,8 +55,122 @@ export const createNewGame = async (difficulty: DifficultyLevel): Promise<NewGam
     }
 };
 
-export const makeMove = async (gameId: number, move: GameMove): Promise<GameState> => {
+// 将增量状态应用到本地游戏状态，只复制发生变化的行
+export const applyMoveDelta = <T extends GameState>(state: T, delta: MoveDelta): T => {
+    const board = state.board.slice();
+    const copiedRows = new Set<number>();
+    for (const { x, y, ...cell } of delta.changes) {
+        if (!copiedRows.has(x)) {
+            // 大游戏板上尚未获取的行不存在
+            board[x] = board[x] ? board[x].slice() : [];
+            copiedRows.add(x);
+        }
+        board[x][y] = cell;
+    }
+    return {
+        ...state,
+        board,
+        mines_remaining: delta.mines_remaining,
+        is_game_over: delta.is_game_over,
+        is_won: delta.is_won,
+        version: delta.version
+    };
+};
+
+export const isRegionState = (state: GameState): state is RegionState =>
+    'x0' in state;
+
+// 将服务器返回的区域合并到本地状态：本地状态的 board 按整个游戏板的下标排列，
+// 只包含已获取的行和格子；版本号不同时丢弃之前获取的区域
+export const applyRegion = (current: GameState | null, region: RegionState): RegionState => {
+    const sameBoard = current !== null && isRegionState(current)
+        && current.width === region.width && current.height === region.height
+        && current.version === region.version;
+    const board = sameBoard ? current.board.slice() : new Array<CellState[]>(region.height);
+    region.board.forEach((row, i) => {
+        const x = region.x0 + i;
+        const merged = board[x] ? board[x].slice() : [];
+        row.forEach((cell, j) => {
+            merged[region.y0 + j] = cell;
+        });
+        board[x] = merged;
+    });
+    return { ...region, board, x0: 0, y0: 0 };
+};
+
+// 将新游戏或重新开始的响应转换为本地状态
+export const toLocalState = (state: GameState | RegionState): GameState =>
+    isRegionState(state) ? applyRegion(null, state) : state;
+
+const BOARD_MEDIA_TYPE = 'application/x-minesweeper-board';
+const KIND_REGION = 2;
+const REGION_HEADER_SIZE = 52;
+
+// 二进制格子字节到 CellState 的转换表，格式见 src/board_codec.py
+const CELL_STATES: CellState[] = Array.from({ length: 256 }, (_, value) => ({
+    is_revealed: (value & 0x20) !== 0,
+    is_mine: (value & 0x10) !== 0,
+    is_flagged: (value & 0x40) !== 0,
+    adjacent_mines: value & 0x0f
+}));
+
+// 按二进制格式获取游戏板的一个区域，每个格子只占一个字节
+export const getRegion = async (gameId: number, viewport: Viewport): Promise<RegionState> => {
+    const response = await api.get(`/game/${gameId}/region`, {
+        params: viewport,
+        headers: { Accept: BOARD_MEDIA_TYPE },
+        responseType: 'arraybuffer'
+    });
+    const view = new DataView(response.data);
+    if (view.getUint8(5) !== KIND_REGION) {
+        throw new Error('Invalid region format');
+    }
+    const status = view.getUint8(6);
+    const [x0, y0, x1, y1] = [36, 40, 44, 48].map(offset => view.getUint32(offset, true));
+    const cells = new Uint8Array(response.data, REGION_HEADER_SIZE);
+    const columns = y1 - y0;
+    const board: CellState[][] = [];
+    for (let i = 0; i < x1 - x0; i++) {
+        board.push(Array.from(
+            cells.subarray(i * columns, (i + 1) * columns), value => CELL_STATES[value]
+        ));
+    }
+    return {
+        board,
+        mines_remaining: view.getInt32(24, true),
+        is_game_over: (status & 0x01) !== 0,
+        is_won: (status & 0x02) !== 0,
+        version: view.getUint32(32, true),
+        x0,
+        y0,
+        width: view.getUint32(16, true),
+        height: view.getUint32(20, true)
+    };
+};
+
+export const makeMove = async (
+    gameId: number,
+    move: GameMove,
+    current?: GameState,
+    viewport?: Viewport
+): Promise<GameState> => {
     try {
+        if (current) {
+            // 增量模式：服务器只返回发生变化的格子，指定视口时只返回视口内的格子
+            const response = await api.post(`/game/${gameId}/move`, move, {
+                params: { delta: true, ...viewport }
+            });
+            const delta: MoveDelta = response.data;
+            if (!delta || !Array.isArray(delta.changes)) {
+                throw new Error('Invalid move delta format');
+            }
+            if (delta.base_version !== current.version) {
+                // 本地状态与服务器不一致，重新获取完整状态或视口内的区域
+                return await resync(gameId, viewport);
+            }
+            return applyMoveDelta(current, delta);
+        }
+
         const response = await api.post(`/game/${gameId}/move`, move);
         console.log('Move Response:', response);
         if (!response.data || !response.data.board) {
@@ -62,6 +183,83 @@ export const makeMove = async (gameId: number, move: GameMove): Promise<GameStat
     }
 };
 
+const resync = async (gameId: number, viewport?: Viewport): Promise<GameState> =>
+    viewport ? applyRegion(null, await getRegion(gameId, viewport)) : getGameState(gameId);
+
+// 基于 WebSocket 的游戏会话，同一连接上连续发送移动操作以降低每步延迟
+export class GameSocket {
+    private socket: WebSocket;
+    private viewport?: Viewport;
+    private pending: Array<{
+        current: GameState;
+        resolve: (state: GameState) => void;
+        reject: (error: Error) => void;
+    }> = [];
+    readonly ready: Promise<void>;
+
+    constructor(private gameId: number) {
+        const url = `${API_BASE_URL.replace(/^http/, 'ws')}/game/${gameId}/ws`;
+        this.socket = new WebSocket(url);
+        this.ready = new Promise((resolve, reject) => {
+            this.socket.addEventListener('open', () => {
+                if (this.viewport) {
+                    this.socket.send(JSON.stringify(this.viewport));
+                }
+                resolve();
+            }, { once: true });
+            this.socket.addEventListener('error', () => reject(new Error('WebSocket error')), { once: true });
+        });
+        this.socket.addEventListener('message', this.handleMessage);
+        this.socket.addEventListener('close', () => {
+            const error = new Error('WebSocket closed');
+            this.pending.splice(0).forEach(({ reject }) => reject(error));
+        });
+    }
+
+    get isOpen(): boolean {
+        return this.socket.readyState === WebSocket.OPEN;
+    }
+
+    // 服务器按发送顺序逐条应答，因此按先进先出匹配请求
+    private handleMessage = (event: MessageEvent) => {
+        const request = this.pending.shift();
+        if (!request) {
+            return;
+        }
+        const data = JSON.parse(event.data);
+        if (!data || !Array.isArray(data.changes)) {
+            request.reject(new Error(data?.detail ?? 'Invalid move delta format'));
+            return;
+        }
+        const delta: MoveDelta = data;
+        if (delta.base_version !== request.current.version) {
+            // 本地状态与服务器不一致，重新获取完整状态或视口内的区域
+            resync(this.gameId, this.viewport).then(request.resolve, request.reject);
+            return;
+        }
+        request.resolve(applyMoveDelta(request.current, delta));
+    };
+
+    // 之后的增量只包含视口内的格子；服务器不应答视口消息
+    setViewport(viewport: Viewport) {
+        this.viewport = viewport;
+        if (this.isOpen) {
+            this.socket.send(JSON.stringify(viewport));
+        }
+    }
+
+    move(move: GameMove, current: GameState): Promise<GameState> {
+        return new Promise((resolve, reject) => {
+            this.pending.push({ current, resolve, reject });
+            this.socket.send(JSON.stringify(move));
+        });
+    }
+
+    close() {
+        this.socket.close();
+    }
+}
+
 export const restartGame = async (gameId: number): Promise<NewGameResponse> => {
     const response = await api.post(`/game/${gameId}/restart`);
     return response.data;
@@ -72,16 +270,53 @@ export const getGameState = async (gameId: number): Promise<GameState> => {
     return response.data;
 };
 
+export const getHint = async (gameId: number): Promise<Hint> => {
+    const response = await api.get(`/game/${gameId}/hint`);
+    return response.data;
+};
+
 // 新增的API方法
 export const completeGame = async (gameId: number, result: GameResult): Promise<void> => {
     await api.post(`/game/${gameId}/complete`, result);
 };
 
-export const getLeaderboard = async (difficulty: DifficultyLevel): Promise<LeaderboardEntry[]> => {
+export const getLeaderboard = async (difficulty: RankedDifficulty): Promise<LeaderboardEntry[]> => {
     const response = await api.get(`/leaderboard/${difficulty}`);
     return response.data;
 };
 
+export const getLeaderboardPage = async (
+    difficulty: RankedDifficulty,
+    options: {
+        window?: LeaderboardWindow;
+        perUser?: boolean;
+        limit?: number;
+        cursor?: string | null;
+    } = {}
+): Promise<LeaderboardPage> => {
+    const response = await api.get(`/leaderboard/${difficulty}/page`, {
+        params: {
+            window: options.window,
+            per_user: options.perUser,
+            limit: options.limit,
+            cursor: options.cursor ?? undefined,
+        },
+    });
+    return response.data;
+};
+
+export const getUserRank = async (
+    difficulty: RankedDifficulty,
+    userName: string,
+    window: LeaderboardWindow = 'all'
+): Promise<UserRank> => {
+    const response = await api.get(
+        `/leaderboard/${difficulty}/rank/${encodeURIComponent(userName)}`,
+        { params: { window } }
+    );
+    return response.data;
+};
+
 export const getUserStats = async (userName: string): Promise<UserStats> => {
     const response = await api.get(`/stats/${userName}`);
     return response.data;
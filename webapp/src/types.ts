@@ -1,4 +1,7 @@
-export type DifficultyLevel = 'beginner' | 'intermediate' | 'expert';
+export type DifficultyLevel = 'beginner' | 'intermediate' | 'expert' | 'custom';
+
+// 参与排行榜的预设难度
+export type RankedDifficulty = Exclude<DifficultyLevel, 'custom'>;
 
 export interface GameConfig {
     difficulty: DifficultyLevel;
@@ -9,10 +12,23 @@ export interface GameConfig {
 
 export interface GameConfigurations {
     difficulties: {
-        [key in DifficultyLevel]: GameConfig;
+        [key in RankedDifficulty]: GameConfig;
+    };
+    custom: {
+        max_size: number;
+        min_density: number;
+        max_density: number;
+        max_region_cells: number;
     };
 }
 
+// 自定义游戏板的尺寸和地雷数量
+export interface CustomBoard {
+    width: number;
+    height: number;
+    mines: number;
+}
+
 export interface CellState {
     is_revealed: boolean;
     is_mine: boolean;
@@ -25,17 +41,70 @@ export interface GameState {
     mines_remaining: number;
     is_game_over: boolean;
     is_won: boolean;
+    version: number;
+}
+
+// 游戏板的一个矩形区域：board[i][j] 对应 (x0 + i, y0 + j)；
+// 客户端合并后的状态 x0、y0 为 0，board 是按整个游戏板下标的稀疏数组
+export interface RegionState extends GameState {
+    x0: number;
+    y0: number;
+    width: number;
+    height: number;
+}
+
+// 客户端可见的区域，不包含 x1、y1
+export interface Viewport {
+    x0: number;
+    y0: number;
+    x1: number;
+    y1: number;
+}
+
+export interface CellUpdate extends CellState {
+    x: number;
+    y: number;
+}
+
+export interface MoveDelta {
+    changes: CellUpdate[];
+    mines_remaining: number;
+    is_game_over: boolean;
+    is_won: boolean;
+    base_version: number;
+    version: number;
+}
+
+export interface CellPosition {
+    x: number;
+    y: number;
+}
+
+export interface CellProbability extends CellPosition {
+    probability: number;
+}
+
+export interface Hint {
+    version: number;
+    safe: CellPosition[];
+    mines: CellPosition[];
+    probabilities: CellProbability[];
+    other_probability: number;
+    exact: boolean;
 }
 
+// chord：揭示已满足的数字周围所有未标记的格子
+export type MoveAction = 'reveal' | 'flag' | 'chord';
+
 export interface GameMove {
     x: number;
     y: number;
-    action: 'reveal' | 'flag';
+    action: MoveAction;
 }
 
 export interface NewGameResponse {
     game_id: number;
-    state: GameState;
+    state: GameState | RegionState;
 }
 
 export interface LeaderboardEntry {
@@ -45,6 +114,22 @@ export interface LeaderboardEntry {
     played_at: string;
 }
 
+export type LeaderboardWindow = 'all' | 'day' | 'week' | 'month';
+
+export interface LeaderboardPage {
+    entries: LeaderboardEntry[];
+    next_cursor: string | null;
+}
+
+export interface UserRank {
+    user_name: string;
+    rank: number;
+    best_time: number;
+    played_at: string;
+    total: number;
+    percentile: number;
+}
+
 export interface DifficultyStats {
     games: number;
     wins: number;